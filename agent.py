@@ -1,22 +1,103 @@
 # agent.py
+import asyncio
+import operator
 import os
-from langchain_openai import ChatOpenAI
-from langchain.agents import initialize_agent, AgentType
-from agent_tools import run_cypher, upsert_program
+import time
+from typing import Annotated, TypedDict
+
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+import aio
+from agent_tools import make_tools
+from graph_client import get_async_graph, get_graph
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "8"))  # model turns per question
+
+SYSTEM_PROMPT = """You answer questions about a subsidy knowledge graph in FalkorDB.
+Use run_cypher for reads and upsert_program for writes. When a question needs several
+independent lookups, request all of those tool calls in the same turn; they run in parallel.
+Nodes: Company, SubsidyProgram, Authority, Document, EligibilityCriterion.
+Relations: MANAGED_BY, APPLIES_TO_SECTOR, APPLIES_TO_REGION, REQUIRES_DOCUMENT, ELIGIBLE_IF."""
+
+class AgentState(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages]
+    timings: Annotated[list[dict], operator.add]
+
+def build_graph(llm, tools: list):
+    """model -> (tools -> model)* -> END; all tool calls of one turn run concurrently."""
+    bound = llm.bind_tools(tools)
+    by_name = {t.name: t for t in tools}
+
+    async def call_model(state: AgentState):
+        t0 = time.perf_counter()
+        msg = await bound.ainvoke(state["messages"])
+        return {"messages": [msg], "timings": [{"step": "model", "ms": _ms(t0)}]}
+
+    async def call_tool(call: dict):
+        t0 = time.perf_counter()
+        tool = by_name.get(call["name"])
+        try:
+            out = await tool.ainvoke(call["args"]) if tool else f"(error) unknown tool {call['name']}"
+        except Exception as e:
+            out = f"(error) {e}"
+        msg = ToolMessage(content=str(out), tool_call_id=call["id"], name=call["name"])
+        return msg, {"step": f"tool:{call['name']}", "ms": _ms(t0), "args": call["args"]}
+
+    async def call_tools(state: AgentState):
+        t0 = time.perf_counter()
+        done = await asyncio.gather(*(call_tool(c) for c in state["messages"][-1].tool_calls))
+        timings = [t for _, t in done] + [{"step": f"tools x{len(done)} (parallel)", "ms": _ms(t0)}]
+        return {"messages": [m for m, _ in done], "timings": timings}
+
+    def route(state: AgentState):
+        return "tools" if getattr(state["messages"][-1], "tool_calls", None) else END
+
+    sg = StateGraph(AgentState)
+    sg.add_node("model", call_model)
+    sg.add_node("tools", call_tools)
+    sg.add_edge(START, "model")
+    sg.add_conditional_edges("model", route, ["tools", END])
+    sg.add_edge("tools", "model")
+    return sg.compile()
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+class GraphAgent:
+    """LangGraph agent with the old `.run(question) -> str` interface.
+
+    Runs on the shared event loop in aio.py, where the async graph pool lives.
+    `last_timings` holds per-step timings of the most recent run.
+    """
+
+    def __init__(self, llm, tools: list, max_steps: int = AGENT_MAX_STEPS):
+        self.graph = build_graph(llm, tools)
+        self.max_steps = max_steps
+        self.last_timings = []
+
+    async def arun(self, question: str) -> str:
+        state = {"messages": [SystemMessage(SYSTEM_PROMPT), HumanMessage(question)], "timings": []}
+        out = await self.graph.ainvoke(state, {"recursion_limit": 2 * self.max_steps + 1})
+        self.last_timings = out["timings"]
+        return out["messages"][-1].content
+
+    def run(self, question: str) -> str:
+        return aio.run_sync(self.arun(question))
 
-def make_agent():
-    llm = ChatOpenAI(model=os.getenv("OPENAI_AGENT_MODEL","gpt-4o-mini"), temperature=0)
-    return initialize_agent(
-        tools=[run_cypher, upsert_program],
-        llm=llm,
-        agent=AgentType.OPENAI_FUNCTIONS,
-        verbose=True,
-    )
+def make_agent(llm=None, g=None, ag=None) -> GraphAgent:
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model=os.getenv("OPENAI_AGENT_MODEL", "gpt-4o-mini"), temperature=0)
+    # fresh result memo per agent session; reads share the process-wide async pool
+    return GraphAgent(llm, make_tools(g or get_graph(), ag or get_async_graph()))
 
 if __name__ == "__main__":
     agent = make_agent()
-    print(agent.run("List programs and their max amounts (top 5). Use Cypher."))
-    print(agent.run("Create a program 'Green SME Boost' managed by BMWK with max 40000€"))
-    print(agent.run("Now list programs managed by BMWK."))
+    for q in ["List programs and their max amounts (top 5). Use Cypher.",
+              "Create a program 'Green SME Boost' managed by BMWK with max 40000€",
+              "Now list programs managed by BMWK."]:
+        print(agent.run(q))
+        print("  ", agent.last_timings)
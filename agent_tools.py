@@ -1,32 +1,283 @@
 # agent_tools.py
-from langchain.tools import tool
-from falkordb import FalkorDB
 import os
+import re
+import threading
 
-FALKOR_HOST = os.getenv("FALKOR_HOST", "localhost")
-FALKOR_PORT = int(os.getenv("FALKOR_PORT", "6379"))
-FALKOR_PASSWORD = os.getenv("FALKOR_PASSWORD")
-GRAPH_NAME = os.getenv("GRAPH_NAME", "subsidy_demo")
-_graph = FalkorDB(host=FALKOR_HOST, port=FALKOR_PORT, password=FALKOR_PASSWORD).select_graph(GRAPH_NAME)
-
-@tool("run_cypher", return_direct=False)
-def run_cypher(query: str) -> str:
-    """Run a safe OpenCypher query (no DELETE/DROP/UPDATE). Returns rows."""
-    U = query.upper()
-    if any(k in U for k in [" DELETE ", " DROP ", " UPDATE ", " REMOVE ", " DETACH "]):
-        return "Refused: destructive query."
-    try:
-        rs = _graph.query(query).result_set
-        return "\n".join([", ".join(map(lambda x: str(x), row)) for row in rs]) or "(no results)"
-    except Exception as e:
-        return f"(error) {e}"
-
-@tool("upsert_program", return_direct=False)
-def upsert_program(name: str, authority: str = "", max_amount_eur: int | None = None) -> str:
-    """Create/Update a SubsidyProgram and link to Authority."""
-    _graph.query("MERGE (p:SubsidyProgram {name:$n}) SET p.max_amount_eur=coalesce($m,p.max_amount_eur)", {"n": name, "m": max_amount_eur})
-    if authority:
-        _graph.query("MERGE (a:Authority {name:$a})", {"a": authority})
-        _graph.query("""MATCH (p:SubsidyProgram {name:$n}),(a:Authority {name:$a}) MERGE (p)-[:MANAGED_BY]->(a)""",
-                    {"n": name, "a": authority})
-    return f"Upserted program='{name}', authority='{authority or '(none)'}', max={max_amount_eur}"
+from langchain_core.tools import StructuredTool
+from graph_client import get_graph
+import query_guard
+from results import column_names
+
+# Budget for what a tool call hands back to the LLM.
+AGENT_MAX_ROWS = int(os.getenv("AGENT_MAX_ROWS", "20"))
+AGENT_MAX_CHARS = int(os.getenv("AGENT_MAX_CHARS", "4000"))
+AGGREGATES = ("count", "sum", "avg", "min", "max", "group")
+
+def _fmt(v, width: int = 200) -> str:
+    s = str(v)
+    return s if len(s) <= width else s[:width - 1] + "…"
+
+def _parse_aggregate(spec: str) -> tuple:
+    fn, _, col = spec.partition(":")
+    fn, col = fn.strip().lower(), col.strip()
+    if fn not in AGGREGATES:
+        raise ValueError(f"unknown aggregate {spec!r}; use one of {', '.join(AGGREGATES)} (e.g. 'sum:max_eur')")
+    return fn, col
+
+def _mask(q: str) -> str:
+    """`q` with string literals and bracketed parts blanked, so keywords and commas found are top-level."""
+    out, depth, quote, escaped = [], 0, None, False
+    for ch in q:
+        if quote:
+            escaped, closing = ch == "\\" and not escaped, ch == quote and not escaped
+            quote = None if closing else quote
+            out.append(" ")
+            continue
+        if ch in "'\"`":
+            quote = ch
+        elif ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+        out.append(ch if depth == 0 and ch not in "'\"`([{)]}" else " ")
+    return "".join(out)
+
+def _ident(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+def aggregate_query(query: str, spec: str) -> str | None:
+    """Rewrite the final RETURN into WITH so FalkorDB aggregates over every row.
+
+    None when the query can't be rewritten (UNION, RETURN *); raises ValueError
+    for an unknown aggregate or column.
+    """
+    fn, col = _parse_aggregate(spec)
+    q = query.strip().rstrip(";").rstrip()
+    masked = _mask(q)
+    returns = list(re.finditer(r"\bRETURN\b", masked, re.I))
+    if not returns or re.search(r"\bUNION\b", masked, re.I):
+        return None
+    start = returns[-1].end()
+    tail = re.compile(r"\b(?:ORDER\s+BY|SKIP|LIMIT)\b", re.I).search(masked, start)
+    end = tail.start() if tail else len(q)
+    distinct = re.match(r"\s*DISTINCT\b", masked[start:end], re.I)
+    if distinct:
+        start += distinct.end()
+    cuts = [start] + [start + m.start() for m in re.finditer(",", masked[start:end])] + [end]
+    names, items = [], []
+    for a, b in zip(cuts, cuts[1:]):
+        lo = a + 1 if q[a] == "," else a
+        expr, aliases = q[lo:b].strip(), list(re.finditer(r"\s+AS\s", masked[lo:b], re.I))
+        if expr == "*":
+            return None
+        if aliases:
+            names.append(q[lo + aliases[-1].end():b].strip().strip("`").replace("``", "`"))
+            items.append(expr)
+        else:
+            names.append(expr)
+            items.append(f"{expr} AS {_ident(expr)}")
+    if fn != "count" and col not in names:
+        raise ValueError(f"unknown column {col!r}; columns are {', '.join(names)}")
+    ref = _ident(col)
+    final = {"count": "RETURN count(*) AS count",
+             "group": f"RETURN {ref} AS {ref}, count(*) AS count ORDER BY count DESC"}.get(
+        fn, f"RETURN {fn}({ref}) AS {_ident(f'{fn}({col})')}")
+    head = f"{q[:returns[-1].start()]}WITH {'DISTINCT ' if distinct else ''}{', '.join(items)} {q[end:]}"
+    return f"{head.rstrip()}\n{final}"
+
+def _aggregate(names: list, rows: list, spec: str) -> tuple:
+    """'count' or '<fn>:<column>' over rows already fetched -> (names, rows)."""
+    fn, col = _parse_aggregate(spec)
+    if fn == "count":
+        return ["count"], [[len(rows)]]
+    if col not in names:
+        raise ValueError(f"unknown column {col!r}; columns are {', '.join(names)}")
+    values = [r[names.index(col)] for r in rows]
+    if fn == "group":
+        counts = {}
+        for v in values:
+            counts[str(v)] = counts.get(str(v), 0) + 1
+        return [col, "count"], sorted(counts.items(), key=lambda kv: -kv[1])
+    nums = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    if not nums:
+        return [f"{fn}({col})"], [[None]]
+    value = {"sum": sum(nums), "avg": sum(nums) / len(nums), "min": min(nums), "max": max(nums)}[fn]
+    return [f"{fn}({col})"], [[value]]
+
+def shape_rows(header, rows: list, columns: str = "", aggregate: str = "",
+               max_rows: int = AGENT_MAX_ROWS, max_chars: int = AGENT_MAX_CHARS) -> str:
+    """Render rows for the LLM: optional projection/aggregation, then row and character caps."""
+    names = column_names(header) or [f"col_{i}" for i in range(len(rows[0]) if rows else 0)]
+    if columns:
+        wanted = [c.strip() for c in columns.split(",") if c.strip()]
+        missing = [c for c in wanted if c not in names]
+        if missing:
+            return f"(error) unknown column(s) {', '.join(missing)}; columns are {', '.join(names)}"
+        idx = [names.index(c) for c in wanted]
+        names, rows = wanted, [[r[i] for i in idx] for r in rows]
+    if aggregate:
+        try:
+            names, rows = _aggregate(names, rows, aggregate)
+        except ValueError as e:
+            return f"(error) {e}"
+    if not rows:
+        return "(no results)"
+    lines, used = [" | ".join(names)], len(names) * 8
+    shown = 0
+    for r in rows[:max(max_rows, 1)]:
+        line = " | ".join(_fmt(v) for v in r)
+        if used + len(line) > max_chars and shown:
+            break
+        lines.append(line)
+        used += len(line) + 1
+        shown += 1
+    if shown < len(rows):
+        lines.append(f"... {len(rows) - shown} more rows (use columns/aggregate or a narrower query)")
+    return "\n".join(lines)
+
+class ToolMemo:
+    """Per-session memo of guarded query results.
+
+    Cleared when this session writes (upsert_program) and whenever the graph
+    version moves on, so other writers are picked up too. `ag` (an AsyncGraph)
+    serves the async tool path.
+    """
+
+    def __init__(self, g, ag=None):
+        self.g, self.ag = g, ag
+        self._results = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _lookup(self, key: str, version: int):
+        with self._lock:
+            if version != self._version:
+                self._results.clear()
+                self._version = version
+            hit = self._results.get(key)
+        if hit is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return hit
+
+    def _keep(self, key: str, res):
+        if res.ok:
+            with self._lock:
+                self._results[key] = res
+        return res
+
+    def run(self, query: str):
+        key = " ".join(query.split())
+        hit = self._lookup(key, self.g.version())
+        return hit if hit is not None else self._keep(key, query_guard.run(self.g, query))
+
+    async def arun(self, query: str):
+        key = " ".join(query.split())
+        hit = self._lookup(key, await self.ag.version())
+        return hit if hit is not None else self._keep(key, await query_guard.arun(self.ag, query))
+
+    def invalidate(self):
+        with self._lock:
+            self._results.clear()
+            self._version = None
+
+_DESTRUCTIVE = [" DELETE ", " DROP ", " UPDATE ", " REMOVE ", " DETACH "]
+
+def _prepare(query: str, aggregate: str) -> tuple:
+    """(query to run, aggregate still to apply in Python); aggregates run in Cypher when possible."""
+    if not aggregate:
+        return query, ""
+    wrapped = aggregate_query(query, aggregate)
+    return (wrapped, "") if wrapped else (query, aggregate)
+
+def _format(res, columns: str, aggregate: str, max_rows: int) -> str:
+    if res.status == "rejected":
+        return f"Refused: too expensive ({res.reason}). Add filters or a LIMIT."
+    if not res.ok:
+        return f"({res.status}) {res.reason}"
+    out = shape_rows(res.header, res.rows, columns, aggregate, min(int(max_rows), AGENT_MAX_ROWS * 5))
+    if aggregate and len(res.rows) >= query_guard.GUARD_LIMIT:
+        out += (f"\n(warning: aggregate covers only the first {len(res.rows)} rows; the result was truncated "
+                "at the guard LIMIT, so the true value may differ)")
+    return out
+
+_UPSERT_QUERIES = (
+    "MERGE (p:SubsidyProgram {name:$n}) SET p.max_amount_eur=coalesce($m,p.max_amount_eur)",
+    "MERGE (a:Authority {name:$a})",
+    "MATCH (p:SubsidyProgram {name:$n}),(a:Authority {name:$a}) MERGE (p)-[:MANAGED_BY]->(a)",
+)
+
+def make_tools(g=None, ag=None, memo: ToolMemo | None = None) -> list:
+    """[run_cypher, upsert_program] bound to one agent session's memo.
+
+    With an AsyncGraph `ag` the tools also get coroutines, so an async agent
+    can run several calls concurrently over the async pool.
+    """
+    g = g or get_graph()
+    memo = memo or ToolMemo(g, ag)
+
+    def run_cypher(query: str, columns: str = "", aggregate: str = "", max_rows: int = AGENT_MAX_ROWS) -> str:
+        """Run a read-only OpenCypher query. Output is capped; narrow it with `columns`
+        (comma-separated RETURN aliases), `aggregate` ('count', or 'sum|avg|min|max|group:<column>',
+        computed by the database over all matching rows) and `max_rows`."""
+        if any(k in query.upper() for k in _DESTRUCTIVE):
+            return "Refused: destructive query."
+        try:
+            query, py_aggregate = _prepare(query, aggregate)
+        except ValueError as e:
+            return f"(error) {e}"
+        if aggregate and not py_aggregate:  # aggregated in Cypher: the projection no longer applies
+            columns = ""
+        return _format(memo.run(query), columns, py_aggregate, max_rows)
+
+    async def arun_cypher(query: str, columns: str = "", aggregate: str = "", max_rows: int = AGENT_MAX_ROWS) -> str:
+        if any(k in query.upper() for k in _DESTRUCTIVE):
+            return "Refused: destructive query."
+        try:
+            query, py_aggregate = _prepare(query, aggregate)
+        except ValueError as e:
+            return f"(error) {e}"
+        if aggregate and not py_aggregate:  # aggregated in Cypher: the projection no longer applies
+            columns = ""
+        return _format(await memo.arun(query), columns, py_aggregate, max_rows)
+
+    def upsert_program(name: str, authority: str = "", max_amount_eur: int | None = None) -> str:
+        """Create/Update a SubsidyProgram and link to Authority."""
+        g.query(_UPSERT_QUERIES[0], {"n": name, "m": max_amount_eur}, idempotent=True)
+        if authority:
+            g.query(_UPSERT_QUERIES[1], {"a": authority}, idempotent=True)
+            g.query(_UPSERT_QUERIES[2], {"n": name, "a": authority}, idempotent=True)
+        g.bump_version()
+        memo.invalidate()
+        return f"Upserted program='{name}', authority='{authority or '(none)'}', max={max_amount_eur}"
+
+    async def aupsert_program(name: str, authority: str = "", max_amount_eur: int | None = None) -> str:
+        await ag.query(_UPSERT_QUERIES[0], {"n": name, "m": max_amount_eur}, idempotent=True)
+        if authority:
+            await ag.query(_UPSERT_QUERIES[1], {"a": authority}, idempotent=True)
+            await ag.query(_UPSERT_QUERIES[2], {"n": name, "a": authority}, idempotent=True)
+        await ag.bump_version()
+        memo.invalidate()
+        return f"Upserted program='{name}', authority='{authority or '(none)'}', max={max_amount_eur}"
+
+    return [
+        StructuredTool.from_function(func=run_cypher, coroutine=arun_cypher if ag else None, name="run_cypher"),
+        StructuredTool.from_function(func=upsert_program, coroutine=aupsert_program if ag else None,
+                                     name="upsert_program"),
+    ]
+
+# Module-level tools for existing imports, built on first access so importing this
+# module doesn't connect; each make_agent() builds its own set.
+_default_tools = None
+_default_lock = threading.Lock()
+
+def __getattr__(name: str):
+    global _default_tools
+    if name not in ("run_cypher", "upsert_program"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _default_lock:
+        if _default_tools is None:
+            _default_tools = dict(zip(("run_cypher", "upsert_program"), make_tools()))
+    return _default_tools[name]
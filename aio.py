@@ -0,0 +1,48 @@
+# aio.py
+import asyncio
+import queue
+import threading
+
+# One long-lived event loop on a daemon thread. Async clients (HTTP sessions,
+# async graph pools) are bound to the loop that created them, so keeping a
+# single loop lets sync callers (Streamlit, CLI) reuse those connections.
+_loop = None
+_lock = threading.Lock()
+
+def loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="aio-loop", daemon=True).start()
+        return _loop
+
+def run_sync(coro, timeout: float | None = None):
+    """Run a coroutine on the shared loop and block for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, loop()).result(timeout)
+
+def iter_sync(agen):
+    """Consume an async iterator on the shared loop as a plain generator."""
+    q = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in agen:
+                q.put(("item", item))
+        except BaseException as e:
+            q.put(("error", e))
+        else:
+            q.put(("done", None))
+
+    fut = asyncio.run_coroutine_threadsafe(pump(), loop())
+    try:
+        while True:
+            kind, value = q.get()
+            if kind == "item":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        fut.cancel()
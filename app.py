@@ -1,20 +1,18 @@
 # app.py
 import os
 import yaml
-from falkordb import FalkorDB
+import graph_client
+from graph_client import GRAPH_NAME
+from schema_sync import sync_schema
 
 # -----------------------------
-# Connection (env-friendly)
+# Connection (env-friendly, see graph_client.py)
 # -----------------------------
-FALKOR_HOST = os.getenv("FALKOR_HOST", "localhost")
-FALKOR_PORT = int(os.getenv("FALKOR_PORT", "6379"))
-FALKOR_PASSWORD = os.getenv("FALKOR_PASSWORD")  # optional
-GRAPH_NAME = os.getenv("GRAPH_NAME", "subsidy_demo")
-RESET_GRAPH = os.getenv("RESET_GRAPH", "1")  # "1" to reset on run (dev only)
+# "1"/"0" to force a reset on run (dev only); unset resets before seeding the demo, never before loading files
+RESET_GRAPH = os.getenv("RESET_GRAPH")
 
 def get_graph():
-    client = FalkorDB(host=FALKOR_HOST, port=FALKOR_PORT, password=FALKOR_PASSWORD)
-    return client.select_graph(GRAPH_NAME)
+    return graph_client.get_graph(GRAPH_NAME)
 
 g = get_graph()
 
@@ -38,118 +36,213 @@ def ensure_rel(rel: str, src: str, dst: str):
 # -----------------------------
 # Upsert helpers
 # -----------------------------
-def merge_node(label: str, props: dict):
-    """Upsert node by `name` (your chosen key across labels)."""
+MERGE_BATCH_SIZE = int(os.getenv("MERGE_BATCH_SIZE", "5000"))  # rows per UNWIND query
+
+def _chunks(rows: list, n: int):
+    for i in range(0, len(rows), n):
+        yield rows[i:i + n]
+
+# Company fields restricted to the ontology's allowed_* lists
+_ALLOWED = {"Company": [(f, set(ONT[key])) for f, key in
+                        (("sector", "allowed_sectors"), ("region", "allowed_regions"), ("size", "allowed_sizes"))]}
+
+def check_nodes(label: str, rows: list):
+    """Validate a whole batch: the label once, then each field's values as one set."""
     ensure_label(label)
-    if label == "Company":
-        if props.get("sector") not in ONT["allowed_sectors"]:
-            raise ValueError("Sector not allowed")
-        if props.get("region") not in ONT["allowed_regions"]:
-            raise ValueError("Region not allowed")
-        if props.get("size") not in ONT["allowed_sizes"]:
-            raise ValueError("Size not allowed")
-    if "name" not in props:
+    if any("name" not in props for props in rows):
         raise ValueError(f"{label} requires a `name` property for MERGE key.")
-    g.query(f"MERGE (n:{label} {{name:$name}}) SET n += $props",
-            {"name": props["name"], "props": props})
+    for field, allowed in _ALLOWED.get(label, ()):
+        bad = {props.get(field) for props in rows} - allowed
+        if bad:
+            raise ValueError(f"{field.capitalize()} not allowed: {', '.join(sorted(map(str, bad)))}")
 
-def merge_edge(rel: str, src_label: str, src_name: str, dst_label: str, dst_name: str, eprops: dict | None = None):
-    """Upsert relationship with optional edge properties."""
+def check_node(label: str, props: dict):
+    check_nodes(label, [props])
+
+def merge_nodes(label: str, rows):
+    """Validate a batch of `label` nodes, then upsert it by `name` with one UNWIND per chunk."""
+    rows = list(rows)
+    check_nodes(label, rows)
+    for chunk in _chunks(rows, MERGE_BATCH_SIZE):
+        g.query(f"UNWIND $rows AS row MERGE (n:{label} {{name:row.name}}) SET n += row",
+                {"rows": chunk}, idempotent=True)
+    if rows:
+        g.bump_version()
+
+def merge_node(label: str, props: dict):
+    """Upsert node by `name` (your chosen key across labels)."""
+    merge_nodes(label, [props])
+
+def merge_edges(rel: str, pairs, src_label: str | None = None, dst_label: str | None = None):
+    """Upsert a batch of `rel` edges given as (src_name, dst_name[, eprops]) tuples.
+
+    Endpoint labels default to the relation's `from`/`to` in the ontology.
+    """
+    spec = ONT["relations"].get(rel)
+    if spec is None:
+        raise ValueError(f"Unknown relation: {rel}")
+    src_label, dst_label = src_label or spec["from"], dst_label or spec["to"]
     ensure_rel(rel, src_label, dst_label)
+    rows = []
+    for pair in pairs:
+        s, d, eprops = (tuple(pair) + (None,))[:3]
+        rows.append({"s": s, "d": d, "p": eprops or {}})
     q = f"""
-    MERGE (s:{src_label} {{name:$s}})
-    MERGE (d:{dst_label} {{name:$d}})
+    UNWIND $rows AS row
+    MERGE (s:{src_label} {{name:row.s}})
+    MERGE (d:{dst_label} {{name:row.d}})
     MERGE (s)-[r:{rel}]->(d)
-    SET r += $eprops
+    SET r += row.p
+    """
+    for chunk in _chunks(rows, MERGE_BATCH_SIZE):
+        g.query(q, {"rows": chunk}, idempotent=True)
+    if rows:
+        g.bump_version()
+
+def merge_edge(rel: str, src_label: str, src_name: str, dst_label: str, dst_name: str, eprops: dict | None = None):
+    """Upsert relationship with optional edge properties."""
+    merge_edges(rel, [(src_name, dst_name, eprops)], src_label, dst_label)
+
+# -----------------------------
+# File loaders (same batched path)
+# -----------------------------
+_CASTS = {"int": int, "float": float}
+
+def _casts(spec: dict) -> dict:
+    """property -> cast for the `numeric` properties of an ontology node or relation."""
+    return {p: _CASTS[t] for p, t in (spec.get("numeric") or {}).items()}
+
+def _coerce(row: dict, casts: dict, what: str) -> dict:
+    """Non-empty CSV cells; numeric properties cast, everything else (e.g. "001") kept as text."""
+    out = {}
+    for k, v in row.items():
+        if v == "":
+            continue
+        try:
+            out[k] = casts[k](v) if k in casts else v
+        except ValueError:
+            raise ValueError(f"{what}.{k}: expected a number, got {v!r}") from None
+    return out
+
+def load_csv(path: str, label: str | None = None, rel: str | None = None):
+    """Load `<Label>.csv` (node properties) or `<REL>.csv` (src,dst + edge properties).
+
+    The target defaults to the file name; empty cells are skipped.
     """
-    g.query(q, {"s": src_name, "d": dst_name, "eprops": eprops or {}})
+    import csv
+    name = os.path.splitext(os.path.basename(path))[0]
+    if not label and not rel:
+        label, rel = (name, None) if name in ONT["nodes"] else (None, name)
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if label:
+            ensure_label(label)
+            casts, batch = _casts(ONT["nodes"][label]), []
+            for row in reader:
+                batch.append(_coerce(row, casts, label))
+                if len(batch) >= MERGE_BATCH_SIZE:
+                    merge_nodes(label, batch)
+                    batch = []
+            merge_nodes(label, batch)
+        else:
+            if rel not in ONT["relations"]:
+                raise ValueError(f"Unknown relation: {rel}")
+            casts, batch = _casts(ONT["relations"][rel]), []
+            for row in reader:
+                s, d = row.pop("src"), row.pop("dst")
+                batch.append((s, d, _coerce(row, casts, rel)))
+                if len(batch) >= MERGE_BATCH_SIZE:
+                    merge_edges(rel, batch)
+                    batch = []
+            merge_edges(rel, batch)
+
+def load_yaml(path: str):
+    """Load `{nodes: {Label: [props, ...]}, edges: {REL: [[src, dst, {props}], ...]}}`."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    for label, rows in (data.get("nodes") or {}).items():
+        merge_nodes(label, rows)
+    for rel, pairs in (data.get("edges") or {}).items():
+        merge_edges(rel, pairs)
+
+def load_file(path: str):
+    if path.endswith((".yaml", ".yml")):
+        load_yaml(path)
+    elif path.endswith(".csv"):
+        load_csv(path)
+    else:
+        raise ValueError(f"Unsupported file type: {path}")
 
 # -----------------------------
 # Seed data
 # -----------------------------
 def seed_demo():
-    # Companies
-    merge_node("Company", {
-        "name": "ACME Maschinenbau GmbH", "sector": "manufacturing",
-        "size": "small", "region": "DE-NW", "founded_year": 2018
-    })
-    merge_node("Company", {
-        "name": "TemplateSoftBY", "sector": "software",
-        "size": "medium", "region": "DE-BY", "founded_year": 2020
-    })
-    merge_node("Company", {
-        "name": "TemplateEnergyBE", "sector": "energy",
-        "size": "small", "region": "DE-BE", "founded_year": 2019
-    })
-
-    # Authorities
-    merge_node("Authority", {"name": "BMWK", "country": "DE", "url": "https://www.bmwk.de"})
-    merge_node("Authority", {"name": "KfW",  "country": "DE", "url": "https://www.kfw.de"})
-
-    # Documents
-    for n, d in [
+    merge_nodes("Company", [
+        {"name": "ACME Maschinenbau GmbH", "sector": "manufacturing",
+         "size": "small", "region": "DE-NW", "founded_year": 2018},
+        {"name": "TemplateSoftBY", "sector": "software",
+         "size": "medium", "region": "DE-BY", "founded_year": 2020},
+        {"name": "TemplateEnergyBE", "sector": "energy",
+         "size": "small", "region": "DE-BE", "founded_year": 2019},
+    ])
+
+    merge_nodes("Authority", [
+        {"name": "BMWK", "country": "DE", "url": "https://www.bmwk.de"},
+        {"name": "KfW",  "country": "DE", "url": "https://www.kfw.de"},
+    ])
+
+    merge_nodes("Document", [{"name": n, "description": d} for n, d in [
         ("Business Plan", "Kurzbeschreibung"),
         ("Financial Statements", "Bilanzen/GuV 2 Jahre"),
         ("Company Registration", "Handelsregisterauszug"),
         ("Energy Audit Report", "DIN 18599/16247"),
-    ]:
-        merge_node("Document", {"name": n, "description": d})
+    ]])
 
-    # Criteria
-    for code, desc in [
+    merge_nodes("EligibilityCriterion", [{"name": code, "code": code, "description": desc} for code, desc in [
         ("SME_DEF", "EU-KMU"),
         ("REGION_TARGET", "Sitz in Zielregion"),
         ("ENERGY_SAVING", ">10% Energieeinsparung"),
-    ]:
-        merge_node("EligibilityCriterion", {"name": code, "code": code, "description": desc})
-
-    # Programs
-    merge_node("SubsidyProgram", {
-        "name": "KMU Innovationsgutschein", "level": "federal",
-        "max_amount_eur": 25000, "cofund_rate": 0.5, "deadline": "rolling"
-    })
-    merge_node("SubsidyProgram", {
-        "name": "Digitalisierung Mittelstand NRW", "level": "state",
-        "max_amount_eur": 15000, "cofund_rate": 0.4, "deadline": "2025-12-31"
-    })
-    merge_node("SubsidyProgram", {
-        "name": "Energieeffizienz Plus", "level": "federal",
-        "max_amount_eur": 50000, "cofund_rate": 0.6, "deadline": "rolling"
-    })
-
-    # Program ↔ Template companies (demo)
-    merge_edge("APPLIES_TO_SECTOR", "SubsidyProgram", "KMU Innovationsgutschein", "Company", "TemplateSoftBY")
-    merge_edge("APPLIES_TO_REGION", "SubsidyProgram", "KMU Innovationsgutschein", "Company", "TemplateSoftBY")
-
-    merge_edge("APPLIES_TO_SECTOR", "SubsidyProgram", "Energieeffizienz Plus", "Company", "TemplateEnergyBE")
-    merge_edge("APPLIES_TO_REGION", "SubsidyProgram", "Energieeffizienz Plus", "Company", "TemplateEnergyBE")
-
-    # Program ↔ ACME
-    for prog in ["KMU Innovationsgutschein", "Digitalisierung Mittelstand NRW", "Energieeffizienz Plus"]:
-        merge_edge("APPLIES_TO_SECTOR", "SubsidyProgram", prog, "Company", "ACME Maschinenbau GmbH")
-        merge_edge("APPLIES_TO_REGION", "SubsidyProgram", prog, "Company", "ACME Maschinenbau GmbH")
-
-    # Program ↔ Authority
-    merge_edge("MANAGED_BY", "SubsidyProgram", "KMU Innovationsgutschein", "Authority", "BMWK")
-    merge_edge("MANAGED_BY", "SubsidyProgram", "Digitalisierung Mittelstand NRW", "Authority", "BMWK")
-    merge_edge("MANAGED_BY", "SubsidyProgram", "Energieeffizienz Plus", "Authority", "KfW")
-
-    # Program ↔ Required documents
-    for prog, doc in [
+    ]])
+
+    merge_nodes("SubsidyProgram", [
+        {"name": "KMU Innovationsgutschein", "level": "federal",
+         "max_amount_eur": 25000, "cofund_rate": 0.5, "deadline": "rolling"},
+        {"name": "Digitalisierung Mittelstand NRW", "level": "state",
+         "max_amount_eur": 15000, "cofund_rate": 0.4, "deadline": "2025-12-31"},
+        {"name": "Energieeffizienz Plus", "level": "federal",
+         "max_amount_eur": 50000, "cofund_rate": 0.6, "deadline": "rolling"},
+    ])
+
+    # Program ↔ Template companies (demo) and ACME
+    applies = [
+        ("KMU Innovationsgutschein", "TemplateSoftBY"),
+        ("Energieeffizienz Plus", "TemplateEnergyBE"),
+    ] + [(prog, "ACME Maschinenbau GmbH")
+         for prog in ["KMU Innovationsgutschein", "Digitalisierung Mittelstand NRW", "Energieeffizienz Plus"]]
+    merge_edges("APPLIES_TO_SECTOR", applies)
+    merge_edges("APPLIES_TO_REGION", applies)
+
+    merge_edges("MANAGED_BY", [
+        ("KMU Innovationsgutschein", "BMWK"),
+        ("Digitalisierung Mittelstand NRW", "BMWK"),
+        ("Energieeffizienz Plus", "KfW"),
+    ])
+
+    merge_edges("REQUIRES_DOCUMENT", [
         ("KMU Innovationsgutschein", "Business Plan"),
         ("KMU Innovationsgutschein", "Company Registration"),
         ("Digitalisierung Mittelstand NRW", "Business Plan"),
         ("Digitalisierung Mittelstand NRW", "Financial Statements"),
         ("Energieeffizienz Plus", "Energy Audit Report"),
         ("Energieeffizienz Plus", "Company Registration"),
-    ]:
-        merge_edge("REQUIRES_DOCUMENT", "SubsidyProgram", prog, "Document", doc)
+    ])
 
-    # Program ↔ Eligibility
-    merge_edge("ELIGIBLE_IF", "SubsidyProgram", "KMU Innovationsgutschein", "EligibilityCriterion", "SME_DEF")
-    merge_edge("ELIGIBLE_IF", "SubsidyProgram", "Digitalisierung Mittelstand NRW", "EligibilityCriterion", "SME_DEF")
-    merge_edge("ELIGIBLE_IF", "SubsidyProgram", "Digitalisierung Mittelstand NRW", "EligibilityCriterion", "REGION_TARGET")
-    merge_edge("ELIGIBLE_IF", "SubsidyProgram", "Energieeffizienz Plus", "EligibilityCriterion", "ENERGY_SAVING")
+    merge_edges("ELIGIBLE_IF", [
+        ("KMU Innovationsgutschein", "SME_DEF"),
+        ("Digitalisierung Mittelstand NRW", "SME_DEF"),
+        ("Digitalisierung Mittelstand NRW", "REGION_TARGET"),
+        ("Energieeffizienz Plus", "ENERGY_SAVING"),
+    ])
 
     # Optional: provenance sample (only if defined in ontology)
     if "SourceDoc" in ONT["nodes"] and "EXTRACTED_FROM" in ONT["relations"]:
@@ -165,8 +258,31 @@ def seed_demo():
 # -----------------------------
 # Query helper
 # -----------------------------
+# Canonical demo queries (also timed by bench.py)
+SAMPLE_QUERIES = {
+    "acme_programs": """
+    MATCH (:Company {name:'ACME Maschinenbau GmbH'})
+          <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
+    RETURN DISTINCT p.name, p.max_amount_eur, p.cofund_rate, p.deadline
+    ORDER BY p.max_amount_eur DESC
+    """,
+    "program_documents": """
+    MATCH (p:SubsidyProgram)-[:REQUIRES_DOCUMENT]->(d:Document)
+    RETURN p.name AS program, collect(d.name) AS docs
+    ORDER BY program
+    """,
+    "acme_programs_context": """
+    MATCH (:Company {name:'ACME Maschinenbau GmbH'})
+        <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
+    OPTIONAL MATCH (p)-[:REQUIRES_DOCUMENT]->(d:Document)
+    OPTIONAL MATCH (p)-[:MANAGED_BY]->(a:Authority)
+    RETURN p.name AS program, a.name AS authority, collect(DISTINCT d.name) AS docs
+    ORDER BY program
+    """,
+}
+
 def run(q: str):
-    rs = g.query(q).result_set
+    rs = g.ro_query(q).result_set
     print("\nCypher:\n", q.strip(), "\nResult:")
     for row in rs:
         print(row)
@@ -175,31 +291,25 @@ def run(q: str):
 # Main
 # -----------------------------
 if __name__ == "__main__":
-    if RESET_GRAPH == "1":
+    import sys
+    files = [a for a in sys.argv[1:] if a != "--reset"]
+    reset = "--reset" in sys.argv[1:] or (RESET_GRAPH == "1" if RESET_GRAPH is not None else not files)
+    if reset:
         g.query("MATCH (n) DETACH DELETE n")
+        g.bump_version()
+    for change in sync_schema(g, ONT):
+        print("Schema:", change)
+
+    if files:
+        # python app.py [--reset] data.yaml Company.csv MANAGED_BY.csv ...
+        for path in files:
+            load_file(path)
+            print("Loaded", path)
+        sys.exit(0)
 
     seed_demo()
     print("Seeded ✅")
 
     # sample queries
-    run("""
-    MATCH (:Company {name:'ACME Maschinenbau GmbH'})
-          <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
-    RETURN DISTINCT p.name, p.max_amount_eur, p.cofund_rate, p.deadline
-    ORDER BY p.max_amount_eur DESC
-    """)
-
-    run("""
-    MATCH (p:SubsidyProgram)-[:REQUIRES_DOCUMENT]->(d:Document)
-    RETURN p.name AS program, collect(d.name) AS docs
-    ORDER BY program
-    """)
-
-    run("""
-    MATCH (:Company {name:'ACME Maschinenbau GmbH'})
-        <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
-    OPTIONAL MATCH (p)-[:REQUIRES_DOCUMENT]->(d:Document)
-    OPTIONAL MATCH (p)-[:MANAGED_BY]->(a:Authority)
-    RETURN p.name AS program, a.name AS authority, collect(DISTINCT d.name) AS docs
-    ORDER BY program
-    """)
+    for q in SAMPLE_QUERIES.values():
+        run(q)
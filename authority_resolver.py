@@ -0,0 +1,91 @@
+# authority_resolver.py
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, List
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+def _grams(name: str, n: int = 3) -> set:
+    s = f" {name.lower().strip()} "
+    return {s[i:i + n] for i in range(max(len(s) - n + 1, 1))}
+
+class AuthorityResolver:
+    """In-memory fuzzy matcher for Authority names.
+
+    Names are loaded once and blocked by character trigrams, so each lookup only
+    scores names that share at least `min_shared` trigrams with the query. Whole
+    batches are scored with a single vectorized `rapidfuzz.process.cdist` call.
+    """
+
+    def __init__(self, names: Iterable[str] = (), threshold: float = 90, min_shared: int = 2):
+        self.threshold = threshold
+        self.min_shared = min_shared
+        self._names: List[str] = []
+        self._ids = {}
+        self._block = defaultdict(set)
+        self._lock = threading.Lock()
+        for n in names:
+            self._add(n)
+
+    @classmethod
+    def from_graph(cls, g, **kwargs) -> "AuthorityResolver":
+        rs = g.ro_query("MATCH (a:Authority) RETURN a.name").result_set
+        return cls([r[0] for r in rs if r[0]], **kwargs)
+
+    def __len__(self):
+        return len(self._names)
+
+    def _add(self, name: str):
+        if name in self._ids:
+            return
+        self._ids[name] = len(self._names)
+        self._names.append(name)
+        for gram in _grams(name):
+            self._block[gram].add(self._ids[name])
+
+    def add(self, name: str):
+        with self._lock:
+            self._add(name)
+
+    def _candidates(self, name: str) -> List[int]:
+        grams = _grams(name)
+        need = min(self.min_shared, len(grams))
+        shared = Counter(i for gram in grams for i in self._block.get(gram, ()))
+        return [i for i, c in shared.items() if c >= need]
+
+    def resolve_many(self, names: Iterable[str]) -> List[str]:
+        """Map each name to a known authority (score > threshold) or register it as new."""
+        names = list(names)
+        uniq = list(dict.fromkeys(names))
+        with self._lock:
+            blocks = [self._candidates(n) for n in uniq]
+            cols = sorted(set().union(*blocks)) if blocks else []
+            resolved = {}
+            if cols:
+                scores = process.cdist(uniq, [self._names[i] for i in cols], scorer=fuzz.WRatio)
+                pos = {c: j for j, c in enumerate(cols)}
+                mask = np.zeros_like(scores, dtype=bool)
+                for row, block in enumerate(blocks):
+                    mask[row, [pos[c] for c in block]] = True
+                scores = np.where(mask, scores, 0)
+                best = scores.argmax(axis=1)
+                for row, n in enumerate(uniq):
+                    if scores[row, best[row]] > self.threshold:
+                        resolved[n] = self._names[cols[best[row]]]
+            added = []
+            for n in uniq:
+                if n in resolved:
+                    continue
+                # names first seen earlier in this batch are not in the cdist matrix
+                hit = process.extractOne(n, added, scorer=fuzz.WRatio) if added else None
+                if hit and hit[1] > self.threshold:
+                    resolved[n] = hit[0]
+                else:
+                    resolved[n] = n
+                    added.append(n)
+                    self._add(n)
+        return [resolved[n] for n in names]
+
+    def resolve(self, name: str) -> str:
+        return self.resolve_many([name])[0]
@@ -0,0 +1,237 @@
+# bench.py
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_GRAPH = os.getenv("BENCH_GRAPH", "subsidy_bench")  # never the app graph: it is wiped per size
+BENCH_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.2"))  # allowed relative slowdown vs baseline
+
+QUESTIONS = [
+    "Which subsidies apply to ACME?",
+    "Programs for small manufacturing companies in NRW with at least 20000 EUR",
+    "Which documents do I need for energy programs in Bavaria?",
+    "Who manages programs for medium software firms?",
+    "Förderprogramme für KMU in Berlin mit Kofinanzierung über 50%",
+    "programs with deadline before 2026 for logistics companies",
+]
+SAMPLE_TEXT = """Programm: Energieeffizienz Plus {i}
+Bewilligungsstelle: KfW
+Höchstfördersumme: € 50.000
+Kofinanzierung: 60 %
+Stichtag: 2025-12-31
+Antragsberechtigt sind KMU mit Sitz in Deutschland. Einzureichen sind Business Plan,
+Finanzplan und Energieaudit. Gefördert werden Maßnahmen mit 10% Energie Einsparung.
+"""
+
+def timed(fn, repeat: int, warmup: int = 1) -> list:
+    """Wall times of `repeat` calls in ms, after `warmup` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+def latency(name: str, times: list, **extra) -> dict:
+    times = sorted(times)
+    p95 = times[min(len(times) - 1, int(0.95 * len(times)))]
+    return {"name": name, "unit": "ms", "better": "lower", "value": statistics.median(times),
+            "p95": p95, "mean": statistics.fmean(times), "n": len(times), **extra}
+
+def throughput(name: str, count: int, seconds: float, unit: str, **extra) -> dict:
+    return {"name": name, "unit": unit, "better": "higher", "value": count / seconds if seconds else 0.0,
+            "n": count, **extra}
+
+# -----------------------------
+# Benchmarks that need no database
+# -----------------------------
+def bench_extract(docs: int = 200, pages: int = 10) -> list:
+    import fitz
+    from ingest import pdf_text, rule_extract
+    texts = [SAMPLE_TEXT.format(i=i) * 3 for i in range(docs)]
+    t0 = time.perf_counter()
+    for t in texts:
+        rule_extract(t)
+    elapsed = time.perf_counter() - t0
+    results = [throughput("extract.rule_extract", docs, elapsed, "docs/s",
+                          mb_per_s=sum(len(t.encode()) for t in texts) / 1e6 / elapsed)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pdf")
+        with fitz.open() as pdf:
+            for i in range(pages):
+                page = pdf.new_page()
+                page.insert_textbox(page.rect, SAMPLE_TEXT.format(i=i) * 4)
+            pdf.save(path)
+        times = timed(lambda: pdf_text(path), repeat=20)
+        results.append(latency("extract.pdf_text", times, pages=pages))
+        results.append(throughput("extract.pdf_pages", pages * len(times), sum(times) / 1000, "pages/s"))
+    return results
+
+def bench_rules(repeat: int = 2000) -> list:
+    from nl2cypher import generate_with_rules
+    qs = (QUESTIONS * (repeat // len(QUESTIONS) + 1))[:repeat]
+    it = iter(qs)
+    times = timed(lambda: generate_with_rules(next(it)), repeat=repeat - 1)
+    return [latency("rules.generate_with_rules", times)]
+
+# -----------------------------
+# Graph benchmarks
+# -----------------------------
+def connect(host: str | None = None, port: int | None = None, lite: str | None = None):
+    """Bench graph on a FalkorDB server, or an embedded falkordblite instance; None if unavailable."""
+    from graph_client import Graph, get_graph
+    try:
+        if lite:
+            try:
+                from redislite.falkordb_client import FalkorDB
+            except ImportError:
+                raise RuntimeError("--lite needs the optional falkordblite package (pip install -r requirements-bench.txt)")
+            g = Graph(FalkorDB(lite).select_graph(BENCH_GRAPH))
+        else:
+            g = get_graph(BENCH_GRAPH, host, port)
+        g.ro_query("RETURN 1")
+        return g
+    except Exception as e:
+        print(f"Graph benchmarks skipped: {e}", file=sys.stderr)
+        return None
+
+def seed_scaled(g, programs: int):
+    """Wipe the bench graph and load a synth.py graph with `programs` programs and proportional companies.
+
+    Deterministic: the same size always yields the same graph. Writes use
+    CREATE since the graph was just emptied.
+    """
+    from schema_sync import load_ontology, sync_schema
+    from synth import SynthSpec, edges, nodes
+    ont = load_ontology()
+    g.query("MATCH (n) DETACH DELETE n")
+    sync_schema(g, ont)
+    spec = SynthSpec(programs=programs, companies=max(programs // 4, 100), authorities=25, documents=12, criteria=8)
+    for label, rows in nodes(spec, ont):
+        g.query(f"UNWIND $rows AS row CREATE (n:{label}) SET n = row", {"rows": rows})
+    for rel, pairs in edges(spec):
+        ends = ont["relations"][rel]
+        g.query(f"""UNWIND $rows AS row
+                    MATCH (s:{ends['from']} {{name:row[0]}}), (d:{ends['to']} {{name:row[1]}})
+                    CREATE (s)-[:{rel}]->(d)""", {"rows": [list(p) for p in pairs]})
+    g.bump_version()
+
+def bench_upsert(g, count: int = 200) -> list:
+    from ingest import rule_extract, upsert_programs
+    exts = [rule_extract(SAMPLE_TEXT.format(i=f"bench-{i}")) for i in range(count)]
+    t0 = time.perf_counter()
+    for i, ext in enumerate(exts):
+        upsert_programs([(ext, f"bench-{i}.pdf")], g=g)
+    single = throughput("upsert.single", count, time.perf_counter() - t0, "writes/s")
+    t0 = time.perf_counter()
+    upsert_programs([(ext, f"bench-{i}.pdf") for i, ext in enumerate(exts)], g=g)
+    return [single, throughput("upsert.batched", count, time.perf_counter() - t0, "writes/s")]
+
+def bench_queries(g, size: int, repeat: int = 20) -> list:
+    from app import SAMPLE_QUERIES
+    from nl2cypher import generate_with_rules, load_authorities, top5_by_max_amount
+    from rec_index import RecommenderIndex
+    queries = {**{f"app.{k}": (q, None) for k, q in SAMPLE_QUERIES.items()},
+               "top5_by_max_amount": (top5_by_max_amount(), None)}
+    load_authorities(g)
+    for i, q in enumerate(QUESTIONS):
+        queries[f"rules.q{i}"] = generate_with_rules(q)
+    results = []
+    for name, (q, params) in queries.items():
+        times = timed(lambda: g.ro_query(q, params), repeat=repeat)
+        results.append(latency(f"query.{name}@{size}", times, size=size))
+    index = RecommenderIndex()
+    results.append(latency(f"recommender.build@{size}", timed(lambda: index.build(g), repeat=3), size=size))
+    from schema_sync import load_ontology
+    ont = load_ontology()
+    profiles = [(s, z, r) for s in ont["allowed_sectors"] for z in ont["allowed_sizes"] for r in ont["allowed_regions"]]
+    it = iter(profiles * (repeat * 10 // len(profiles) + 2))
+    times = timed(lambda: index.recommend(*next(it), min_amount=10000), repeat=repeat * 10)
+    results.append(latency(f"recommender.recommend@{size}", times, size=size))
+    return results
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def environment() -> dict:
+    import numpy as np
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "commit": commit, "ts": int(time.time())}
+
+def compare(results: list, baseline: dict, tolerance: float = BENCH_TOLERANCE) -> list:
+    """[(name, baseline value, value, relative change)] for results worse than `tolerance`."""
+    base = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = base.get(r["name"])
+        if not b or not b["value"]:
+            continue
+        change = (r["value"] - b["value"]) / b["value"]
+        worse = change > tolerance if r["better"] == "lower" else change < -tolerance
+        if worse:
+            regressions.append((r["name"], b["value"], r["value"], change))
+    return regressions
+
+def run(sizes=(1000, 10000), host=None, port=None, lite=None, only=None) -> dict:
+    want = lambda part: not only or part in only
+    results, skipped = [], []
+    if want("extract"):
+        results += bench_extract()
+    if want("rules"):
+        results += bench_rules()
+    if want("upsert") or want("queries"):
+        g = connect(host, port, lite)
+        if g is None:
+            skipped += [p for p in ("upsert", "queries") if want(p)]
+        else:
+            for size in sizes:
+                print(f"Seeding {size} programs ...", file=sys.stderr)
+                seed_scaled(g, size)
+                if want("queries"):
+                    results += bench_queries(g, size)
+            if want("upsert"):
+                results += bench_upsert(g)
+    return {"env": environment(), "sizes": list(sizes), "skipped": skipped, "results": results}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark extraction, NL→Cypher rules and graph queries.")
+    ap.add_argument("--sizes", default="1000,10000", help="comma-separated program counts for graph benchmarks")
+    ap.add_argument("--only", default="", help="comma-separated subset of extract,rules,upsert,queries")
+    ap.add_argument("--host", default=None)
+    ap.add_argument("--port", type=int, default=None)
+    ap.add_argument("--lite", metavar="DB_FILE", default=None,
+                    help="run graph benchmarks on an embedded falkordblite instance instead of a server")
+    ap.add_argument("--out", default=None, help="write results JSON here (default: stdout)")
+    ap.add_argument("--baseline", default=None, help="baseline JSON to compare against; exit 1 on regressions")
+    ap.add_argument("--save-baseline", default=None, help="also write the results as a new baseline")
+    ap.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE)
+    args = ap.parse_args()
+    report = run(sizes=[int(s) for s in args.sizes.split(",") if s], host=args.host, port=args.port,
+                 lite=args.lite, only={p.strip() for p in args.only.split(",") if p.strip()})
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if not args.out:
+        print(text)
+    for r in report["results"]:
+        print(f"{r['name']:<45} {r['value']:>12.3f} {r['unit']}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report["results"], json.load(f), args.tolerance)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ({change:+.0%})", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,353 @@
+# chunk_store.py
+import argparse
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+
+CHUNK_DIR = os.getenv("CHUNK_DIR", "chunks")
+CHUNK_DIM = int(os.getenv("CHUNK_DIM", "256"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "800"))       # chars per chunk
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "120"))  # chars shared by neighbouring chunks
+CHUNK_NPROBE = int(os.getenv("CHUNK_NPROBE", "8"))      # IVF lists scanned per query
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list:
+    """Split into ~`size`-char windows that overlap by `overlap`, cutting at whitespace."""
+    text = " ".join(text.split())
+    out, start = [], 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + size // 2, end)
+            end = cut if cut > 0 else end
+        out.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+        space = text.find(" ", start, end)
+        start = space + 1 if 0 <= space < end else start
+    return [c for c in out if c]
+
+def chunk_pages(pages, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list:
+    """[(page number from 1, chunk text), ...]; chunks never span pages."""
+    return [(i, c) for i, text in enumerate(pages, 1) for c in chunk_text(text, size, overlap)]
+
+class HashingEmbedder:
+    """Offline embedder: word uni/bigrams and char 4-grams hashed into `dim` signed buckets.
+
+    crc32 keeps vectors identical across processes, so parse workers can embed
+    and the store can search with the same instance settings.
+    """
+
+    def __init__(self, dim: int = CHUNK_DIM):
+        self.dim = dim
+
+    def _hashes(self, text: str) -> np.ndarray:
+        words = re.findall(r"\w+", text.lower())
+        feats = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            if len(w) > 4:
+                feats += [f"#{w[i:i + 4]}" for i in range(len(w) - 3)]
+        return np.fromiter((zlib.crc32(f.encode()) for f in feats), dtype=np.uint32, count=len(feats))
+
+    def embed(self, texts: list) -> np.ndarray:
+        """L2-normalized float32 matrix, one row per text."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            h = self._hashes(text)
+            sign = np.where(h >> 31, -1.0, 1.0)
+            out[i] = np.bincount(h % self.dim, weights=sign, minlength=self.dim)
+        out = np.sign(out) * np.log1p(np.abs(out))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+class Hit(NamedTuple):
+    id: int
+    score: float
+    source_id: str
+    page: int
+    text: str
+
+class ChunkStore:
+    """Chunk text in SQLite, vectors in an append-only float32 file, plus an IVF index.
+
+    Layout of `path`:
+      chunks.sqlite    id (= vector row), source_id, page, ordinal, text; `meta` holds
+                       the committed row count and the current index version
+      vectors.f32      raw rows, appended by `add`; bytes past the committed row
+                       count (a torn or uncommitted append) are truncated away
+      ivf-<version>/   centroids, per-list offsets and ids, and the vectors
+                       reordered by list, so a probed list is one contiguous read;
+                       a build writes a new directory and then switches `meta` to it
+
+    Everything is memory-mapped; a query touches the centroids, `nprobe` lists
+    and the rows added since the last `build_index` (the unindexed tail).
+    Replaced chunks are dropped from SQLite only and skipped at lookup; the
+    next `build_index` leaves them out.
+    """
+
+    def __init__(self, path: str = CHUNK_DIR, dim: int = CHUNK_DIM):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(os.path.join(path, "chunks.sqlite"), check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, source_id TEXT, page INTEGER,
+                                               ordinal INTEGER, text TEXT);
+            CREATE INDEX IF NOT EXISTS chunks_source ON chunks(source_id);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+        """)
+        self.dim = self._meta("dim") or dim
+        self.db.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (self.dim,))
+        self.db.execute("INSERT OR IGNORE INTO meta VALUES ('rows', 0)")
+        self.db.commit()
+        self.embedder = HashingEmbedder(self.dim)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._vectors = None
+        self._ivf = None
+        self._truncate(len(self))
+
+    def _meta(self, key: str):
+        row = self.db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def __len__(self) -> int:
+        """Committed vector rows, including replaced ones."""
+        return self._meta("rows")
+
+    def _truncate(self, rows: int):
+        """Cut the vector file back to `rows` whole rows, so a torn append never shifts row ids."""
+        size = rows * 4 * self.dim
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) > size:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(size)
+
+    def _matrix(self) -> np.ndarray:
+        n = len(self)
+        if self._vectors is None or len(self._vectors) != n:
+            self._vectors = (np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+                             if n else np.zeros((0, self.dim), dtype=np.float32))
+        return self._vectors
+
+    # -- writes --------------------------------------------------------
+    def add(self, source_id: str, chunks: list, vectors: np.ndarray | None = None) -> list:
+        """Replace the chunks of `source_id` with [(page, text), ...]; returns the new ids."""
+        if vectors is None:
+            vectors = self.embedder.embed([t for _, t in chunks])
+        with self._lock:
+            first = len(self)
+            self._truncate(first)
+            # vectors first; the row count commits with the metadata, so a crash
+            # in between leaves bytes that the next open or add truncates
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            ids = list(range(first, first + len(chunks)))
+            with self.db:
+                self.db.execute("UPDATE meta SET value=? WHERE key='rows'", (first + len(chunks),))
+                self.db.execute("DELETE FROM chunks WHERE source_id=?", (source_id,))
+                self.db.executemany("INSERT INTO chunks VALUES (?,?,?,?,?)",
+                                    [(i, source_id, page, n, text) for n, (i, (page, text)) in enumerate(zip(ids, chunks))])
+        return ids
+
+    def build_index(self, nlist: int | None = None, sample: int = 100_000, iters: int = 10,
+                    block: int = 65536, seed: int = 0):
+        """Train spherical k-means centroids on a sample and lay the live rows out per list.
+
+        Streams the vector file in blocks, so memory is bounded by `sample` and `block`.
+        """
+        with self._lock:
+            upto = len(self)
+            live = np.fromiter((r[0] for r in self.db.execute("SELECT id FROM chunks WHERE id < ? ORDER BY id", (upto,))),
+                               dtype=np.int64)
+            if not len(live):
+                return
+            mat = self._matrix()
+            nlist = nlist or int(np.clip(np.sqrt(len(live)), 1, 4096))
+            rng = np.random.default_rng(seed)
+            train = np.asarray(mat[np.sort(rng.choice(live, min(sample, len(live)), replace=False))])
+            cents = train[rng.choice(len(train), min(nlist, len(train)), replace=False)].copy()
+            for _ in range(iters):
+                assign = np.argmax(train @ cents.T, axis=1)
+                sums = np.zeros_like(cents)
+                np.add.at(sums, assign, train)
+                empty = ~sums.any(axis=1)
+                sums[empty] = train[rng.choice(len(train), int(empty.sum()))]
+                cents = sums / np.linalg.norm(sums, axis=1, keepdims=True).clip(1e-12)
+            assign = np.concatenate([np.argmax(np.asarray(mat[live[i:i + block]]) @ cents.T, axis=1)
+                                     for i in range(0, len(live), block)])
+            order = np.argsort(assign, kind="stable")
+            ids = live[order]
+            offsets = np.searchsorted(assign[order], np.arange(len(cents) + 1)).astype(np.int64)
+            # all four files go to a fresh directory; readers keep using the old
+            # version until the meta switch below commits
+            version = (self._meta("ivf_version") or 0) + 1
+            out = self._file(f"ivf-{version}")
+            shutil.rmtree(out, ignore_errors=True)  # left by a build that crashed before the switch
+            os.makedirs(out)
+            vecs = np.lib.format.open_memmap(os.path.join(out, "vectors.npy"), mode="w+", dtype=np.float32,
+                                             shape=(len(ids), self.dim))
+            for i in range(0, len(ids), block):
+                vecs[i:i + block] = mat[ids[i:i + block]]
+            vecs.flush()
+            del vecs
+            np.save(os.path.join(out, "centroids.npy"), cents.astype(np.float32))
+            np.save(os.path.join(out, "offsets.npy"), offsets)
+            np.save(os.path.join(out, "ids.npy"), ids)
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('ivf_version', ?)", (version,))
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('indexed_upto', ?)", (upto,))
+            self._ivf = None
+            for name in os.listdir(self.path):
+                if name.startswith("ivf-") and name != f"ivf-{version}":
+                    shutil.rmtree(self._file(name), ignore_errors=True)
+
+    def maybe_reindex(self, min_tail: int = 10_000, ratio: float = 0.1) -> bool:
+        """Rebuild once the unindexed tail outgrows `min_tail` and `ratio` of the index."""
+        upto = self._meta("indexed_upto") or 0
+        if len(self) - upto > max(min_tail, ratio * upto):
+            self.build_index()
+            return True
+        return False
+
+    # -- reads ---------------------------------------------------------
+    def _index(self):
+        """(centroids, offsets, ids, vectors, indexed_upto, version) of the current build, or None."""
+        while True:
+            meta = dict(self.db.execute("SELECT key, value FROM meta WHERE key IN ('ivf_version', 'indexed_upto')"))
+            version = meta.get("ivf_version")
+            if version is None:
+                return None
+            if self._ivf is not None and self._ivf[5] == version:
+                return self._ivf
+            load = lambda name, mode=None: np.load(self._file(f"ivf-{version}/{name}"), mmap_mode=mode)
+            try:
+                self._ivf = (load("centroids.npy"), load("offsets.npy"), load("ids.npy", "r"),
+                             load("vectors.npy", "r"), meta["indexed_upto"], version)
+                return self._ivf
+            except FileNotFoundError:
+                continue  # another process switched versions and removed this one; re-read meta
+
+    def _candidates(self, q: np.ndarray, nprobe: int) -> tuple:
+        ids, scores, upto = [], [], 0
+        ivf = self._index()
+        if ivf is not None:
+            cents, offsets, list_ids, list_vecs, upto, _ = ivf
+            cs = cents @ q
+            nprobe = min(nprobe, len(cs))
+            for l in np.argpartition(-cs, nprobe - 1)[:nprobe]:
+                s, e = offsets[l], offsets[l + 1]
+                if e > s:
+                    ids.append(np.asarray(list_ids[s:e]))
+                    scores.append(np.asarray(list_vecs[s:e]) @ q)
+        mat = self._matrix()
+        if len(mat) > upto:  # rows added since the last build_index
+            ids.append(np.arange(upto, len(mat)))
+            scores.append(np.asarray(mat[upto:]) @ q)
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(ids), np.concatenate(scores)
+
+    def _live(self, ids: list) -> dict:
+        """id -> (source_id, page, text) for the ids still in SQLite (replaced rows are absent)."""
+        out = {}
+        for i in range(0, len(ids), 900):  # stay under SQLite's bound-variable limit
+            part = ids[i:i + 900]
+            out.update((r[0], r[1:]) for r in self.db.execute(
+                f"SELECT id, source_id, page, text FROM chunks WHERE id IN ({','.join('?' * len(part))})", part))
+        return out
+
+    def search(self, query: str, k: int = 5, nprobe: int = CHUNK_NPROBE) -> list:
+        """Top-k live chunks by cosine similarity, best first.
+
+        Replaced rows stay in the vector file and IVF lists until the next
+        build_index and score like the live copies, so the candidate window
+        widens until it holds k live hits or runs out of candidates.
+        """
+        q = self.embedder.embed([query])[0]
+        with self._lock:
+            ids, scores = self._candidates(q, nprobe)
+            want, hits = 2 * k + 8, []
+            while True:
+                want = min(want, len(ids))
+                if not want:
+                    return []
+                top = np.argpartition(-scores, want - 1)[:want]
+                top = top[np.argsort(-scores[top], kind="stable")]
+                found = [int(i) for i in ids[top]]
+                rows = self._live(found)
+                hits = [Hit(i, float(s), *rows[i]) for i, s in zip(found, scores[top]) if i in rows]
+                if len(hits) >= k or want == len(ids):
+                    return hits[:k]
+                want *= 4
+
+    def stats(self) -> dict:
+        live = self.db.execute("SELECT count(*) FROM chunks").fetchone()[0]
+        ivf = self._index()
+        return {"rows": len(self), "live": live, "dim": self.dim, "indexed": ivf[4] if ivf else 0,
+                "lists": len(ivf[0]) if ivf else 0}
+
+# Vector hits -> their SourceDoc and the programs extracted from it, in one round trip.
+EXPAND_CHUNKS_Q = """
+UNWIND $ids AS cid
+MATCH (s:SourceDoc)-[:HAS_CHUNK]->(c:Chunk {id:cid})
+OPTIONAL MATCH (p:SubsidyProgram)-[:EXTRACTED_FROM]->(s)
+OPTIONAL MATCH (p)-[:MANAGED_BY]->(a:Authority)
+OPTIONAL MATCH (p)-[:REQUIRES_DOCUMENT]->(d:Document)
+RETURN cid, s.title, p.name, p.max_amount_eur, p.cofund_rate, p.deadline, a.name, collect(DISTINCT d.name)
+"""
+
+class Retrieval(NamedTuple):
+    hits: list      # [{"chunk": Hit, "source": title, "programs": [name, ...]}, ...]
+    programs: list  # [{"name", "score", ...graph properties}], best first
+
+def hybrid_search(g, store: ChunkStore, query: str, k: int = 5, nprobe: int = CHUNK_NPROBE) -> Retrieval:
+    """Vector hits expanded through the graph; programs are ranked by the summed score of their chunks."""
+    hits = store.search(query, k=k, nprobe=nprobe)
+    if not hits:
+        return Retrieval([], [])
+    rows = g.ro_query(EXPAND_CHUNKS_Q, {"ids": [h.id for h in hits]}).result_set
+    by_chunk, programs = {}, {}
+    score = {h.id: h.score for h in hits}
+    for cid, title, name, max_eur, rate, deadline, authority, docs in rows:
+        entry = by_chunk.setdefault(cid, {"source": title, "programs": []})
+        if name is None:
+            continue
+        entry["programs"].append(name)
+        p = programs.setdefault(name, {"name": name, "score": 0.0, "max_amount_eur": max_eur, "cofund_rate": rate,
+                                       "deadline": deadline, "authority": authority, "documents": docs})
+        p["score"] += score[cid]
+    out = [{"chunk": h, **by_chunk.get(h.id, {"source": h.source_id, "programs": []})} for h in hits]
+    return Retrieval(out, sorted(programs.values(), key=lambda p: -p["score"]))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Inspect, index or query the chunk store.")
+    ap.add_argument("query", nargs="?", help="search text (omit to print stats)")
+    ap.add_argument("--dir", default=CHUNK_DIR)
+    ap.add_argument("-k", type=int, default=5)
+    ap.add_argument("--nprobe", type=int, default=CHUNK_NPROBE)
+    ap.add_argument("--reindex", action="store_true", help="rebuild the IVF index first")
+    ap.add_argument("--graph", action="store_true", help="expand hits through the graph")
+    args = ap.parse_args()
+    store = ChunkStore(args.dir)
+    if args.reindex:
+        store.build_index()
+    if not args.query:
+        print(store.stats())
+    elif args.graph:
+        from graph_client import get_graph
+        res = hybrid_search(get_graph(), store, args.query, k=args.k, nprobe=args.nprobe)
+        for p in res.programs:
+            print(f"{p['score']:.3f}  {p['name']}  ({p['authority']}, max {p['max_amount_eur']})")
+        for h in res.hits:
+            print(f"  {h['chunk'].score:.3f} {h['source']} p{h['chunk'].page}: {h['chunk'].text[:120]}")
+    else:
+        for h in store.search(args.query, k=args.k, nprobe=args.nprobe):
+            print(f"{h.score:.3f} {h.source_id} p{h.page}: {h.text[:120]}")
@@ -0,0 +1,132 @@
+# cypher_cache.py
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Function words ignored when matching rephrasings. Region codes (BY, NW, ...),
+# order words, numbers and comparison words must never be added here.
+_FUNCTION_WORDS = {
+    "a", "an", "the", "is", "are", "do", "does", "can", "could", "please", "me", "my", "our", "we", "i",
+    "show", "list", "give", "tell", "which", "what", "there", "that", "this", "of", "for", "in", "on", "at", "with",
+}
+
+def normalize_question(q: str) -> str:
+    q = re.sub(r"[^\w\s\-]", " ", q.lower())
+    return " ".join(q.split())
+
+def content_tokens(norm_q: str) -> str:
+    """Content tokens in question order; equal only for questions that differ by function words.
+
+    Order is kept, so every number and entity must match in place: "above 10000 and
+    below 50000" vs. "above 50000 and below 10000", or "by KfW not BMWK" vs.
+    "by BMWK not KfW", stay distinct.
+    """
+    return " ".join(t for t in norm_q.split() if t not in _FUNCTION_WORDS)
+
+class CypherCache:
+    """LRU + TTL cache for generated Cypher, optionally persisted to SQLite.
+
+    Entries are scoped by (provider, model, prompt_hash), so changing the prompt
+    or schema never serves stale queries. The key is the full normalized
+    question. A question that misses exactly still hits an entry with the same
+    ordered content tokens (see `content_tokens`); there is no fuzzy matching,
+    so "in BY" vs. no region, "ascending" vs. "descending" or swapped values
+    never collide.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 7 * 24 * 3600, path: str | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._mem = OrderedDict()  # key -> (created, scope, content, cypher)
+        self._near = {}            # (scope, content) -> key
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = self.near_hits = self.misses = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS cypher_cache (
+                    key TEXT PRIMARY KEY, scope TEXT, content TEXT, cypher TEXT, created REAL);
+                CREATE INDEX IF NOT EXISTS cypher_cache_near ON cypher_cache(scope, content);
+            """)
+            self._db.execute("DELETE FROM cypher_cache WHERE created < ?", (time.time() - ttl,))
+            self._db.commit()
+            rows = self._db.execute("SELECT key, created, scope, content, cypher FROM cypher_cache "
+                                    "ORDER BY created DESC LIMIT ?", (max_entries,)).fetchall()
+            for key, created, scope, content, cypher in reversed(rows):
+                self._remember(key, (created, scope, content, cypher))
+
+    @staticmethod
+    def scope(provider: str, model: str, prompt_hash: str) -> str:
+        return f"{provider.lower()}|{model}|{prompt_hash}"
+
+    @staticmethod
+    def _key(scope: str, content: str) -> str:
+        return hashlib.sha256(json.dumps([scope, content]).encode()).hexdigest()
+
+    def _fresh(self, created: float) -> bool:
+        return time.time() - created < self.ttl
+
+    def _lookup(self, key: str, where: str, args: tuple):
+        entry = self._mem.get(key) if key else None
+        if entry is None and self._db is not None:
+            row = self._db.execute(f"SELECT key, created, scope, content, cypher FROM cypher_cache WHERE {where} "
+                                   "ORDER BY created DESC LIMIT 1", args).fetchone()
+            if row:
+                key, entry = row[0], tuple(row[1:])
+        if entry and not self._fresh(entry[0]):
+            self._forget(key)
+            return None, None
+        return key, entry
+
+    def get(self, question: str, scope: str) -> str | None:
+        norm = normalize_question(question)
+        content = content_tokens(norm)
+        with self._lock:
+            key, entry = self._lookup(self._key(scope, norm), "key=?", (self._key(scope, norm),))
+            if entry:
+                self.hits += 1
+            else:
+                key, entry = self._lookup(self._near.get((scope, content)), "scope=? AND content=?", (scope, content))
+                if entry:
+                    self.near_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            return entry[3]
+
+    def put(self, question: str, scope: str, cypher: str):
+        norm = normalize_question(question)
+        key = self._key(scope, norm)
+        entry = (time.time(), scope, content_tokens(norm), cypher)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO cypher_cache VALUES (?,?,?,?,?)",
+                                 (key, *entry[1:], entry[0]))
+                self._db.commit()
+
+    def _remember(self, key: str, entry: tuple):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        self._near[(entry[1], entry[2])] = key
+        while len(self._mem) > self.max_entries:
+            old, e = self._mem.popitem(last=False)  # evicted from memory only; SQLite keeps it until TTL
+            if self._near.get((e[1], e[2])) == old:
+                del self._near[(e[1], e[2])]
+
+    def _forget(self, key: str):
+        e = self._mem.pop(key, None)
+        if e and self._near.get((e[1], e[2])) == key:
+            del self._near[(e[1], e[2])]
+        if self._db is not None:
+            self._db.execute("DELETE FROM cypher_cache WHERE key=?", (key,))
+            self._db.commit()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._mem), "hits": self.hits, "near_hits": self.near_hits, "misses": self.misses}
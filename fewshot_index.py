@@ -0,0 +1,61 @@
+# fewshot_index.py
+import json
+import re
+import zlib
+
+import numpy as np
+
+def load_examples(path: str) -> list:
+    """[{"q": question, "cypher": query}, ...] from a JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _features(text: str) -> list:
+    """Word unigrams/bigrams plus char 3-grams inside words (robust to inflection and typos)."""
+    words = re.findall(r"\w+", text.lower())
+    feats = [f"w:{w}" for w in words]
+    feats += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"#{w}#"
+        feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return feats
+
+class FewShotIndex:
+    """Hashed n-gram TF-IDF index over example questions, all in NumPy.
+
+    Features are hashed with crc32 (stable across processes) into `dim`
+    buckets; rows are L2-normalized so a dot product is the cosine similarity.
+    """
+
+    def __init__(self, examples: list, dim: int = 4096):
+        self.examples = examples
+        self.dim = dim
+        tf = np.zeros((len(examples), dim), dtype=np.float32)
+        for i, ex in enumerate(examples):
+            for j in self._buckets(ex["q"]):
+                tf[i, j] += 1
+        df = np.count_nonzero(tf, axis=0)
+        self.idf = np.log((1 + len(examples)) / (1 + df)).astype(np.float32) + 1
+        self.matrix = self._normalize(np.log1p(tf) * self.idf)
+
+    def _buckets(self, text: str) -> list:
+        return [zlib.crc32(f.encode()) % self.dim for f in _features(text)]
+
+    @staticmethod
+    def _normalize(m: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(m, axis=-1, keepdims=True)
+        return m / np.where(norms == 0, 1, norms)
+
+    def vector(self, text: str) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        np.add.at(v, self._buckets(text), 1)
+        return self._normalize(np.log1p(v) * self.idf)
+
+    def top_k(self, question: str, k: int = 3) -> list:
+        """The k most similar examples, best first."""
+        if not self.examples or k <= 0:
+            return []
+        scores = self.matrix @ self.vector(question)
+        k = min(k, len(scores))
+        idx = np.argpartition(-scores, k - 1)[:k]
+        return [self.examples[i] for i in idx[np.argsort(-scores[idx], kind="stable")]]
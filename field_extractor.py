@@ -0,0 +1,123 @@
+# field_extractor.py
+import re
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional
+
+class FieldRule(NamedTuple):
+    key: str
+    field: str
+    rx: "re.Pattern"
+    folded: Optional["re.Pattern"]
+    cast: Callable[[str], Any]
+    value: Any = None
+
+def _fold(pattern: str) -> str:
+    """Lower-case a pattern's literals, leaving escape sequences (\\S, \\W, ...) alone."""
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            out.append(pattern[i:i + 2])
+            i += 2
+        else:
+            out.append(pattern[i].lower())
+            i += 1
+    return "".join(out)
+
+class FieldExtractor:
+    """Declarative regex field extractor with precompiled rules.
+
+    Each registered rule fills one output field. Rules without a `value` are
+    scalar: the first match's group(1) (passed through `cast`) becomes the field.
+    Rules with a `value` are keyword rules: a match appends the constant to a
+    list field. A rule stops being searched after its first match.
+
+    Case-insensitive rules are folded and run case-sensitively over one
+    lower-cased copy of the text; CPython's regex engine can then use its fast
+    literal search instead of scanning character by character under re.I.
+    """
+
+    def __init__(self):
+        self._rules: Dict[str, FieldRule] = {}
+
+    def register(self, field: str, pattern: str, cast: Callable[[str], Any] = lambda x: x,
+                 flags: int = 0, value: Any = None) -> FieldRule:
+        rx = re.compile(pattern, flags)
+        if value is None and rx.groups < 1:
+            raise ValueError(f"Scalar rule for {field!r} needs a capture group: {pattern}")
+        folded = re.compile(_fold(pattern), flags & ~re.I) if flags & re.I else None
+        rule = FieldRule(f"r{len(self._rules)}", field, rx, folded, cast, value)
+        self._rules[rule.key] = rule
+        return rule
+
+    @property
+    def fields(self) -> list:
+        return list(dict.fromkeys(r.field for r in self._rules.values()))
+
+    def scanner(self) -> "Scan":
+        return Scan(self)
+
+    def scan(self, text: str) -> dict:
+        s = self.scanner()
+        s.feed(text)
+        return s.result()
+
+class Scan:
+    """Incremental scan state; `feed` may be called repeatedly with more text.
+
+    With `final=False` a match that runs up to the end of the text may still grow
+    (e.g. `(.+)` cut at a page break), so it is not taken; `pending` is the
+    earliest such start, and the caller re-feeds the text from there.
+    """
+
+    def __init__(self, extractor: FieldExtractor):
+        self._ex = extractor
+        self._remaining = set(extractor._rules)
+        self._found: Dict[str, Any] = {}
+        self.pending: Optional[int] = None
+
+    def feed(self, text: str, final: bool = True):
+        self.pending = None
+        lower = None
+        if any(self._ex._rules[k].folded is not None for k in self._remaining):
+            lower = text.lower()
+            if len(lower) != len(text):
+                lower = None  # length-changing case mapping; fall back to re.I on the raw text
+        for key in list(self._remaining):
+            rule = self._ex._rules[key]
+            if rule.folded is not None and lower is not None:
+                m = rule.folded.search(lower)
+                # re-match on the raw text so captured values keep their case
+                m = m and (rule.rx.match(text, m.start()) or m)
+            else:
+                m = rule.rx.search(text)
+            if m and not final and m.end() == len(text):
+                self.pending = m.start() if self.pending is None else min(self.pending, m.start())
+            elif m:
+                self._remaining.discard(key)
+                self._found[key] = rule.value if rule.value is not None else rule.cast(m.group(1))
+
+    def done(self, fields: Optional[Iterable[str]] = None) -> bool:
+        """True once every rule of `fields` (default: all fields) has been resolved."""
+        if fields is None:
+            return not self._remaining
+        fields = set(fields)
+        for key in self._remaining:
+            rule = self._ex._rules[key]
+            if rule.field in fields and (rule.value is not None or not self._has(rule.field)):
+                return False
+        return True
+
+    def _has(self, field: str) -> bool:
+        return any(self._ex._rules[k].field == field for k in self._found)
+
+    def result(self) -> dict:
+        out: Dict[str, Any] = {}
+        for key, rule in self._ex._rules.items():
+            if rule.value is not None:
+                lst = out.setdefault(rule.field, [])
+                if key in self._found:
+                    lst.append(rule.value)
+            elif key in self._found and out.get(rule.field) is None:
+                out[rule.field] = self._found[key]
+        for f in self._ex.fields:
+            out.setdefault(f, None)
+        return out
@@ -0,0 +1,153 @@
+# graph_client.py
+import asyncio
+import os
+import threading
+import time
+
+from falkordb import FalkorDB
+from redis import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+# -----------------------------
+# Connection config (read once)
+# -----------------------------
+FALKOR_HOST = os.getenv("FALKOR_HOST", "localhost")
+FALKOR_PORT = int(os.getenv("FALKOR_PORT", "6379"))
+FALKOR_PASSWORD = os.getenv("FALKOR_PASSWORD")  # optional
+GRAPH_NAME = os.getenv("GRAPH_NAME", "subsidy_demo")
+FALKOR_MAX_CONNECTIONS = int(os.getenv("FALKOR_MAX_CONNECTIONS", "16"))
+FALKOR_POOL_TIMEOUT = float(os.getenv("FALKOR_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+FALKOR_RETRIES = int(os.getenv("FALKOR_RETRIES", "3"))
+FALKOR_BACKOFF = float(os.getenv("FALKOR_BACKOFF", "0.2"))  # seconds, doubled per retry
+
+TRANSIENT_ERRORS = (RedisConnectionError, RedisTimeoutError)
+
+_clients = {}
+_async_clients = {}
+_lock = threading.Lock()
+
+def with_retry(fn, *args, **kwargs):
+    """Call fn, retrying transient connection errors with exponential backoff."""
+    for attempt in range(FALKOR_RETRIES + 1):
+        try:
+            return fn(*args, **kwargs)
+        except TRANSIENT_ERRORS:
+            if attempt == FALKOR_RETRIES:
+                raise
+            time.sleep(FALKOR_BACKOFF * (2 ** attempt))
+
+def get_client(host: str | None = None, port: int | None = None) -> FalkorDB:
+    """Process-wide FalkorDB client per (host, port), backed by a bounded blocking pool."""
+    key = (host or FALKOR_HOST, int(port or FALKOR_PORT))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            pool = BlockingConnectionPool(host=key[0], port=key[1], password=FALKOR_PASSWORD,
+                                          max_connections=FALKOR_MAX_CONNECTIONS,
+                                          timeout=FALKOR_POOL_TIMEOUT, decode_responses=True)
+            client = _clients[key] = with_retry(FalkorDB, connection_pool=pool)
+        return client
+
+class Graph:
+    """Thin proxy over a falkordb Graph that retries transient errors.
+
+    Reads (ro_query, explain) are always retried. A write that timed out may
+    already have been applied, so `query` retries only when the caller passes
+    idempotent=True (MERGE/SET of fixed values); CREATE, deletes and relative
+    SETs run once.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
+
+    def query(self, q: str, params: dict | None = None, timeout: int | None = None, idempotent: bool = False):
+        if not idempotent:
+            return self._graph.query(q, params, timeout=timeout)
+        return with_retry(self._graph.query, q, params, timeout=timeout)
+
+    def ro_query(self, q: str, params: dict | None = None, timeout: int | None = None):
+        return with_retry(self._graph.ro_query, q, params, timeout=timeout)
+
+    def explain(self, q: str, params: dict | None = None):
+        return with_retry(self._graph.explain, q, params)
+
+    # Graph version counter: a plain Redis key next to the graph that every
+    # write path bumps, so read caches in any process can tell when to drop.
+    def _version_key(self) -> str:
+        return f"{self._graph.name}:version"
+
+    def version(self) -> int:
+        return int(with_retry(self._graph.client.connection.get, self._version_key()) or 0)
+
+    def bump_version(self) -> int:
+        # a retried INCR may count twice; readers only need the value to change
+        return with_retry(self._graph.client.connection.incr, self._version_key())
+
+def get_graph(name: str | None = None, host: str | None = None, port: int | None = None) -> Graph:
+    return Graph(get_client(host, port).select_graph(name or GRAPH_NAME))
+
+# -----------------------------
+# Async client (for the agent)
+# -----------------------------
+async def with_retry_async(fn, *args, **kwargs):
+    for attempt in range(FALKOR_RETRIES + 1):
+        try:
+            return await fn(*args, **kwargs)
+        except TRANSIENT_ERRORS:
+            if attempt == FALKOR_RETRIES:
+                raise
+            await asyncio.sleep(FALKOR_BACKOFF * (2 ** attempt))
+
+def get_async_client(host: str | None = None, port: int | None = None):
+    """Process-wide falkordb.asyncio client per (host, port) over a bounded async pool.
+
+    Connections bind to the event loop that first uses them, so only await it
+    from the shared loop in aio.py.
+    """
+    from falkordb.asyncio import FalkorDB as AsyncFalkorDB
+    from redis.asyncio import BlockingConnectionPool as AsyncBlockingConnectionPool
+    key = (host or FALKOR_HOST, int(port or FALKOR_PORT))
+    with _lock:
+        client = _async_clients.get(key)
+        if client is None:
+            pool = AsyncBlockingConnectionPool(host=key[0], port=key[1], password=FALKOR_PASSWORD,
+                                               max_connections=FALKOR_MAX_CONNECTIONS,
+                                               timeout=FALKOR_POOL_TIMEOUT, decode_responses=True)
+            client = _async_clients[key] = with_retry(AsyncFalkorDB, connection_pool=pool)
+        return client
+
+class AsyncGraph:
+    """Async counterpart of Graph: same retry rules and version counter, awaitable methods."""
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
+
+    async def query(self, q: str, params: dict | None = None, timeout: int | None = None,
+                    idempotent: bool = False):
+        if not idempotent:
+            return await self._graph.query(q, params, timeout=timeout)
+        return await with_retry_async(self._graph.query, q, params, timeout=timeout)
+
+    async def ro_query(self, q: str, params: dict | None = None, timeout: int | None = None):
+        return await with_retry_async(self._graph.ro_query, q, params, timeout=timeout)
+
+    async def explain(self, q: str, params: dict | None = None):
+        return await with_retry_async(self._graph.explain, q, params)
+
+    def _version_key(self) -> str:
+        return f"{self._graph.name}:version"
+
+    async def version(self) -> int:
+        return int(await with_retry_async(self._graph.client.connection.get, self._version_key()) or 0)
+
+    async def bump_version(self) -> int:
+        return await with_retry_async(self._graph.client.connection.incr, self._version_key())
+
+def get_async_graph(name: str | None = None, host: str | None = None, port: int | None = None) -> AsyncGraph:
+    return AsyncGraph(get_async_client(host, port).select_graph(name or GRAPH_NAME))
@@ -0,0 +1,173 @@
+# graph_view.py
+import json
+import threading
+from collections import OrderedDict
+
+import query_guard
+
+NODE_COLORS = {
+    "Company": "#4C78A8",
+    "SubsidyProgram": "#72B7B2",
+    "Authority": "#F58518",
+    "Document": "#E45756",
+    "EligibilityCriterion": "#54A24B",
+    "SourceDoc": "#B279A2",
+    "Chunk": "#BAB0AC",
+}
+# Leaf-like labels shown as one "N Documents" node per program instead of N nodes.
+COLLAPSE = ("Document", "EligibilityCriterion", "SourceDoc", "Chunk")
+PER_GROUP = 25  # neighbors drawn per (node, rel type, label) before the rest become a "+N more" node
+
+_NAME = "coalesce(x.name, x.title, x.id, x.code)"
+
+SEED_BY_NAME_Q = """
+MATCH (x{label} {{name:$name}})
+RETURN ID(x), labels(x)[0], {name}
+LIMIT 1
+"""
+# Highest-degree nodes first; the aggregation runs entirely in FalkorDB but
+# touches every edge, so results are kept per graph version (see `seeds_by_degree`).
+SEED_BY_DEGREE_Q = f"""
+MATCH (x)-[r]-()
+WITH x, labels(x)[0] AS label, count(r) AS degree
+WHERE NOT label IN $collapse
+RETURN ID(x), label, {_NAME}
+ORDER BY degree DESC
+LIMIT $k
+"""
+# One row per (node, rel type, direction, neighbor label): a count plus a small sample.
+# Groups are only counted; the per-group subquery stops after $per_group neighbors,
+# so hub nodes never materialize their whole neighborhood.
+EXPAND_Q = f"""
+UNWIND $ids AS id
+MATCH (n) WHERE ID(n) = id
+MATCH (n)-[r]-(x)
+WITH n, type(r) AS rel, ID(startNode(r)) = ID(n) AS out, labels(x)[0] AS label, count(x) AS cnt
+CALL {{
+    WITH n, rel, out, label
+    MATCH (n)-[r]-(x)
+    WHERE type(r) = rel AND (ID(startNode(r)) = ID(n)) = out AND labels(x)[0] = label
+          AND NOT label IN $collapse
+    WITH x LIMIT $per_group
+    RETURN collect([ID(x), {_NAME}]) AS sample
+}}
+RETURN ID(n), rel, out, label, cnt, sample
+"""
+
+def _read(g, cypher: str, params: dict) -> list:
+    """Rows of a read through query_guard (plan check, LIMIT, server-side timeout)."""
+    res = query_guard.run(g, cypher, params)
+    if not res.ok:
+        raise RuntimeError(f"{res.status}: {res.reason}")
+    return res.rows
+
+class Subgraph:
+    """Nodes and edges of a rendered view; aggregate nodes have string ids."""
+
+    def __init__(self):
+        self.nodes = {}     # id -> (label, name, is_aggregate)
+        self.edges = set()  # (src, dst, rel)
+
+    def add_node(self, nid, label: str, name, aggregate: bool = False):
+        if nid not in self.nodes:
+            self.nodes[nid] = (label, str(name if name is not None else f"{label}:{nid}"), aggregate)
+
+    def add_edge(self, a, b, rel: str, out: bool = True):
+        self.edges.add((a, b, rel) if out else (b, a, rel))
+
+    def expandable(self) -> dict:
+        """id -> display name for nodes that can be expanded further."""
+        return {nid: f"{name} ({label})" for nid, (label, name, agg) in self.nodes.items() if not agg}
+
+def expand(g, sub: Subgraph, ids: list, collapse=COLLAPSE, per_group: int = PER_GROUP) -> Subgraph:
+    """Add the neighbors of `ids` to `sub`, collapsing leaf labels and large groups into count nodes."""
+    ids = [i for i in ids if isinstance(i, int)]
+    if not ids:
+        return sub
+    rows = _read(g, EXPAND_Q, {"ids": ids, "per_group": int(per_group), "collapse": list(collapse)})
+    for nid, rel, out, label, cnt, sample in rows:
+        if label in collapse:
+            agg = f"{nid}:{rel}:{label}"
+            sub.add_node(agg, label, f"{cnt} {label}{'s' if cnt != 1 else ''}", aggregate=True)
+            sub.add_edge(nid, agg, rel, out)
+            continue
+        for xid, name in sample:
+            sub.add_node(xid, label, name)
+            sub.add_edge(nid, xid, rel, out)
+        if cnt > len(sample):
+            agg = f"{nid}:{rel}:{label}:more"
+            sub.add_node(agg, label, f"+{cnt - len(sample)} more {label}", aggregate=True)
+            sub.add_edge(nid, agg, rel, out)
+    return sub
+
+def neighborhood(g, name: str, label: str | None = "Company", depth: int = 2, expanded=(),
+                 per_group: int = PER_GROUP) -> Subgraph:
+    """`depth` hops around the node called `name`, plus any user-expanded nodes."""
+    sub = Subgraph()
+    q = SEED_BY_NAME_Q.format(label=f":`{label}`" if label else "", name=_NAME)
+    rows = _read(g, q, {"name": name})
+    frontier = []
+    for nid, label, nm in rows:
+        sub.add_node(nid, label, nm)
+        frontier.append(nid)
+    for _ in range(depth):
+        before = set(sub.nodes)
+        expand(g, sub, frontier, per_group=per_group)
+        frontier = [n for n in sub.nodes if n not in before and not sub.nodes[n][2]]
+    return expand(g, sub, list(expanded), per_group=per_group)
+
+def overview(g, k: int = 30, expanded=(), per_group: int = 5) -> Subgraph:
+    """The `k` highest-degree nodes with a small sample of their neighbors."""
+    sub = Subgraph()
+    rows = seeds_by_degree(g, k)
+    for nid, label, nm in rows:
+        sub.add_node(nid, label, nm)
+    expand(g, sub, [r[0] for r in rows], per_group=per_group)
+    return expand(g, sub, list(expanded), per_group=PER_GROUP)
+
+_seeds = {}  # graph name -> (version, k, rows)
+
+def seeds_by_degree(g, k: int) -> list:
+    """Top-`k` (id, label, name) by degree, computed once per graph version and k or less."""
+    version = g.version()
+    with _lock:
+        hit = _seeds.get(g.name)
+    if hit is not None and hit[0] == version and hit[1] >= k:
+        return hit[2][:k]
+    rows = _read(g, SEED_BY_DEGREE_Q, {"k": int(k), "collapse": list(COLLAPSE)})
+    with _lock:
+        _seeds[g.name] = (version, int(k), rows)
+    return rows
+
+def render_html(sub: Subgraph, height: str = "650px") -> str:
+    from pyvis.network import Network
+    net = Network(height=height, width="100%", bgcolor="#ffffff", font_color="#222222")
+    net.barnes_hut()
+    for nid, (label, name, agg) in sub.nodes.items():
+        net.add_node(str(nid), label=name, title=label, color=NODE_COLORS.get(label, "#999999"),
+                     shape="box" if agg else "dot")
+    for a, b, rel in sub.edges:
+        net.add_edge(str(a), str(b), label=rel)
+    return net.generate_html(notebook=False)
+
+VIEWS = {"neighborhood": neighborhood, "overview": overview}
+
+_cache = OrderedDict()  # (graph, version, view, params) -> (Subgraph, html)
+_lock = threading.Lock()
+CACHE_SIZE = 32
+
+def cached_view(g, view: str, **params) -> tuple:
+    """(Subgraph, html) for a view, cached until the graph version changes."""
+    key = (g.name, g.version(), view, json.dumps(params, sort_keys=True, default=str))
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+    sub = VIEWS[view](g, **params)
+    result = (sub, render_html(sub))
+    with _lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -2,14 +2,13 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import fitz
-from falkordb import FalkorDB
-from rapidfuzz import process, fuzz
-import os, re, time
-
-FALKOR_HOST = os.getenv("FALKOR_HOST", "localhost")
-FALKOR_PORT = int(os.getenv("FALKOR_PORT", "6379"))
-FALKOR_PASSWORD = os.getenv("FALKOR_PASSWORD")
-GRAPH_NAME = os.getenv("GRAPH_NAME", "subsidy_demo")
+from authority_resolver import AuthorityResolver
+from chunk_store import ChunkStore, HashingEmbedder, chunk_pages
+from field_extractor import FieldExtractor
+from graph_client import GRAPH_NAME, get_graph
+from schema_sync import sync_schema
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import argparse, glob, hashlib, os, queue, re, threading, time
 
 class ProgramExtract(BaseModel):
     name: str
@@ -22,79 +21,376 @@ class ProgramExtract(BaseModel):
     authority: Optional[str] = None
     confidence: float = 0.6
 
-def pdf_text(path: str) -> str:
-    doc = fitz.open(path)
-    return "\n".join(page.get_text("text") for page in doc)
+def pdf_pages(path: str, max_pages: Optional[int] = None, max_bytes: Optional[int] = None,
+              info: Optional[dict] = None):
+    """Yield page text lazily; stops after `max_pages` pages or `max_bytes` of UTF-8 text.
 
-def _grab(text: str, rx: str, cast=lambda x:x):
-    m = re.search(rx, text, re.I)
-    return cast(m.group(1)) if m else None
+    Sets info["partial"] when a cap cut the document short.
+    """
+    used = 0
+    with fitz.open(path) as doc:
+        for i, page in enumerate(doc):
+            if max_pages is not None and i >= max_pages:
+                if info is not None:
+                    info["partial"] = True
+                return
+            text = page.get_text("text")
+            if max_bytes is not None:
+                size = len(text.encode("utf-8"))
+                if used + size > max_bytes:
+                    if info is not None:
+                        info["partial"] = True
+                    yield text.encode("utf-8")[:max_bytes - used].decode("utf-8", "ignore")
+                    return
+                used += size
+            yield text
 
-def rule_extract(text: str) -> ProgramExtract:
-    name = _grab(text, r"(?:Programm|Program|Förderung)\s*:\s*(.+)")
-    max_eur = _grab(text, r"(?:Max\.?\s*Betrag|Höchstfördersumme)\s*:\s*€?\s*([\d\.\,]+)",
-                    cast=lambda x:int(x.replace(".","").replace(",","")))
-    cofund = _grab(text, r"(?:Kofinanzierung|Fördersatz)\s*:\s*([\d\.]+)\s*%?",
-                   cast=lambda x: (float(x)/100 if float(x) > 1 else float(x)))
-    deadline = _grab(text, r"(?:Stichtag|Deadline)\s*:\s*([0-9]{4}-[0-9]{2}-[0-9]{2}|rolling)")
-    docs = [d for d in ["Business Plan","Finanzplan","Jahresabschlüsse","Handelsregisterauszug","Energieaudit"]
-            if re.search(d, text, re.I)]
-    crits = []
-    if re.search(r"\bKMU\b|\bSME\b", text): crits.append("SME_DEF")
-    if re.search(r"\bNRW\b|Nordrhein", text): crits.append("REGION_NRW")
-    if re.search(r"10%\s*Energie|Energy\s*10%", text): crits.append("ENERGY_SAVING")
-    auth = _grab(text, r"(?:Bewilligungsstelle|Authority|Träger)\s*:\s*(.+)")
-    name = name or "Unbenanntes Programm"
+def pdf_text(path: str, max_pages: Optional[int] = None, max_bytes: Optional[int] = None) -> str:
+    return "\n".join(pdf_pages(path, max_pages=max_pages, max_bytes=max_bytes))
+
+def _amount(x: str) -> int:
+    return int(x.replace(".", "").replace(",", ""))
+
+def _rate(x: str) -> float:
+    return float(x) / 100 if float(x) > 1 else float(x)
+
+# Field patterns; register more with EXTRACTOR.register(field, pattern, ...)
+EXTRACTOR = FieldExtractor()
+EXTRACTOR.register("name", r"(?:Programm|Program|Förderung)\s*:\s*(.+)", flags=re.I)
+EXTRACTOR.register("max_amount_eur", r"(?:Max\.?\s*Betrag|Höchstfördersumme)\s*:\s*€?\s*([\d\.\,]+)",
+                   cast=_amount, flags=re.I)
+EXTRACTOR.register("cofund_rate", r"(?:Kofinanzierung|Fördersatz)\s*:\s*([\d\.]+)\s*%?", cast=_rate, flags=re.I)
+EXTRACTOR.register("deadline", r"(?:Stichtag|Deadline)\s*:\s*([0-9]{4}-[0-9]{2}-[0-9]{2}|rolling)", flags=re.I)
+EXTRACTOR.register("authority", r"(?:Bewilligungsstelle|Authority|Träger)\s*:\s*(.+)", flags=re.I)
+for _doc in ["Business Plan", "Finanzplan", "Jahresabschlüsse", "Handelsregisterauszug", "Energieaudit"]:
+    EXTRACTOR.register("documents", re.escape(_doc), value=_doc, flags=re.I)
+EXTRACTOR.register("criteria", r"\bKMU\b|\bSME\b", value="SME_DEF")
+EXTRACTOR.register("criteria", r"\bNRW\b|Nordrhein", value="REGION_NRW")
+EXTRACTOR.register("criteria", r"10%\s*Energie|Energy\s*10%", value="ENERGY_SAVING")
+
+def _to_extract(found: dict) -> ProgramExtract:
+    name = found["name"] or "Unbenanntes Programm"
+    max_eur, cofund, deadline = found["max_amount_eur"], found["cofund_rate"], found["deadline"]
+    docs, crits, auth = found["documents"], found["criteria"], found["authority"]
     filled = sum([name is not None, max_eur is not None, cofund is not None, deadline is not None, bool(docs), bool(crits), auth is not None])
     conf = min(0.5 + 0.05 * filled, 0.95)
     return ProgramExtract(name=name, level=None, max_amount_eur=max_eur, cofund_rate=cofund,
                           deadline=deadline, documents=docs, criteria=crits, authority=auth,
                           confidence=conf)
 
-def upsert_program(ext: ProgramExtract, src_title: str, src_url: Optional[str]=None):
-    g = FalkorDB(host=FALKOR_HOST, port=FALKOR_PORT, password=FALKOR_PASSWORD).select_graph(GRAPH_NAME)
-    g.query("MERGE (s:SourceDoc {id:$id}) SET s.title=$title, s.url=$url, s.ingest_ts=$ts",
-            {"id": src_title, "title": src_title, "url": src_url, "ts": int(time.time())})
-    # authority (fuzzy)
-    authority_name = None
-    if ext.authority:
-        known = [r[0] for r in g.query("MATCH (a:Authority) RETURN a.name").result_set]
-        best = process.extractOne(ext.authority, known, scorer=fuzz.WRatio)
-        authority_name = best[0] if best and best[1] > 90 else ext.authority
-        g.query("MERGE (a:Authority {name:$n})", {"n": authority_name})
-    g.query("""
-        MERGE (p:SubsidyProgram {name:$name})
-        SET p.level=coalesce($level,p.level),
-            p.max_amount_eur=coalesce($max,p.max_amount_eur),
-            p.cofund_rate=coalesce($rate,p.cofund_rate),
-            p.deadline=coalesce($deadline,p.deadline)
-        """, {"name": ext.name, "level": ext.level, "max": ext.max_amount_eur,
-              "rate": ext.cofund_rate, "deadline": ext.deadline})
+def rule_extract(text: str) -> ProgramExtract:
+    return _to_extract(EXTRACTOR.scan(text))
+
+# Scalar facts usually sit on the first pages. Stopping once they are found
+# (opt-in early stop) drops documents and criteria listed on later pages.
+REQUIRED_FIELDS = ("name", "max_amount_eur", "cofund_rate", "deadline", "authority")
+_PAGE_OVERLAP = 256  # chars carried over so patterns can span a page break
+
+def extract_pdf(path: str, max_pages: Optional[int] = None, max_bytes: Optional[int] = None,
+                required=None, info: Optional[dict] = None) -> ProgramExtract:
+    """Stream pages into the extractor; see `extract_pages`."""
+    return extract_pages(pdf_pages(path, max_pages=max_pages, max_bytes=max_bytes, info=info), required, info)
+
+def extract_pages(pages, required=None, info: Optional[dict] = None) -> ProgramExtract:
+    """Feed pages until every rule has matched, when later pages cannot add anything.
+
+    With `required` (e.g. REQUIRED_FIELDS) reading also stops once those fields
+    are found, and info["partial"] is set since list fields may be incomplete.
+    """
+    scan, tail = EXTRACTOR.scanner(), ""
+    for text in pages:
+        chunk = tail + "\n" + text if tail else text
+        scan.feed(chunk, final=False)
+        if scan.done():
+            break
+        if required is not None and scan.done(required):
+            if info is not None:
+                info["partial"] = True
+            break
+        tail = _tail(chunk, scan.pending)
+    else:
+        scan.feed(tail)  # the last page: matches running to its end are complete
+    return _to_extract(scan.result())
+
+def _tail(chunk: str, pending: Optional[int]) -> str:
+    """Text carried into the next page: the last _PAGE_OVERLAP chars, or from the earliest
+    match that may still grow. Cut at whitespace so \\b and words see the same context."""
+    cut = len(chunk) - _PAGE_OVERLAP if pending is None else min(len(chunk) - _PAGE_OVERLAP, pending)
+    if cut <= 0:
+        return chunk
+    m = re.search(r"\s\S*$", chunk[:cut + 1])
+    return chunk[m.start():] if m else chunk
+
+_resolvers = {}  # graph name -> (graph version, AuthorityResolver)
+_resolvers_lock = threading.Lock()
+
+def authority_resolver(g) -> AuthorityResolver:
+    """Process-wide resolver per graph, reloaded from the graph whenever its version
+    moved on without us (a wipe, or writes from other paths)."""
+    name, version = getattr(g, "name", GRAPH_NAME), g.version()
+    with _resolvers_lock:
+        hit = _resolvers.get(name)
+        if hit is None or hit[0] != version:
+            hit = _resolvers[name] = (version, AuthorityResolver.from_graph(g))
+        return hit[1]
+
+def _resolver_wrote(g, resolver: Optional[AuthorityResolver], version: int):
+    """After our own write bumped the version to `version`, keep the cached resolver:
+    it registered every name that write added."""
+    name = getattr(g, "name", GRAPH_NAME)
+    with _resolvers_lock:
+        hit = _resolvers.get(name)
+        if hit is not None and hit[1] is resolver and hit[0] == version - 1:
+            _resolvers[name] = (version, resolver)
+
+def _batch_rows(items, resolver: Optional[AuthorityResolver]):
+    """Flatten (ext, src_title[, src_url[, content_hash]]) items into UNWIND parameter rows."""
+    ts = int(time.time())
+    progs, docs, crits, managed = [], [], [], []
+    authorities = [item[0].authority for item in items if item[0].authority]
+    resolved = iter(resolver.resolve_many(authorities) if authorities else [])
+    for item in items:
+        ext, src_title, src_url, content_hash = (tuple(item) + (None, None))[:4]
+        progs.append({"sid": src_title, "title": src_title, "url": src_url, "ts": ts, "hash": content_hash,
+                      "name": ext.name, "level": ext.level, "max": ext.max_amount_eur,
+                      "rate": ext.cofund_rate, "deadline": ext.deadline, "conf": ext.confidence})
+        docs.extend({"p": ext.name, "d": d} for d in ext.documents)
+        crits.extend({"p": ext.name, "code": c} for c in ext.criteria)
+        if ext.authority:
+            managed.append({"p": ext.name, "a": next(resolved)})
+    return progs, docs, crits, managed
+
+def upsert_programs(items, g=None, resolver: Optional[AuthorityResolver] = None):
+    """Bulk upsert of (ext, src_title[, src_url[, content_hash]]) items in a handful of UNWIND queries.
+
+    Round trips are constant per batch instead of ~2 per node/edge.
+    """
+    items = list(items)
+    if not items:
+        return
+    g = g or get_graph()
+    if resolver is None and any(item[0].authority for item in items):
+        resolver = authority_resolver(g)
+    progs, docs, crits, managed = _batch_rows(items, resolver)
     g.query("""
-        MATCH (p:SubsidyProgram {name:$p}), (s:SourceDoc {id:$sid})
+        UNWIND $rows AS row
+        MERGE (s:SourceDoc {id:row.sid})
+        SET s.title=row.title, s.url=row.url, s.ingest_ts=row.ts,
+            s.content_hash=coalesce(row.hash,s.content_hash)
+        MERGE (p:SubsidyProgram {name:row.name})
+        SET p.level=coalesce(row.level,p.level),
+            p.max_amount_eur=coalesce(row.max,p.max_amount_eur),
+            p.cofund_rate=coalesce(row.rate,p.cofund_rate),
+            p.deadline=coalesce(row.deadline,p.deadline)
         MERGE (p)-[r:EXTRACTED_FROM]->(s)
-        SET r.confidence=$conf
-    """, {"p": ext.name, "sid": src_title, "conf": ext.confidence})
-    for d in ext.documents:
-        g.query("MERGE (doc:Document {name:$n})", {"n": d})
+        SET r.confidence=row.conf
+        """, {"rows": progs}, idempotent=True)
+    if docs:
         g.query("""
-            MATCH (p:SubsidyProgram {name:$p}), (doc:Document {name:$d})
+            UNWIND $rows AS row
+            MATCH (p:SubsidyProgram {name:row.p})
+            MERGE (doc:Document {name:row.d})
             MERGE (p)-[:REQUIRES_DOCUMENT]->(doc)
-        """, {"p": ext.name, "d": d})
-    for code in ext.criteria:
-        g.query("MERGE (c:EligibilityCriterion {code:$n}) SET c.name=coalesce(c.name,$n)", {"n": code})
+        """, {"rows": docs}, idempotent=True)
+    if crits:
         g.query("""
-            MATCH (p:SubsidyProgram {name:$p}), (c:EligibilityCriterion {code:$code})
+            UNWIND $rows AS row
+            MATCH (p:SubsidyProgram {name:row.p})
+            MERGE (c:EligibilityCriterion {code:row.code})
+            SET c.name=coalesce(c.name,row.code)
             MERGE (p)-[:ELIGIBLE_IF]->(c)
-        """, {"p": ext.name, "code": code})
-    if authority_name:
+        """, {"rows": crits}, idempotent=True)
+    if managed:
         g.query("""
-            MATCH (p:SubsidyProgram {name:$p}), (a:Authority {name:$a})
+            UNWIND $rows AS row
+            MATCH (p:SubsidyProgram {name:row.p})
+            MERGE (a:Authority {name:row.a})
             MERGE (p)-[:MANAGED_BY]->(a)
-        """, {"p": ext.name, "a": authority_name})
+        """, {"rows": managed}, idempotent=True)
+    _resolver_wrote(g, resolver, g.bump_version())
+
+def upsert_chunks(items, store: ChunkStore, g=None):
+    """Store the page chunks of (ext, src_title, url, hash, (chunks, vectors)) items and link them in the graph.
+
+    A re-ingested SourceDoc gets its chunks replaced, in the store and as
+    (:SourceDoc)-[:HAS_CHUNK]->(:Chunk) nodes keyed by the store row id.
+    """
+    rows, sids = [], []
+    for item in items:
+        if len(item) < 5 or item[4] is None:
+            continue
+        chunks, vectors = item[4]
+        ids = store.add(item[1], chunks, vectors)
+        sids.append(item[1])
+        rows.extend({"sid": item[1], "id": i, "page": page, "n": n} for n, (i, (page, _)) in enumerate(zip(ids, chunks)))
+    if not sids:
+        return
+    g = g or get_graph()
+    g.query("""
+        UNWIND $sids AS sid
+        MATCH (:SourceDoc {id:sid})-[:HAS_CHUNK]->(c:Chunk)
+        DETACH DELETE c
+    """, {"sids": sids}, idempotent=True)
+    if rows:
+        g.query("""
+            UNWIND $rows AS row
+            MATCH (s:SourceDoc {id:row.sid})
+            MERGE (c:Chunk {id:row.id})
+            SET c.page=row.page, c.ordinal=row.n
+            MERGE (s)-[:HAS_CHUNK]->(c)
+        """, {"rows": rows}, idempotent=True)
+    g.bump_version()
+
+def upsert_program(ext: ProgramExtract, src_title: str, src_url: Optional[str]=None):
+    upsert_programs([(ext, src_title, src_url)])
+
+# -----------------------------
+# Directory / glob ingestion
+# -----------------------------
+def expand_paths(args: List[str]):
+    """Yield (path, src_title) for files, directories (recursive *.pdf) and glob patterns."""
+    for arg in args:
+        if os.path.isdir(arg):
+            for p in sorted(glob.glob(os.path.join(arg, "**", "*.pdf"), recursive=True)):
+                yield p, os.path.relpath(p, arg)
+        elif glob.has_magic(arg):
+            for p in sorted(glob.glob(arg, recursive=True)):
+                yield p, os.path.basename(p)
+        else:
+            yield arg, os.path.basename(arg)
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def known_hashes(g) -> dict:
+    """SourceDoc id -> content_hash for everything already in the graph."""
+    rs = g.ro_query("MATCH (s:SourceDoc) RETURN s.id, s.content_hash").result_set
+    return {sid: h for sid, h in rs}
+
+def _parse(path: str, src_title: str, known_hash: Optional[str], force: bool, opts: dict):
+    # runs in a worker process; unchanged files are hashed but never parsed
+    digest = file_hash(path)
+    if digest == known_hash and not force:
+        return None
+    # a partial read keeps no hash, so the next run reads the file again
+    info = {}
+    if not opts.get("chunk_dim"):
+        ext = extract_pdf(path, opts["max_pages"], opts["max_bytes"], opts["required"], info)
+        return ext, src_title, None, None if info.get("partial") else digest
+    # chunking needs every page; extraction still stops matching once the fields are found
+    pages = list(pdf_pages(path, max_pages=opts["max_pages"], max_bytes=opts["max_bytes"], info=info))
+    chunks = chunk_pages(pages)
+    vectors = HashingEmbedder(opts["chunk_dim"]).embed([t for _, t in chunks])
+    ext = extract_pages(pages, opts["required"], info)
+    return ext, src_title, None, None if info.get("partial") else digest, (chunks, vectors)
+
+def _parsed(paths, workers: int, known: dict, force: bool, opts: dict):
+    """Parse in a process pool, keeping at most 2*workers files in flight."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for path, title in paths:
+            pending.add(pool.submit(_parse, path, title, known.get(title), force, opts))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from done
+        for fut in pending:
+            yield fut
+
+def _writer(g, q: "queue.Queue", batch_size: int, stats: dict, store: Optional[ChunkStore] = None):
+    batch = []
+    while True:
+        item = q.get()
+        if item is not None:
+            batch.append(item)
+        if batch and (item is None or len(batch) >= batch_size):
+            try:
+                upsert_programs(batch, g=g)
+                if store is not None:
+                    upsert_chunks(batch, store, g=g)
+                stats["written"] += len(batch)
+            except Exception as e:
+                stats["failed"] += len(batch)
+                print(f"Write failed for {len(batch)} file(s): {e}")
+            batch = []
+        if item is None:
+            return
+
+def ingest_paths(args: List[str], workers: Optional[int] = None, batch_size: int = 50,
+                 queue_size: int = 200, force: bool = False, max_pages: Optional[int] = None,
+                 max_bytes: Optional[int] = None, early_stop: bool = False,
+                 chunks_dir: Optional[str] = None) -> dict:
+    """Parse PDFs in parallel and commit them to the graph in batches from one writer thread.
+
+    Files whose content hash matches their SourceDoc are skipped unless `force`.
+    Pages are streamed until every extraction rule has matched; `early_stop`
+    also stops once REQUIRED_FIELDS are found, at the cost of documents and
+    criteria on later pages. Files cut short (early stop, page or byte caps)
+    are stored without a content hash and re-read next time. With `chunks_dir` all page text is also chunked,
+    embedded in the parse workers and kept in a ChunkStore there.
+    """
+    store = ChunkStore(chunks_dir) if chunks_dir else None
+    opts = {"max_pages": max_pages, "max_bytes": max_bytes,
+            "required": REQUIRED_FIELDS if early_stop else None, "chunk_dim": store.dim if store else None}
+    workers = workers or os.cpu_count() or 1
+    stats = {"files": 0, "new": 0, "changed": 0, "skipped": 0, "forced": 0, "written": 0, "failed": 0}
+    g = get_graph()
+    for change in sync_schema(g):
+        print("Schema:", change)
+    known = known_hashes(g)
+    q = queue.Queue(maxsize=queue_size)
+    writer = threading.Thread(target=_writer, args=(g, q, batch_size, stats, store), daemon=True)
+    writer.start()
+    t0 = time.perf_counter()
+    try:
+        for fut in _parsed(expand_paths(args), workers, known, force, opts):
+            stats["files"] += 1
+            try:
+                item = fut.result()
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"Failed: {e}")
+                continue
+            if item is None:
+                stats["skipped"] += 1
+                continue
+            if item[1] not in known:
+                stats["new"] += 1
+            elif item[3] != known[item[1]]:
+                stats["changed"] += 1
+            else:
+                stats["forced"] += 1
+            q.put(item)
+    finally:
+        q.put(None)
+        writer.join()
+    if store is not None:
+        stats["reindexed"] = store.maybe_reindex()
+    stats["seconds"] = time.perf_counter() - t0
+    stats["files_per_sec"] = stats["files"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
 
 if __name__ == "__main__":
-    text = pdf_text("samples/subsidy_example.pdf")
-    ext = rule_extract(text)
-    upsert_program(ext, src_title="subsidy_example.pdf")
-    print("Ingested:", ext.model_dump())
+    ap = argparse.ArgumentParser(description="Ingest subsidy PDFs into the graph.")
+    ap.add_argument("paths", nargs="*", default=["samples/subsidy_example.pdf"],
+                    help="PDF files, directories or glob patterns")
+    ap.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    ap.add_argument("--batch-size", type=int, default=50, help="extracts per graph write")
+    ap.add_argument("--force", action="store_true", help="re-ingest files even if their hash is unchanged")
+    ap.add_argument("--max-pages", type=int, default=None, help="read at most this many pages per PDF")
+    ap.add_argument("--max-bytes", type=int, default=None, help="read at most this much text per PDF")
+    ap.add_argument("--early-stop", action="store_true",
+                    help="stop reading once the key scalar fields are found (may miss documents and criteria)")
+    ap.add_argument("--chunks", metavar="DIR", default=None,
+                    help="also chunk and embed page text into a vector store in DIR")
+    args = ap.parse_args()
+    stats = ingest_paths(args.paths, workers=args.workers, batch_size=args.batch_size, force=args.force,
+                         max_pages=args.max_pages, max_bytes=args.max_bytes, early_stop=args.early_stop,
+                         chunks_dir=args.chunks)
+    print(f"New: {stats['new']}, changed: {stats['changed']}, skipped (unchanged): {stats['skipped']}, "
+          f"forced: {stats['forced']}")
+    print(f"Ingested {stats['written']}/{stats['files']} file(s), {stats['failed']} failed "
+          f"in {stats['seconds']:.1f}s ({stats['files_per_sec']:.1f} files/sec)")
@@ -0,0 +1,119 @@
+# llm_providers.py
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Callable
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+SYSTEM_PROMPT = "You output only valid OpenCypher. No prose."
+
+class OllamaProvider:
+    """Streams /api/generate over one persistent httpx.AsyncClient per base URL."""
+
+    _clients = {}
+
+    def __init__(self, model: str, prompt_fn: Callable[[str], str], base_url: str = OLLAMA_URL):
+        self.name, self.model, self.prompt_fn, self.base_url = "ollama", model, prompt_fn, base_url
+
+    def _client(self):
+        import httpx
+        client = self._clients.get(self.base_url)
+        if client is None:
+            client = self._clients[self.base_url] = httpx.AsyncClient(
+                base_url=self.base_url, timeout=httpx.Timeout(120, connect=5))
+        return client
+
+    async def stream(self, question: str) -> AsyncIterator[str]:
+        data = {
+            "model": self.model,
+            "prompt": f"System: {SYSTEM_PROMPT}\n\nUser:\n{self.prompt_fn(question)}",
+            "options": {"temperature": 0.1},
+            "stream": True,
+        }
+        async with self._client().stream("POST", "/api/generate", json=data) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+
+class OpenAIProvider:
+    """Streams chat completions over one persistent AsyncOpenAI client."""
+
+    _client_obj = None
+
+    def __init__(self, model: str, prompt_fn: Callable[[str], str]):
+        self.name, self.model, self.prompt_fn = "openai", model, prompt_fn
+
+    @classmethod
+    def _client(cls):
+        if cls._client_obj is None:
+            from openai import AsyncOpenAI
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY not set")
+            cls._client_obj = AsyncOpenAI(api_key=api_key)
+        return cls._client_obj
+
+    async def stream(self, question: str) -> AsyncIterator[str]:
+        resp = await self._client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": self.prompt_fn(question)},
+            ],
+            temperature=0.1,
+            max_tokens=400,
+            stream=True,
+        )
+        async for chunk in resp:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class FunctionProvider:
+    """Wraps a local, synchronous function (e.g. the rules engine) as a provider."""
+
+    def __init__(self, name: str, fn: Callable[[str], str]):
+        self.name, self.fn = name, fn
+
+    async def stream(self, question: str) -> AsyncIterator[str]:
+        yield self.fn(question)
+
+async def astream_with_fallback(question: str, providers: list, deadline: float | None = None):
+    """Yield (provider_name, text_so_far) snapshots, falling back when a provider errors or
+    misses its `deadline` (seconds). A new provider name means the text starts over."""
+    errors = []
+    for prov in providers:
+        parts = []
+        it = prov.stream(question).__aiter__()
+        loop = asyncio.get_running_loop()
+        end = None if deadline is None else loop.time() + deadline
+        try:
+            while True:
+                remaining = None if end is None else max(end - loop.time(), 0)
+                try:
+                    part = await asyncio.wait_for(it.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                parts.append(part)
+                yield prov.name, "".join(parts)
+        except Exception as e:  # includes asyncio.TimeoutError
+            errors.append(f"{prov.name}: {type(e).__name__} {e}".strip())
+            await it.aclose()
+            continue
+        text = "".join(parts)
+        if text.strip():
+            if text != text.strip():  # the last snapshot already carried the text; only trim it
+                yield prov.name, text.strip()
+            return
+        errors.append(f"{prov.name}: empty response")
+    raise RuntimeError("All providers failed: " + "; ".join(errors))
+
+async def agenerate(question: str, providers: list, deadline: float | None = None):
+    """Complete text and the name of the provider that produced it."""
+    name, text = None, ""
+    async for name, text in astream_with_fallback(question, providers, deadline):
+        pass
+    return text, name
@@ -1,5 +1,11 @@
-import os
-import requests
+import os, hashlib, json, sys, time
+import aio
+import llm_providers
+import query_guard
+from cypher_cache import CypherCache
+from fewshot_index import FewShotIndex, load_examples
+from rules_engine import RuleEngine, inline_params
+from schema_sync import load_ontology
 
 SCHEMA_TEXT = """
 You are a Cypher generator for a FalkorDB/OpenCypher graph.
@@ -24,121 +30,196 @@ Rules:
 - Return a compact, useful set of columns.
 """
 
-FEW_SHOTS = [
-    {
-        "q": "Which subsidies apply to small companies in NRW?",
-        "cypher": """
-MATCH (c:Company {size:'small', region:'DE-NW'})
-      <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
-RETURN DISTINCT p.name AS program, p.max_amount_eur AS max_eur, p.cofund_rate AS cofund, p.deadline AS deadline
-ORDER BY max_eur DESC
-""".strip()
-    },
-    {
-        "q": "What documents are required for each program?",
-        "cypher": """
-MATCH (p:SubsidyProgram)-[:REQUIRES_DOCUMENT]->(d:Document)
-RETURN p.name AS program, collect(DISTINCT d.name) AS required_docs
-ORDER BY program
-""".strip()
-    },
-    {
-        "q": "Who manages each program?",
-        "cypher": """
-MATCH (p:SubsidyProgram)-[:MANAGED_BY]->(a:Authority)
-RETURN p.name AS program, a.name AS authority
-ORDER BY program
-""".strip()
-    },
-]
+# Example bank: one {"q", "cypher"} object per line; only the top-k most
+# similar examples go into each prompt.
+FEWSHOTS_PATH = os.getenv("NL2CYPHER_FEWSHOTS",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "fewshots.jsonl"))
+FEWSHOT_K = int(os.getenv("NL2CYPHER_FEWSHOT_K", "3"))
+FEW_SHOTS = load_examples(FEWSHOTS_PATH)
+FEWSHOT_INDEX = FewShotIndex(FEW_SHOTS)
 
-def _prompt(user_q: str) -> str:
-    examples = "\n\n".join([f"Q: {e['q']}\nCypher:\n{e['cypher']}" for e in FEW_SHOTS])
-    return f"""{SCHEMA_TEXT}
+# Static prefix, built once and byte-identical across requests so provider-side
+# prompt caching can reuse it; everything question-specific comes after it.
+PROMPT_PREFIX = f"""{SCHEMA_TEXT}
 
 Translate the user's question into a single OpenCypher query.
 Return ONLY the Cypher query, nothing else.
 
 Examples:
-{examples}
+""".lstrip()
+
+def _prompt(user_q: str) -> str:
+    examples = "\n\n".join(f"Q: {e['q']}\nCypher:\n{e['cypher']}" for e in FEWSHOT_INDEX.top_k(user_q, FEWSHOT_K))
+    return f"""{PROMPT_PREFIX}{examples}
 
 User question:
 {user_q}
-Cypher:
-""".strip()
+Cypher:"""
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# LLM results are cached per (question, provider, model, prompt hash); set
+# NL2CYPHER_CACHE_DB to a file path to keep the cache across restarts.
+CACHE = CypherCache(
+    max_entries=int(os.getenv("NL2CYPHER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("NL2CYPHER_CACHE_TTL", str(7 * 24 * 3600))),
+    path=os.getenv("NL2CYPHER_CACHE_DB"),
+)
+
+def prompt_hash() -> str:
+    """Changes whenever the schema prefix, the example bank or k change."""
+    return hashlib.sha256(json.dumps([PROMPT_PREFIX, FEW_SHOTS, FEWSHOT_K]).encode()).hexdigest()[:16]
+
+def _provider(name: str, ollama_model: str = "llama3.1"):
+    if name == "openai":
+        return llm_providers.OpenAIProvider(OPENAI_MODEL, _prompt)
+    if name == "ollama":
+        return llm_providers.OllamaProvider(ollama_model, _prompt)
+    return llm_providers.FunctionProvider("rules", _rules_text)
 
 def generate_with_openai(user_q: str) -> str:
-    from openai import OpenAI
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set")
-    client = OpenAI(api_key=api_key)
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role":"system","content":"You output only valid OpenCypher. No prose."},
-            {"role":"user","content": _prompt(user_q)},
-        ],
-        temperature=0.1,
-        max_tokens=400,
-    )
-    return resp.choices[0].message.content.strip()
+    text, _ = aio.run_sync(llm_providers.agenerate(user_q, [_provider("openai")]))
+    return text
 
 def generate_with_ollama(user_q: str, model: str = "llama3.1") -> str:
-    data = {
-        "model": model,
-        "prompt": f"System: You output only valid OpenCypher. No prose.\n\nUser:\n{_prompt(user_q)}",
-        "options": {"temperature": 0.1},
-    }
-    r = requests.post("http://localhost:11434/api/generate", json=data, timeout=120)
-    r.raise_for_status()
-    return r.json().get("response","").strip()
-
-def generate_with_rules(user_q: str) -> str:
-    q = user_q.lower()
-    if ("subsid" in q) and ("apply" in q):
-        size = "small" if "small" in q else None
-        region = "DE-NW" if ("nrw" in q or "north rhine" in q or "nordrhein" in q) else None
-        if size and region:
-            return f"""
-MATCH (c:Company {{size:'{size}', region:'{region}'}})
-      <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
-RETURN DISTINCT p.name AS program, p.max_amount_eur AS max_eur, p.cofund_rate AS cofund, p.deadline AS deadline
-ORDER BY max_eur DESC
-""".strip()
-        return """
-MATCH (:Company {name:'ACME Maschinenbau GmbH'})
-      <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
-RETURN DISTINCT p.name AS program, p.max_amount_eur AS max_eur, p.cofund_rate AS cofund, p.deadline AS deadline
-ORDER BY max_eur DESC
-""".strip()
-    if "document" in q and ("need" in q or "required" in q or "require" in q):
-        return """
-MATCH (p:SubsidyProgram)-[:REQUIRES_DOCUMENT]->(d:Document)
-RETURN p.name AS program, collect(DISTINCT d.name) AS required_docs
-ORDER BY program
-""".strip()
-    if "manage" in q or "authority" in q:
-        return """
-MATCH (p:SubsidyProgram)-[:MANAGED_BY]->(a:Authority)
-RETURN p.name AS program, a.name AS authority
-ORDER BY program
-""".strip()
-    # default demo
-    return """
-MATCH (:Company {name:'ACME Maschinenbau GmbH'})
-      <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
-RETURN DISTINCT p.name AS program, p.max_amount_eur AS max_eur, p.cofund_rate AS cofund, p.deadline AS deadline
-ORDER BY max_eur DESC
-""".strip()
+    text, _ = aio.run_sync(llm_providers.agenerate(user_q, [_provider("ollama", model)]))
+    return text
+
+# Parameterized intent rules built from the ontology's allowed_* values.
+RULES = RuleEngine.from_ontology(load_ontology())
+
+_authorities_at = None  # (graph name, version) RULES last loaded Authority names from
+
+def load_authorities(g):
+    """Teach RULES the Authority names in `g`; reloads only when the graph version moved on."""
+    global _authorities_at
+    at = (g.name, g.version())
+    if at != _authorities_at:
+        RULES.set_authorities(r[0] for r in g.ro_query("MATCH (a:Authority) RETURN a.name").result_set)
+        _authorities_at = at
+
+def generate_with_rules(user_q: str) -> tuple:
+    """(cypher_template, params) from the rules engine."""
+    return RULES.match(user_q)
+
+def _rules_text(user_q: str) -> str:
+    return inline_params(*generate_with_rules(user_q))
+
+# Per-provider deadline (seconds) before falling back to the next provider.
+DEADLINE = float(os.getenv("NL2CYPHER_DEADLINE", "20"))
 
-def generate_cypher(user_q: str, provider: str = "Rules", ollama_model: str = "llama3.1") -> str:
+def _scope(p: str, ollama_model: str) -> str:
+    return CACHE.scope(p, OPENAI_MODEL if p == "openai" else ollama_model, prompt_hash())
+
+def _stream_llm(user_q: str, p: str, ollama_model: str, deadline: float | None, fallback: bool = True,
+                scope: str | None = None):
+    """Stream from the LLM `p` (then the rules engine if `fallback`); cache the answer under `scope`
+    only when `p` itself produced it."""
+    used, cypher = None, ""
+    chain = [_provider(p, ollama_model)] + ([_provider("rules")] if fallback else [])
+    for used, cypher in aio.iter_sync(llm_providers.astream_with_fallback(user_q, chain, deadline)):
+        yield used, cypher
+    if scope and used == p and cypher:
+        CACHE.put(user_q, scope, cypher)
+
+def stream_cypher(user_q: str, provider: str = "Rules", ollama_model: str = "llama3.1",
+                  use_cache: bool = True, deadline: float | None = DEADLINE, fallback: bool = True):
+    """Yield (provider_used, text_so_far) while the query streams in.
+
+    LLM providers fall back to the rules engine when they error or exceed
+    `deadline` (unless `fallback` is False); the last snapshot is the final query.
+    """
+    p = (provider or "Rules").lower()
+    if p not in ("openai", "ollama"):
+        yield "rules", _rules_text(user_q)  # cheap, never cached
+        return
+    scope = _scope(p, ollama_model) if use_cache else None
+    if scope:
+        hit = CACHE.get(user_q, scope)
+        if hit is not None:
+            yield p, hit
+            return
+    yield from _stream_llm(user_q, p, ollama_model, deadline, fallback, scope)
+
+def generate_cypher(user_q: str, provider: str = "Rules", ollama_model: str = "llama3.1",
+                    use_cache: bool = True) -> str:
+    """Final query text (rules params inlined as literals)."""
+    cypher = ""
+    for _, cypher in stream_cypher(user_q, provider, ollama_model, use_cache=use_cache):
+        pass
+    return cypher
+
+def generate_query(user_q: str, provider: str = "Rules", ollama_model: str = "llama3.1",
+                   use_cache: bool = True) -> tuple:
+    """(cypher, params). The rules path stays parameterized so FalkorDB reuses its plan;
+    LLM output comes back with empty params."""
+    if (provider or "Rules").lower() not in ("openai", "ollama"):
+        return generate_with_rules(user_q)
+    return generate_cypher(user_q, provider, ollama_model, use_cache=use_cache), {}
+
+def _batch_one(user_q: str, provider: str, ollama_model: str, g=None, strict: bool = False) -> dict:
+    """One batch record. `provider` is the one that actually answered and `cached` tells whether the
+    text came from the cache; `strict` turns off both the cache and the rules fallback."""
+    rec = {"question": user_q, "provider": None, "cached": False, "cypher": None, "params": None, "gen_ms": None,
+           "status": None, "rows": None, "exec_ms": None, "error": None}
     p = (provider or "Rules").lower()
-    if p == "openai":
-        return generate_with_openai(user_q)
-    if p == "ollama":
-        return generate_with_ollama(user_q, model=ollama_model)
-    return generate_with_rules(user_q)
+    t0 = time.perf_counter()
+    try:
+        if p not in ("openai", "ollama"):
+            rec["provider"] = "rules"
+            rec["cypher"], rec["params"] = generate_with_rules(user_q)
+        else:
+            scope = None if strict else _scope(p, ollama_model)
+            hit = CACHE.get(user_q, scope) if scope else None
+            if hit is not None:
+                rec["provider"], rec["cached"], rec["cypher"] = p, True, hit
+            else:
+                used, cypher = None, ""
+                for used, cypher in _stream_llm(user_q, p, ollama_model, DEADLINE, fallback=not strict, scope=scope):
+                    pass
+                rec["provider"], rec["cypher"] = used, cypher
+            rec["params"] = {}
+    except Exception as e:
+        rec["error"] = f"generate: {e}"
+        return rec
+    finally:
+        rec["gen_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    if g is not None:
+        res = query_guard.run(g, rec["cypher"], rec["params"])
+        rec["status"], rec["exec_ms"] = res.status, res.elapsed_ms
+        if res.ok:
+            rec["rows"] = res.rows
+        else:
+            rec["error"] = f"{res.status}: {res.reason}"
+    return rec
+
+def generate_cypher_batch(questions, provider: str = "Rules", max_concurrency: int = 8,
+                          ollama_model: str = "llama3.1", g=None, strict: bool = False) -> list:
+    """Generate Cypher for many questions concurrently (and run it on `g` if given).
+
+    Returns one record per question, in input order. `strict` bypasses the
+    cache and the rules fallback, so every record measures `provider` itself.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if g is not None:
+        load_authorities(g)
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        return list(pool.map(lambda q: _batch_one(q, provider, ollama_model, g, strict), questions))
+
+def read_questions(path: str) -> list:
+    """One question per line (.txt) or JSONL objects with a `question`, `q` or `title` field."""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                obj = json.loads(line)
+                line = obj.get("question") or obj.get("q") or obj.get("title")
+            if line:
+                questions.append(line)
+    return questions
 
 # nl2cypher.py
 def top5_by_max_amount():
@@ -154,3 +235,31 @@ def programs_by_authority(auth_name: str):
     RETURN p.name AS program, coalesce(p.max_amount_eur,0) AS max_amount
     ORDER BY max_amount DESC
     """
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Batch NL→Cypher generation (and execution) to JSONL.")
+    ap.add_argument("questions", help=".txt (one per line) or .jsonl with question/q/title")
+    ap.add_argument("--provider", default="Rules", choices=["Rules", "OpenAI", "Ollama"])
+    ap.add_argument("--ollama-model", default="llama3.1")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--execute", action="store_true", help="run each query on FalkorDB")
+    ap.add_argument("--strict", action="store_true", help="no cache and no rules fallback: every answer comes from --provider")
+    ap.add_argument("--out", default="-", help="output JSONL path (default: stdout)")
+    args = ap.parse_args()
+
+    g = None
+    if args.execute:
+        from graph_client import get_graph
+        g = get_graph()
+    t0 = time.perf_counter()
+    records = generate_cypher_batch(read_questions(args.questions), provider=args.provider,
+                                    max_concurrency=args.concurrency, ollama_model=args.ollama_model, g=g,
+                                    strict=args.strict)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    for rec in records:
+        out.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+    if out is not sys.stdout:
+        out.close()
+    errors = sum(1 for r in records if r["error"])
+    print(f"{len(records)} question(s), {errors} error(s) in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
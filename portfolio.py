@@ -0,0 +1,91 @@
+# portfolio.py
+import csv
+import json
+import sys
+import time
+from typing import Iterable, Iterator
+
+from rec_index import RecommenderIndex
+
+PROGRAM_FIELDS = ("program", "max_eur", "cofund", "deadline", "authority", "docs")
+COMPANY_FIELDS = ("name", "sector", "size", "region", "matched_profile")
+
+def read_companies(path: str) -> Iterator[dict]:
+    """Companies from a CSV (header row) or JSONL file; needs sector/size/region, `name` is optional."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+def _profile(company: dict) -> tuple:
+    return tuple((str(company.get(k) or "")).strip() for k in ("sector", "size", "region"))
+
+def recommend_portfolio(companies: Iterable[dict], index: RecommenderIndex, min_amount: float = 0,
+                        min_cofund: float = 0.0, k: int = 5) -> Iterator[dict]:
+    """Yield each company with its top-k programs, same filters as the Streamlit recommender.
+
+    Results are computed once per distinct (sector, size, region) and reused,
+    so a portfolio of 10k companies with a few hundred profiles costs a few
+    hundred index lookups.
+    """
+    memo = {}
+    for company in companies:
+        profile = _profile(company)
+        if profile not in memo:
+            rows, matched = index.recommend(*profile, min_amount=min_amount, min_cofund=min_cofund, k=k)
+            memo[profile] = ([dict(zip(PROGRAM_FIELDS, r)) for r in rows], matched)
+        programs, matched = memo[profile]
+        yield {**company, "matched_profile": matched, "programs": programs}
+
+def write_jsonl(results: Iterable[dict], out) -> int:
+    n = 0
+    for rec in results:
+        out.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+        n += 1
+    return n
+
+def write_csv(results: Iterable[dict], out) -> int:
+    """One row per (company, rank).
+
+    Columns are COMPANY_FIELDS plus the first record's other keys; keys that
+    only later (JSONL) records carry are dropped.
+    """
+    writer, n = None, 0
+    for rec in results:
+        company = {k: v for k, v in rec.items() if k != "programs"}
+        if writer is None:
+            extra = [k for k in company if k not in COMPANY_FIELDS and k not in PROGRAM_FIELDS and k != "rank"]
+            writer = csv.DictWriter(out, fieldnames=[*COMPANY_FIELDS, *extra, "rank", *PROGRAM_FIELDS],
+                                    extrasaction="ignore")
+            writer.writeheader()
+        for rank, prog in enumerate(rec["programs"] or [{}], 1):
+            docs = prog.get("docs")
+            writer.writerow({**company, "rank": rank if prog else "", **prog,
+                             "docs": "; ".join(docs) if isinstance(docs, (list, tuple)) else docs})
+        n += 1
+    return n
+
+if __name__ == "__main__":
+    import argparse
+    from graph_client import get_graph
+
+    ap = argparse.ArgumentParser(description="Top-k subsidy programs for every company in a CSV/JSONL portfolio.")
+    ap.add_argument("companies", help="CSV or JSONL with sector, size, region (and e.g. name) per company")
+    ap.add_argument("--out", default="-", help="output path; .csv writes one row per company and rank (default: JSONL to stdout)")
+    ap.add_argument("--min-amount", type=float, default=0)
+    ap.add_argument("--min-cofund", type=float, default=0.0)
+    ap.add_argument("-k", type=int, default=5)
+    ap.add_argument("--graph", default=None)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    index = RecommenderIndex().build(get_graph(args.graph))
+    results = recommend_portfolio(read_companies(args.companies), index, args.min_amount, args.min_cofund, args.k)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8", newline="")
+    n = (write_csv if args.out.endswith(".csv") else write_jsonl)(results, out)
+    if out is not sys.stdout:
+        out.close()
+    print(f"{n} companies in {time.perf_counter() - t0:.2f}s (index: {index.stats()})", file=sys.stderr)
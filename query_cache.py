@@ -0,0 +1,91 @@
+# query_cache.py
+import json
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+CachedResult = namedtuple("CachedResult", ["header", "result_set"])
+
+def approx_size(obj, _depth: int = 0) -> int:
+    """Rough deep size in bytes of a result set (lists, dicts, scalars, falkordb Node/Edge)."""
+    size = sys.getsizeof(obj)
+    if _depth > 6:
+        return size
+    if isinstance(obj, (list, tuple, set)):
+        size += sum(approx_size(x, _depth + 1) for x in obj)
+    elif isinstance(obj, dict):
+        size += sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in obj.items())
+    elif hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), _depth + 1)
+    return size
+
+class QueryCache:
+    """Memory-bounded LRU of read results keyed on (graph, cypher, params).
+
+    Each entry remembers the graph version it was read at; when a graph's
+    version moves on (every write path bumps it) its older entries are dropped.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (version, size, CachedResult)
+        self._versions = {}            # graph name -> last seen version
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _key(graph_name: str, cypher: str, params: dict | None) -> tuple:
+        return graph_name, " ".join(cypher.split()), json.dumps(params or {}, sort_keys=True, default=str)
+
+    def _observe(self, graph_name: str, version: int):
+        if self._versions.get(graph_name) != version:
+            self._versions[graph_name] = version
+            for key in [k for k, e in self._entries.items() if k[0] == graph_name and e[0] != version]:
+                self._drop(key)
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, graph_name: str, version: int, cypher: str, params: dict | None = None):
+        key = self._key(graph_name, cypher, params)
+        with self._lock:
+            self._observe(graph_name, version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, graph_name: str, version: int, cypher: str, params: dict | None, result: CachedResult):
+        size = approx_size(result)
+        if size > self.max_bytes:
+            return
+        key = self._key(graph_name, cypher, params)
+        with self._lock:
+            self._observe(graph_name, version)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, size, result)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def query(self, g, cypher: str, params: dict | None = None, run=None) -> CachedResult:
+        """Cached read through `run(cypher, params)` (default: g.ro_query)."""
+        version = g.version()
+        hit = self.get(g.name, version, cypher, params)
+        if hit is not None:
+            return hit
+        rs = (run or g.ro_query)(cypher, params)
+        result = CachedResult(rs.header, rs.result_set)
+        self.put(g.name, version, cypher, params, result)
+        return result
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,186 @@
+# query_guard.py
+import os
+import re
+import threading
+import time
+from typing import NamedTuple, Optional
+
+# Defaults for ad-hoc (generated / agent) queries; override per call.
+GUARD_LIMIT = int(os.getenv("QUERY_GUARD_LIMIT", "1000"))              # injected when a query has no LIMIT
+GUARD_TIMEOUT_MS = int(os.getenv("QUERY_GUARD_TIMEOUT_MS", "5000"))    # passed to FalkorDB
+GUARD_MAX_SCAN = int(os.getenv("QUERY_GUARD_MAX_SCAN", "200000"))      # nodes a full/label scan may touch
+GUARD_MAX_CARTESIAN = int(os.getenv("QUERY_GUARD_MAX_CARTESIAN", "1000000"))  # rows a cartesian product may produce
+
+WRITE_OPS = {"Create", "Merge", "Delete", "Update", "Set", "Remove"}
+SCAN_OPS = {"All Node Scan", "Node By Label Scan"}
+# A LIMIT only bounds a scan when nothing in between can drop or hold back rows.
+STREAMING_OPS = {"Results", "Project", "Skip", "Limit"}
+
+class GuardResult(NamedTuple):
+    status: str                      # ok | rejected | timeout | error
+    cypher: str                      # query as executed (LIMIT injected)
+    header: Optional[list] = None
+    rows: Optional[list] = None
+    reason: Optional[str] = None
+    plan: Optional[str] = None       # EXPLAIN output for rejected queries
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+class QueryRejected(Exception):
+    def __init__(self, reason: str, plan: str = ""):
+        super().__init__(reason)
+        self.reason, self.plan = reason, plan
+
+_counts = {}  # (graph name, version) -> {label or None: node count}
+_lock = threading.Lock()
+
+def _count_query(label: str | None) -> str:
+    return f"MATCH (n:`{label}`) RETURN count(n)" if label else "MATCH (n) RETURN count(n)"
+
+def _cached_counts(name: str, version: int, labels: set) -> tuple:
+    """(known counts, labels still to fetch) for one graph version."""
+    with _lock:
+        cached = _counts.get((name, version), {})
+        return {l: cached[l] for l in labels if l in cached}, [l for l in labels if l not in cached]
+
+def _store_counts(name: str, version: int, counts: dict):
+    with _lock:
+        for k in [k for k in _counts if k[0] == name and k != (name, version)]:
+            del _counts[k]
+        _counts.setdefault((name, version), {}).update(counts)
+
+def _scan_label(op):
+    """Label scanned by this scan op itself, from its own args (None = all nodes)."""
+    m = re.search(r":`?(\w+)", op.args or "")
+    return m.group(1) if op.name == "Node By Label Scan" and m else None
+
+def _scan_labels(op, out: set) -> set:
+    """Labels (None = all nodes) scanned anywhere in the plan."""
+    if op.name in SCAN_OPS:
+        out.add(_scan_label(op))
+    for c in op.children:
+        _scan_labels(c, out)
+    return out
+
+def _estimate(op, counts: dict, problems: list, max_scan: int, max_cartesian: int, limited: bool = False) -> int:
+    """Rough upper bound on rows an operation produces; appends reasons to reject."""
+    if op.name in WRITE_OPS:
+        problems.append(f"write operation '{op.name}' is not allowed")
+    below = op.name == "Limit" or (limited and op.name in STREAMING_OPS)
+    child = [_estimate(c, counts, problems, max_scan, max_cartesian, below) for c in op.children]
+    if op.name in SCAN_OPS:
+        label = _scan_label(op)
+        n = counts.get(label, 0)
+        if n > max_scan and not limited:
+            what = f"label scan over {label}" if label else "full node scan"
+            problems.append(f"{what} touches {n} nodes (max {max_scan})")
+        return n
+    if op.name == "Cartesian Product":
+        rows = 1
+        for c in child:
+            rows *= max(c, 1)
+        if rows > max_cartesian:
+            problems.append(f"cartesian product of ~{rows} rows (max {max_cartesian})")
+        return rows
+    return max(child, default=1)
+
+def _verdict(plan, counts: dict, max_scan: int, max_cartesian: int):
+    problems = []
+    _estimate(plan.structured_plan, counts, problems, max_scan, max_cartesian)
+    if problems:
+        raise QueryRejected("; ".join(problems), str(plan))
+
+def check_plan(g, cypher: str, params: dict | None = None, max_scan: int = GUARD_MAX_SCAN,
+               max_cartesian: int = GUARD_MAX_CARTESIAN) -> None:
+    """EXPLAIN the query and raise QueryRejected if the plan writes or is too expensive."""
+    plan = g.explain(cypher, params)
+    labels = _scan_labels(plan.structured_plan, set())
+    counts = {}
+    if labels:
+        version = g.version()
+        counts, missing = _cached_counts(g.name, version, labels)
+        fetched = {l: g.ro_query(_count_query(l)).result_set[0][0] for l in missing}
+        _store_counts(g.name, version, fetched)
+        counts.update(fetched)
+    _verdict(plan, counts, max_scan, max_cartesian)
+
+async def acheck_plan(ag, cypher: str, params: dict | None = None, max_scan: int = GUARD_MAX_SCAN,
+                      max_cartesian: int = GUARD_MAX_CARTESIAN) -> None:
+    """check_plan for graph_client.AsyncGraph."""
+    plan = await ag.explain(cypher, params)
+    labels = _scan_labels(plan.structured_plan, set())
+    counts = {}
+    if labels:
+        version = await ag.version()
+        counts, missing = _cached_counts(ag.name, version, labels)
+        fetched = {l: (await ag.ro_query(_count_query(l))).result_set[0][0] for l in missing}
+        _store_counts(ag.name, version, fetched)
+        counts.update(fetched)
+    _verdict(plan, counts, max_scan, max_cartesian)
+
+_LIMIT_TAIL = re.compile(r"\bLIMIT\s+(\d+|\$\w+)\s*$", re.I)
+
+def with_limit(cypher: str, limit: int) -> str:
+    """Append (or tighten) a trailing LIMIT on a single RETURN query."""
+    q = cypher.strip().rstrip(";").rstrip()
+    if not limit or not re.search(r"\bRETURN\b", q, re.I) or re.search(r"\bUNION\b", q, re.I):
+        return q
+    m = _LIMIT_TAIL.search(q)
+    if m is None:
+        return f"{q}\nLIMIT {int(limit)}"
+    if m.group(1).isdigit() and int(m.group(1)) > limit:
+        return f"{q[:m.start(1)]}{int(limit)}"
+    return q
+
+def _failed(e: Exception, cypher: str, t0: float) -> GuardResult:
+    if isinstance(e, QueryRejected):
+        return GuardResult("rejected", cypher, reason=e.reason, plan=e.plan, elapsed_ms=_elapsed(t0))
+    status = "timeout" if "timed out" in str(e).lower() else "error"
+    return GuardResult(status, cypher, reason=str(e), elapsed_ms=_elapsed(t0))
+
+def _done(rs, cypher: str, limit: int, t0: float) -> GuardResult:
+    rows = rs.result_set
+    if limit and len(rows) > limit:  # UNION queries are not rewritten
+        rows = rows[:limit]
+    return GuardResult("ok", cypher, header=rs.header, rows=rows, elapsed_ms=_elapsed(t0))
+
+def _elapsed(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+def run(g, cypher: str, params: dict | None = None, cache=None, limit: int = GUARD_LIMIT,
+        timeout_ms: int = GUARD_TIMEOUT_MS, max_scan: int = GUARD_MAX_SCAN,
+        max_cartesian: int = GUARD_MAX_CARTESIAN) -> GuardResult:
+    """Check the plan, cap the result size and run read-only with a server-side timeout.
+
+    The plan is checked for the query as written: the injected LIMIT caps the
+    result, not the cost, so it never lets a large scan pass. With a
+    QueryCache, cached results skip the EXPLAIN round-trip entirely.
+    """
+    limited = with_limit(cypher, limit)
+    t0 = time.perf_counter()
+
+    def execute(q, p):
+        check_plan(g, cypher, p, max_scan, max_cartesian)
+        return g.ro_query(q, p, timeout=timeout_ms)
+
+    try:
+        rs = cache.query(g, limited, params, run=execute) if cache is not None else execute(limited, params)
+    except Exception as e:
+        return _failed(e, limited, t0)
+    return _done(rs, limited, limit, t0)
+
+async def arun(ag, cypher: str, params: dict | None = None, limit: int = GUARD_LIMIT,
+               timeout_ms: int = GUARD_TIMEOUT_MS, max_scan: int = GUARD_MAX_SCAN,
+               max_cartesian: int = GUARD_MAX_CARTESIAN) -> GuardResult:
+    """run() for graph_client.AsyncGraph (no QueryCache)."""
+    limited = with_limit(cypher, limit)
+    t0 = time.perf_counter()
+    try:
+        await acheck_plan(ag, cypher, params, max_scan, max_cartesian)
+        rs = await ag.ro_query(limited, params, timeout=timeout_ms)
+    except Exception as e:
+        return _failed(e, limited, t0)
+    return _done(rs, limited, limit, t0)
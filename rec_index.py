@@ -0,0 +1,102 @@
+# rec_index.py
+import threading
+import time
+
+import numpy as np
+
+PROGRAMS_Q = """
+MATCH (p:SubsidyProgram)
+OPTIONAL MATCH (p)-[:MANAGED_BY]->(a:Authority)
+OPTIONAL MATCH (p)-[:REQUIRES_DOCUMENT]->(d:Document)
+RETURN p.name AS program, p.max_amount_eur AS max_eur, p.cofund_rate AS cofund,
+       p.deadline AS deadline, head(collect(DISTINCT a.name)) AS authority, collect(DISTINCT d.name) AS docs
+"""
+PROFILES_Q = "MATCH (c:Company) RETURN DISTINCT c.sector, c.size, c.region"
+APPLIES_Q = """
+MATCH (c:Company)<-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
+RETURN DISTINCT c.sector, c.size, c.region, p.name
+"""
+
+def _floats(values) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+class RecommenderIndex:
+    """In-process snapshot of programs for the Top-5 recommender.
+
+    Programs are held as columnar arrays plus one boolean applicability row per
+    (sector, size, region) profile seen on a Company, so a recommendation is a
+    couple of vectorized masks and an argpartition, with no database round trip.
+    The snapshot is rebuilt when the graph version changes; the version itself
+    is checked at most every `check_interval` seconds.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self.version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.rows = []                                   # (program, max_eur, cofund, deadline, authority, docs)
+        self.max_eur = self.cofund = np.empty(0)        # NaN for missing; filters treat it as 0, ranking as -inf
+        self.profiles = {}                               # (sector, size, region) -> row in `applies`
+        self.applies = np.zeros((0, 0), dtype=bool)
+        self._cols = (np.empty(0),) * 4                   # amount/cofund for filtering, then for ranking
+
+    def build(self, g, version: int | None = None):
+        version = g.version() if version is None else version  # read first: writes during the build trigger a rebuild
+        rows = [tuple(r) for r in g.ro_query(PROGRAMS_Q).result_set]
+        pos = {r[0]: i for i, r in enumerate(rows)}
+        profiles = {tuple(r): i for i, r in enumerate(g.ro_query(PROFILES_Q).result_set)}
+        applies = np.zeros((len(profiles), len(rows)), dtype=bool)
+        for sector, size, region, prog in g.ro_query(APPLIES_Q).result_set:
+            i, j = profiles.get((sector, size, region)), pos.get(prog)
+            if i is not None and j is not None:
+                applies[i, j] = True
+        max_eur, cofund = _floats(r[1] for r in rows), _floats(r[2] for r in rows)
+        cols = (np.nan_to_num(max_eur, nan=0.0), np.nan_to_num(cofund, nan=0.0),
+                np.nan_to_num(max_eur, nan=-np.inf), np.nan_to_num(cofund, nan=-np.inf))
+        with self._lock:
+            self.rows, self.max_eur, self.cofund, self._cols = rows, max_eur, cofund, cols
+            self.profiles, self.applies = profiles, applies
+            self.version, self._checked = version, time.monotonic()
+        return self
+
+    def ensure(self, g):
+        """Rebuild if the graph version moved on since the last snapshot."""
+        now = time.monotonic()
+        if self.version is not None and now - self._checked < self.check_interval:
+            return self
+        version = g.version()
+        if version != self.version:
+            return self.build(g, version)
+        self._checked = now
+        return self
+
+    def recommend(self, sector: str, size: str, region: str, min_amount: float = 0,
+                  min_cofund: float = 0.0, k: int = 5):
+        """(rows, matched_profile). Rows are ordered by max_eur desc, cofund desc (nulls last).
+
+        Without a Company of that profile, all programs are ranked (same as the
+        Streamlit fallback).
+        """
+        with self._lock:
+            rows, (amount, rate, rank_amount, rank_rate) = self.rows, self._cols
+            profile = self.profiles.get((sector, size, region))
+            applies = self.applies[profile] if profile is not None else None
+        mask = (amount >= min_amount) & (rate >= min_cofund)
+        if applies is not None:
+            mask &= applies
+        return [rows[i] for i in self._top(np.flatnonzero(mask), rank_amount, rank_rate, k)], profile is not None
+
+    @staticmethod
+    def _top(idx: np.ndarray, rank_amount: np.ndarray, rank_rate: np.ndarray, k: int) -> np.ndarray:
+        primary = rank_amount[idx]
+        if k < len(idx):
+            # keep everything tied with the k-th largest amount so cofund can break ties
+            kth = primary[np.argpartition(-primary, k - 1)[:k]].min()
+            keep = primary >= kth
+            idx, primary = idx[keep], primary[keep]
+        order = np.lexsort((-rank_rate[idx], -primary))
+        return idx[order[:k]]
+
+    def stats(self) -> dict:
+        return {"version": self.version, "programs": len(self.rows), "profiles": len(self.profiles)}
@@ -0,0 +1,62 @@
+# results.py
+import json
+import re
+
+import pandas as pd
+
+import query_guard
+
+_TAIL_WINDOW = re.compile(r"\b(?:SKIP|LIMIT)\s+(?:\d+|\$\w+)\s*$", re.I)
+
+def column_names(header) -> list:
+    """Column names from a FalkorDB result header ([[type, name], ...])."""
+    return [h[1] if isinstance(h, (list, tuple)) and len(h) > 1 else str(h) for h in header or []]
+
+def _cell(v):
+    if hasattr(v, "properties"):  # Node / Edge
+        return json.dumps(v.properties, ensure_ascii=False, default=str)
+    if isinstance(v, dict):
+        return json.dumps(v, ensure_ascii=False, default=str)
+    return v
+
+def to_frame(header, rows) -> pd.DataFrame:
+    """Columnar DataFrame built straight from the header; no per-row dicts."""
+    names = column_names(header)
+    if rows and len(names) != len(rows[0]):
+        names = [f"col_{i}" for i in range(len(rows[0]))]
+    cols = list(zip(*rows)) if rows else [()] * len(names)
+    return pd.DataFrame({name: [_cell(v) for v in col] for name, col in zip(_unique(names), cols)})
+
+def _unique(names: list) -> list:
+    seen, out = {}, []
+    for n in names:
+        seen[n] = seen.get(n, 0) + 1
+        out.append(n if seen[n] == 1 else f"{n}_{seen[n]}")
+    return out
+
+def pageable(cypher: str) -> bool:
+    """True if a SKIP/LIMIT window can be appended server-side."""
+    q = cypher.strip().rstrip(";")
+    return (bool(re.search(r"\bRETURN\b", q, re.I)) and not re.search(r"\bUNION\b", q, re.I)
+            and not _TAIL_WINDOW.search(q))
+
+def fetch_page(g, cypher: str, params: dict | None = None, page: int = 1, page_size: int = 100,
+               cache=None) -> tuple:
+    """(GuardResult for the page, has_next).
+
+    Plain RETURN queries get a `SKIP $page_skip LIMIT $page_limit` window so only
+    one page crosses the wire; UNION queries and queries with their own
+    SKIP/LIMIT run once (cached) and are sliced client-side.
+    """
+    skip = (max(page, 1) - 1) * page_size
+    if pageable(cypher):
+        q = f"{cypher.strip().rstrip(';')}\nSKIP $page_skip LIMIT $page_limit"
+        p = {**(params or {}), "page_skip": skip, "page_limit": page_size + 1}
+        res = query_guard.run(g, q, p, cache=cache)
+        if not res.ok:
+            return res, False
+        return res._replace(rows=res.rows[:page_size]), len(res.rows) > page_size
+    res = query_guard.run(g, cypher, params, cache=cache)
+    if not res.ok:
+        return res, False
+    return res._replace(rows=res.rows[skip:skip + page_size]), len(res.rows) > skip + page_size
@@ -0,0 +1,225 @@
+# rules_engine.py
+import re
+from typing import Iterable
+
+# Extra surface forms per ontology value; values not in the ontology's
+# allowed_* lists are ignored, the ontology value itself always matches.
+SECTOR_SYNONYMS = {
+    "manufacturing": ["industrial", "industry", "maschinenbau", "production"],
+    "software": ["saas", "tech", "digital services"],
+    "energy": ["renewable", "renewables", "energie"],
+    "logistics": ["transport", "shipping", "freight"],
+}
+REGION_SYNONYMS = {
+    "DE-NW": ["nrw", "north rhine-westphalia", "north rhine westphalia", "north rhine",
+              "nordrhein-westfalen", "nordrhein"],
+    "DE-BE": ["berlin"],
+    "DE-BY": ["bavaria", "bayern", "munich"],
+    "DE-ST": ["saxony-anhalt", "sachsen-anhalt"],
+    "DE-HH": ["hamburg"],
+}
+SIZE_SYNONYMS = {
+    "micro": ["micro-enterprise", "micro enterprise"],
+    "medium": ["medium-sized", "mid-sized", "midsize", "mid-size"],
+}
+
+# intent -> patterns that must all match the lower-cased question; first hit wins
+INTENTS = [
+    ("documents", (r"\bdocument", r"\b(?:need|require)")),
+    ("authority", (r"\bmanag|\bauthorit|\badminist",)),
+    ("programs", ()),  # default
+]
+
+_NUM = r"(\d[\d,.]*)\s*(k\b|thousand|m\b|mio\b|million)?"
+_AMOUNT = re.compile(
+    r"(at least|min(?:imum)?|over|above|more than|greater than|>=?|at most|max(?:imum)?|up to|"
+    r"under|below|less than|<=?)\s*(?:€|eur\b|euro\b)?\s*" + _NUM + r"\s*(%|percent)?")
+_MIN_OPS = {"at least", "min", "minimum", "over", "above", "more than", "greater than", ">", ">="}
+_DEADLINE = re.compile(r"\b(before|by|until|till|no later than|after|from)\s+(\d{4}(?:-\d{2}-\d{2})?)\b")
+# comparison word -> (param, how a bare year expands); deadlines compare as ISO strings
+_DEADLINE_OPS = {"before": ("deadline_lt", "-01-01"), "after": ("deadline_gt", "-12-31"),
+                 "from": ("deadline_ge", "-01-01")}
+_DEADLINE_BY = ("deadline_le", "-12-31")  # by / until / till / no later than
+# A sector word only counts next to a noun that makes it a sector ("energy companies",
+# "sector: energy"), not inside e.g. a document name ("energy audit").
+_SECTOR_AFTER = re.compile(r"\s*-?\s*(?:compan(?:y|ies)|firms?|business(?:es)?|smes?|kmus?|start-?ups?|"
+                           r"enterprises?|sector|industry|branche|programs?|programmes?|subsid(?:y|ies)|grants?|"
+                           r"funding)\b")
+_SECTOR_BEFORE = re.compile(r"\b(?:sector|industry|branche)\s*(?::|is|=)?\s*$")
+_ROLLING = re.compile(r"\b(?:rolling|open[- ]ended|no deadline|any time|anytime)\b")
+_AUTHORITY = re.compile(r"\b(?:managed|administered|run|offered|funded)\s+by\s+(?:the\s+)?"
+                        r"([A-Z][\w&\-]*(?:\s+[A-Z][\w&\-]*)*)|\bauthority\s+(?:is\s+)?([A-Z][\w&\-]*)")
+
+_PROGRAM_COLUMNS = ("p.name AS program, p.max_amount_eur AS max_eur, "
+                    "p.cofund_rate AS cofund, p.deadline AS deadline")
+
+DEFAULT_COMPANY = "ACME Maschinenbau GmbH"
+
+def _dictionary(values: Iterable[str], synonyms: dict) -> tuple:
+    """(compiled alternation over all surface forms, surface form -> canonical value)."""
+    forms = {}
+    for v in values:
+        forms[v.lower()] = v
+        for s in synonyms.get(v, []):
+            forms[s.lower()] = v
+    alt = "|".join(re.escape(f) for f in sorted(forms, key=len, reverse=True))
+    return re.compile(rf"(?<![\w-])(?:{alt})(?![\w-])"), forms
+
+def _number(num: str, mult: str | None) -> float:
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", num):  # 20,000 / 20.000
+        value = float(re.sub(r"[.,]", "", num))
+    else:
+        value = float(num.rstrip(".,").replace(",", "."))
+    if mult in ("k", "thousand"):
+        value *= 1_000
+    elif mult in ("m", "mio", "million"):
+        value *= 1_000_000
+    return value
+
+def to_literal(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(to_literal(v) for v in value) + "]"
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def inline_params(cypher: str, params: dict | None) -> str:
+    """Substitute $params as literals, e.g. for display or providers that only pass text."""
+    if not params:
+        return cypher
+    return re.sub(r"\$(\w+)", lambda m: to_literal(params[m.group(1)]) if m.group(1) in params else m.group(0),
+                  cypher)
+
+class RuleEngine:
+    """Table-driven NL→Cypher for the common question shapes.
+
+    Returns a parameterized template plus params: the query text depends only
+    on which filters are present, never on their values, so FalkorDB can keep
+    reusing the cached plan. Runs in well under a millisecond.
+    """
+
+    def __init__(self, sectors: Iterable[str], regions: Iterable[str], sizes: Iterable[str],
+                 authorities: Iterable[str] = ()):
+        self.intents = [(name, [re.compile(p) for p in pats]) for name, pats in INTENTS]
+        self.entities = {
+            "sector": _dictionary(sectors, SECTOR_SYNONYMS),
+            "size": _dictionary(sizes, SIZE_SYNONYMS),
+            "region": _dictionary(regions, REGION_SYNONYMS),
+        }
+        self._authorities = (None, {})  # (compiled alternation, lower-case name -> name)
+        self.set_authorities(authorities)
+
+    @classmethod
+    def from_ontology(cls, ont: dict, authorities: Iterable[str] = ()) -> "RuleEngine":
+        return cls(ont.get("allowed_sectors") or [], ont.get("allowed_regions") or [],
+                   ont.get("allowed_sizes") or [], authorities)
+
+    def set_authorities(self, names: Iterable[str]):
+        """Replace the known Authority names, matched anywhere in a question ("KfW programs")."""
+        names = [n for n in names if n]
+        # one assignment, so concurrent `filters` calls see either the old or the new set
+        self._authorities = _dictionary(names, {}) if names else (None, {})
+
+    def intent(self, q: str) -> str:
+        for name, patterns in self.intents:
+            if all(p.search(q) for p in patterns):
+                return name
+        return "programs"
+
+    def filters(self, user_q: str) -> dict:
+        """Extracted filter values keyed by parameter name."""
+        q = user_q.lower()
+        found = {}
+        for key, (rx, forms) in self.entities.items():
+            for m in rx.finditer(q):
+                if key != "sector" or _SECTOR_AFTER.match(q, m.end()) or _SECTOR_BEFORE.search(q, 0, m.start()):
+                    found[key] = forms[m.group(0)]
+                    break
+        for m in _AMOUNT.finditer(q):
+            op, num, mult, pct = m.groups()
+            lower = op in _MIN_OPS
+            if pct or "cofund" in q[m.end():m.end() + 20]:
+                rate = _number(num, None)
+                rate = rate / 100 if pct or rate > 1 else rate
+                found["min_cofund" if lower else "max_cofund"] = rate
+            else:
+                value = _number(num, mult)
+                found["min_amount" if lower else "max_amount"] = int(value) if value.is_integer() else value
+        m = _DEADLINE.search(q)
+        if m:
+            op, date = m.groups()
+            key, year_suffix = _DEADLINE_OPS.get(op, _DEADLINE_BY)
+            found[key] = date + year_suffix if len(date) == 4 else date
+        elif _ROLLING.search(q):
+            found["rolling"] = True
+        authority = None
+        rx, names = self._authorities
+        if rx is not None:
+            m = rx.search(q)
+            authority = names[m.group(0)] if m else None
+        if authority is None:
+            m = _AUTHORITY.search(user_q)
+            authority = (m.group(1) or m.group(2)) if m else None
+        if authority:
+            found["authority"] = authority
+        return found
+
+    def match(self, user_q: str) -> tuple:
+        """(cypher_template, params) for a question."""
+        intent = self.intent(user_q.lower())
+        f = self.filters(user_q)
+        params = {}
+        company = [k for k in ("sector", "size", "region") if k in f]
+        if company:
+            props = ", ".join(f"{k}:${k}" for k in company)
+            lines = [f"MATCH (c:Company {{{props}}})",
+                     "      <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)"]
+            params.update({k: f[k] for k in company})
+        elif intent == "programs" and len(f) == 0:
+            # nothing to filter on: the demo company's programs
+            lines = ["MATCH (:Company {name:$company})",
+                     "      <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)"]
+            params["company"] = DEFAULT_COMPANY
+        else:
+            lines = ["MATCH (p:SubsidyProgram)"]
+        if "authority" in f and intent != "authority":
+            lines.append("MATCH (p)-[:MANAGED_BY]->(:Authority {name:$authority})")
+            params["authority"] = f["authority"]
+
+        where = []
+        for key, cond in (("min_amount", "coalesce(p.max_amount_eur,0) >= $min_amount"),
+                          ("max_amount", "p.max_amount_eur <= $max_amount"),
+                          ("min_cofund", "coalesce(p.cofund_rate,0) >= $min_cofund"),
+                          ("max_cofund", "p.cofund_rate <= $max_cofund"),
+                          ("deadline_lt", "p.deadline < $deadline_lt"),
+                          ("deadline_le", "p.deadline <= $deadline_le"),
+                          ("deadline_gt", "p.deadline > $deadline_gt AND p.deadline <> 'rolling'"),
+                          ("deadline_ge", "p.deadline >= $deadline_ge AND p.deadline <> 'rolling'")):
+            if key in f:
+                where.append(cond)
+                params[key] = f[key]
+        if f.get("rolling"):
+            where.append("p.deadline = 'rolling'")
+        if where:
+            lines.append("WHERE " + "\n  AND ".join(where))
+
+        if intent == "documents":
+            lines += ["MATCH (p)-[:REQUIRES_DOCUMENT]->(d:Document)",
+                      "RETURN p.name AS program, collect(DISTINCT d.name) AS required_docs",
+                      "ORDER BY program"]
+        elif intent == "authority":
+            if "authority" in f:
+                lines.append("MATCH (p)-[:MANAGED_BY]->(a:Authority {name:$authority})")
+                params["authority"] = f["authority"]
+            else:
+                lines.append("MATCH (p)-[:MANAGED_BY]->(a:Authority)")
+            lines += ["RETURN DISTINCT p.name AS program, a.name AS authority",
+                      "ORDER BY program"]
+        else:
+            lines += [f"RETURN DISTINCT {_PROGRAM_COLUMNS}",
+                      "ORDER BY max_eur DESC"]
+        return "\n".join(lines), params
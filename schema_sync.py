@@ -0,0 +1,73 @@
+# schema_sync.py
+import os
+import yaml
+
+ONTOLOGY_PATH = os.getenv("ONTOLOGY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ontology.yaml"))
+
+def load_ontology(path: str | None = None) -> dict:
+    with open(path or ONTOLOGY_PATH, "r") as f:
+        return yaml.safe_load(f)
+
+def desired_schema(ont: dict):
+    """(range indexes, unique constraints) declared via `key` / `indexes` on ontology nodes."""
+    indexes, uniques = set(), set()
+    for label, spec in (ont.get("nodes") or {}).items():
+        spec = spec or {}
+        if spec.get("key"):
+            uniques.add((label, spec["key"]))
+            indexes.add((label, spec["key"]))  # unique constraints need a range index
+        for prop in spec.get("indexes") or []:
+            indexes.add((label, prop))
+    return indexes, uniques
+
+def current_schema(g):
+    indexes, uniques = set(), set()
+    rs = g.ro_query("CALL db.indexes() YIELD label, properties, types, entitytype").result_set
+    for label, props, types, entitytype in rs:
+        if entitytype != "NODE":
+            continue
+        for prop in props:
+            kinds = types.get(prop) if isinstance(types, dict) else None
+            if not kinds or "RANGE" in kinds:
+                indexes.add((label, prop))
+    for c in g.list_constraints():
+        if c["type"] == "UNIQUE" and c["entitytype"] == "NODE" and len(c["properties"]) == 1 \
+                and c["status"] != "FAILED":
+            uniques.add((c["label"], c["properties"][0]))
+    return indexes, uniques
+
+def sync_schema(g, ont: dict | None = None, dry_run: bool = False) -> list:
+    """Create missing range indexes and unique constraints; returns a report of changes.
+
+    Idempotent: anything already present is left alone.
+    """
+    want_idx, want_unique = desired_schema(ont or load_ontology())
+    have_idx, have_unique = current_schema(g)
+    report = []
+    for label, prop in sorted(want_idx - have_idx):
+        report.append(f"range index :{label}({prop})")
+        if not dry_run:
+            g.create_node_range_index(label, prop)
+    for label, prop in sorted(want_unique - have_unique):
+        if dry_run:
+            report.append(f"unique constraint :{label}({prop})")
+            continue
+        try:
+            g.create_node_unique_constraint(label, prop)
+            report.append(f"unique constraint :{label}({prop})")
+        except Exception as e:  # e.g. existing duplicates
+            report.append(f"FAILED unique constraint :{label}({prop}): {e}")
+    return report
+
+if __name__ == "__main__":
+    import argparse
+    from graph_client import get_graph
+    ap = argparse.ArgumentParser(description="Create missing indexes/constraints declared in ontology.yaml.")
+    ap.add_argument("--graph", default=None)
+    ap.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = ap.parse_args()
+    changes = sync_schema(get_graph(args.graph), dry_run=args.dry_run)
+    prefix = "Would create" if args.dry_run else "Created"
+    for c in changes:
+        print(c if c.startswith("FAILED") else f"{prefix}: {c}")
+    print(f"{len(changes)} change(s)" if changes else "Schema up to date ✅")
@@ -20,10 +20,10 @@ RETURN a.name, b.name
 print("Result:", rs)
 
 # smoke.py
-from app import get_graph, seed_minimal
+from app import get_graph, seed_demo
 
 if __name__ == "__main__":
-    print(seed_minimal())
+    seed_demo()
     g = get_graph()
     rs = g.query("MATCH (p:SubsidyProgram) RETURN p.name, p.max_amount_eur").result_set
     print("Programs:", rs)
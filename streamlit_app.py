@@ -1,12 +1,16 @@
 # streamlit_app.py
-import os, json, tempfile, textwrap
+import os
 import streamlit as st
-from falkordb import FalkorDB
-from nl2cypher import generate_cypher, top5_by_max_amount
+import graph_client
+import graph_view
+import results
+from query_cache import QueryCache
+from rec_index import RecommenderIndex
+from nl2cypher import generate_query, load_authorities, stream_cypher, top5_by_max_amount
 
 # Optional imports that shouldn't crash the app if missing
 try:
-    from pyvis.network import Network
+    import pyvis  # noqa: F401  (rendering lives in graph_view)
     HAS_PYVIS = True
 except Exception:
     HAS_PYVIS = False
@@ -20,18 +24,25 @@ except Exception as e:
 st.set_page_config(page_title="Subsidy GraphRAG", layout="wide")
 st.title("Subsidy GraphRAG")
 
-# ---------- DB connection (cached) ----------
+# ---------- DB connection (pooled, shared across sessions) ----------
 @st.cache_resource
-def get_graph_cached(host: str, port: int, graph_name: str):
-    db = FalkorDB(host=host, port=port)
-    return db.select_graph(graph_name)
+def get_query_cache() -> QueryCache:
+    # shared by all sessions; entries are dropped when the graph version changes
+    return QueryCache(max_bytes=int(os.getenv("QUERY_CACHE_MB", "64")) * 1024 * 1024)
+
+qcache = get_query_cache()
+
+@st.cache_resource
+def get_rec_index(host: str, port: int, graph_name: str) -> RecommenderIndex:
+    # one snapshot per graph, shared by all sessions; rebuilt when the graph version changes
+    return RecommenderIndex()
 
 with st.sidebar:
     st.header("Database")
-    host = st.text_input("Host", "localhost")
-    port = st.number_input("Port", 6379, step=1)
-    graph_name = st.text_input("Graph", "subsidy_demo")
-    g = get_graph_cached(host, int(port), graph_name)
+    host = st.text_input("Host", graph_client.FALKOR_HOST)
+    port = st.number_input("Port", graph_client.FALKOR_PORT, step=1)
+    graph_name = st.text_input("Graph", graph_client.GRAPH_NAME)
+    g = graph_client.get_graph(graph_name, host=host, port=int(port))
 
     st.header("LLM Provider")
     provider = st.selectbox("Choose", ["Rules", "OpenAI", "Ollama"], index=0)
@@ -54,45 +65,52 @@ with tab_ask:
     user_q = st.text_input("Natural language question", value=default_q)
     go = st.button("Generate & Run")
 
-    def run_query(cypher: str):
-        try:
-            rs = g.query(cypher).result_set
-            return rs, None
-        except Exception as e:
-            return None, str(e)
-
     if go:
-        with st.spinner("Generating Cypher..."):
-            cypher = generate_cypher(
-                user_q,
-                provider=provider,
-                ollama_model=(ollama_model or "llama3.1"),
-            )
-        st.code(cypher, language="cypher")
+        code_box = st.empty()
+        used, cypher, params = None, "", {}
+        load_authorities(g)
+        if provider == "Rules":
+            cypher, params = generate_query(user_q)
+            code_box.code(cypher, language="cypher")
+        else:
+            with st.spinner("Generating Cypher..."):
+                for used, cypher in stream_cypher(
+                    user_q,
+                    provider=provider,
+                    ollama_model=(ollama_model or "llama3.1"),
+                ):
+                    code_box.code(cypher, language="cypher")
+        note = f"{provider} was too slow or failed — fell back to {used}." if used and used != provider.lower() else None
+        st.session_state.ask = {"cypher": cypher, "params": params, "note": note}
+        st.session_state.ask_page = 1
+
+    ask = st.session_state.get("ask")
+    if ask:
+        if not go:
+            st.code(ask["cypher"], language="cypher")
+        if ask["params"]:
+            st.caption(f"params: {ask['params']}")
+        if ask["note"]:
+            st.caption(ask["note"])
+
+        colP, colS = st.columns([1, 1])
+        with colS:
+            page_size = st.selectbox("Rows per page", [50, 100, 500], index=1)
+        with colP:
+            page = st.number_input("Page", min_value=1, step=1, key="ask_page")
 
         with st.spinner("Running on FalkorDB..."):
-            rows, err = run_query(cypher)
+            res, has_next = results.fetch_page(g, ask["cypher"], ask["params"], int(page), page_size, cache=qcache)
 
-        if err:
-            st.error(f"Query error: {err}")
+        if not res.ok:
+            st.error(f"Query {res.status}: {res.reason}")
+        elif not res.rows:
+            st.warning("No rows returned." if page == 1 else "No more rows.")
         else:
-            if not rows:
-                st.warning("No rows returned.")
-            else:
-                # infer headers from RETURN aliases where possible
-                cols = [f"col_{i}" for i in range(len(rows[0]))]
-                try:
-                    upper = cypher.upper()
-                    if "RETURN" in upper:
-                        rp = upper.split("RETURN", 1)[1]
-                        rp = rp.split("ORDER BY")[0] if "ORDER BY" in rp else rp
-                        headers = [h.strip() for h in rp.split(",")]
-                        parsed = [(h.split(" AS ", 1)[1].strip() if " AS " in h else h) for h in headers]
-                        if len(parsed) == len(rows[0]): cols = parsed
-                except Exception:
-                    pass
-                st.success(f"{len(rows)} row(s)")
-                st.dataframe([dict(zip(cols, r)) for r in rows], use_container_width=True)
+            first = (int(page) - 1) * page_size + 1
+            more = " — next page available" if has_next else ""
+            st.success(f"Rows {first}–{first + len(res.rows) - 1}{more}")
+            st.dataframe(results.to_frame(res.header, res.rows), use_container_width=True)
 
 # ---------- Graph tab ----------
 with tab_graph:
@@ -101,112 +119,32 @@ with tab_graph:
         st.info("Install pyvis to enable the interactive graph: `pip install pyvis`")
     vis_mode = st.selectbox(
         "Choose subgraph",
-        ["ACME neighborhood (Company ↔ Programs ↔ Docs/Authority)",
-         "Everything (limited to 150 edges)"],
+        ["Company neighborhood (Company ↔ Programs ↔ Docs/Authority)",
+         "Overview (highest-degree nodes)"],
         index=0
     )
-    build = st.button("Build graph view")
-
-    def node_color(label: str) -> str:
-        return {
-            "Company": "#4C78A8",
-            "SubsidyProgram": "#72B7B2",
-            "Authority": "#F58518",
-            "Document": "#E45756",
-            "EligibilityCriterion": "#54A24B",
-        }.get(label, "#999999")
-
-    def normalize_node(ent):
-        label, name = "Node", None
-        if hasattr(ent, "label"):
-            try:
-                label = ent.label if not callable(ent.label) else ent.label()
-            except Exception:
-                pass
-        elif hasattr(ent, "labels"):
-            try:
-                labs = ent.labels() if callable(ent.labels) else ent.labels
-                if labs: label = list(labs)[0] if not isinstance(labs, str) else labs
-            except Exception:
-                pass
-        elif isinstance(ent, dict):
-            labs = ent.get("labels") or ent.get("label")
-            if labs:
-                label = list(labs)[0] if isinstance(labs, (list, tuple, set)) else str(labs)
-        props = None
-        if hasattr(ent, "properties"):
-            props = ent.properties
-        elif isinstance(ent, dict):
-            props = ent.get("properties", ent)
-        if isinstance(props, dict):
-            name = props.get("name") or props.get("id") or props.get("code")
-        if not name:
-            name = f"{label}:{id(ent)}"
-        return str(name), str(label)
-
-    def normalize_rel(ent):
-        if hasattr(ent, "type"):
-            try:
-                t = ent.type if not callable(ent.type) else ent.type()
-                return str(t)
-            except Exception:
-                pass
-        if hasattr(ent, "relation_type"):
-            try:
-                t = ent.relation_type if not callable(ent.relation_type) else ent.relation_type()
-                return str(t)
-            except Exception:
-                pass
-        if isinstance(ent, dict):
-            return str(ent.get("type") or ent.get("relationshipType") or "REL")
-        return "REL"
-
-    if build and HAS_PYVIS:
-        if vis_mode.startswith("ACME"):
-            vis_query = """
-            MATCH (c:Company {name:'ACME Maschinenbau GmbH'})-[r1]-(p:SubsidyProgram)
-            RETURN c AS n, r1 AS r, p AS m
-            UNION
-            MATCH (p:SubsidyProgram)-[r2:REQUIRES_DOCUMENT]->(d:Document)
-            RETURN p AS n, r2 AS r, d AS m
-            UNION
-            MATCH (p:SubsidyProgram)-[r3:MANAGED_BY]->(a:Authority)
-            RETURN p AS n, r3 AS r, a AS m
-            LIMIT 200
-            """
+    if vis_mode.startswith("Company"):
+        focus = st.text_input("Company", "ACME Maschinenbau GmbH")
+        view, view_params = "neighborhood", {"name": focus}
+    else:
+        k = st.slider("Nodes to sample", 10, 200, 30, 10)
+        view, view_params = "overview", {"k": k}
+    if st.button("Build graph view"):
+        st.session_state.graph_view = (view, view_params)
+        st.session_state.graph_expand = []
+
+    if HAS_PYVIS and "graph_view" in st.session_state:
+        view, view_params = st.session_state.graph_view
+        expanded = sorted(st.session_state.get("graph_expand", []))
+        try:
+            sub, html = graph_view.cached_view(g, view, expanded=expanded, **view_params)
+        except Exception as e:
+            st.error(f"Graph query failed: {e}")
         else:
-            vis_query = """
-            MATCH (n)-[r]->(m)
-            RETURN n, r, m
-            LIMIT 150
-            """
-
-        rs = g.query(vis_query).result_set
-
-        net = Network(height="650px", width="100%", bgcolor="#ffffff", font_color="#222222")
-        net.barnes_hut()
-
-        seen = set()
-        for row in rs:
-            if len(row) != 3:
-                continue
-            n, r, m = row
-            n_name, n_label = normalize_node(n)
-            m_name, m_label = normalize_node(m)
-            r_type = normalize_rel(r)
-
-            if n_name not in seen:
-                net.add_node(n_name, label=n_name, title=n_label, color=node_color(n_label))
-                seen.add(n_name)
-            if m_name not in seen:
-                net.add_node(m_name, label=m_name, title=m_label, color=node_color(m_label))
-                seen.add(m_name)
-            net.add_edge(n_name, m_name, label=r_type)
-
-        with tempfile.TemporaryDirectory() as td:
-            html_path = os.path.join(td, "graph.html")
-            net.write_html(html_path, open_browser=False, notebook=False)
-            st.components.v1.html(open(html_path, "r", encoding="utf-8").read(), height=680, scrolling=True)
+            st.caption(f"{len(sub.nodes)} nodes, {len(sub.edges)} edges — documents/criteria are shown as counts.")
+            st.components.v1.html(html, height=680, scrolling=True)
+            names = sub.expandable()
+            st.multiselect("Expand neighbors of", options=list(names), format_func=names.get, key="graph_expand")
 
 # ---------- Top-5 Recommender ----------
 with tab_rec:
@@ -226,44 +164,10 @@ with tab_rec:
         min_cofund = st.slider("Min cofund_rate", 0.0, 1.0, 0.0, 0.05)
 
     if st.button("Recommend"):
-        exists_q = """
-        MATCH (c:Company {sector:$sector, size:$size, region:$region})
-        RETURN count(c) AS cnt
-        """
-        cnt = g.query(exists_q, {"sector": sector, "size": size, "region": region}).result_set[0][0]
-
-        if cnt > 0:
-            rec_q = """
-            MATCH (c:Company {sector:$sector, size:$size, region:$region})
-                  <-[:APPLIES_TO_SECTOR|:APPLIES_TO_REGION]-(p:SubsidyProgram)
-            WHERE coalesce(p.max_amount_eur,0) >= $min_amount
-              AND coalesce(p.cofund_rate,0) >= $min_cofund
-            OPTIONAL MATCH (p)-[:MANAGED_BY]->(a:Authority)
-            OPTIONAL MATCH (p)-[:REQUIRES_DOCUMENT]->(d:Document)
-            RETURN p.name AS program, p.max_amount_eur AS max_eur, p.cofund_rate AS cofund,
-                   p.deadline AS deadline, a.name AS authority, collect(DISTINCT d.name) AS docs
-            ORDER BY max_eur DESC, cofund DESC
-            LIMIT 5
-            """
-            params = {"sector": sector, "size": size, "region": region,
-                      "min_amount": int(min_amount), "min_cofund": float(min_cofund)}
-            rows = g.query(rec_q, params).result_set
-            source_note = "Matched a Company with those attributes."
-        else:
-            rec_q = """
-            MATCH (p:SubsidyProgram)
-            WHERE coalesce(p.max_amount_eur,0) >= $min_amount
-              AND coalesce(p.cofund_rate,0) >= $min_cofund
-            OPTIONAL MATCH (p)-[:MANAGED_BY]->(a:Authority)
-            OPTIONAL MATCH (p)-[:REQUIRES_DOCUMENT]->(d:Document)
-            RETURN p.name AS program, p.max_amount_eur AS max_eur, p.cofund_rate AS cofund,
-                   p.deadline AS deadline, a.name AS authority, collect(DISTINCT d.name) AS docs
-            ORDER BY max_eur DESC, cofund DESC
-            LIMIT 5
-            """
-            params = {"min_amount": int(min_amount), "min_cofund": float(min_cofund)}
-            rows = g.query(rec_q, params).result_set
-            source_note = "No Company matched those attributes — showing top programs overall."
+        rec_index = get_rec_index(host, int(port), graph_name).ensure(g)
+        rows, matched = rec_index.recommend(sector, size, region, int(min_amount), float(min_cofund), k=5)
+        source_note = ("Matched a Company with those attributes." if matched
+                       else "No Company matched those attributes — showing top programs overall.")
 
         if not rows:
             st.warning("No programs matched your filters.")
@@ -281,8 +185,8 @@ with tab_rec:
                 })
             st.success(f"Top {len(table)} result(s)")
             st.dataframe(table, use_container_width=True)
-            with st.expander("Show Cypher"):
-                st.code(rec_q, language="cypher")
+            with st.expander("Show index snapshot"):
+                st.json(rec_index.stats())
 
 # ---------- Agent ----------
 with tab_agent:
@@ -311,8 +215,19 @@ with tab_agent:
                 resp = st.session_state.agent.run(user_q)
                 st.success("Response")
                 st.write(resp)
+                timings = getattr(st.session_state.agent, "last_timings", None)
+                if timings:
+                    with st.expander("Step timings"):
+                        st.dataframe(timings, use_container_width=True)
             except Exception as e:
                 st.error(f"Agent error: {e}")
 
+with st.sidebar:
+    st.header("Query cache")
+    s = qcache.stats()
+    total = s["hits"] + s["misses"]
+    st.caption(f"{s['hits']}/{total} hits ({(s['hits'] / total if total else 0):.0%}), "
+               f"{s['entries']} entries, {s['bytes'] / 1e6:.1f} MB, {s['evictions']} evictions")
+
 st.markdown("---")
 st.caption("Tip: Try “Which subsidies apply to small companies in NRW?”, “What documents are required?”, or “Who manages each program?”.")
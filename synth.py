@@ -0,0 +1,183 @@
+# synth.py
+import argparse
+import csv
+import itertools
+import os
+import time
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+from schema_sync import load_ontology
+
+class SynthSpec(NamedTuple):
+    """Target counts and per-program edge densities; the same spec always yields the same data."""
+    seed: int = 0
+    companies: int = 1000
+    programs: int = 200
+    authorities: int = 20
+    documents: int = 12
+    criteria: int = 8
+    applies_per_program: float = 3.0   # companies per program (APPLIES_TO_SECTOR and _REGION)
+    docs_per_program: float = 2.0
+    criteria_per_program: float = 1.5
+    skew: float = 1.1                  # Zipf exponent for categories and edge targets
+    batch: int = 5000                  # rows generated (and held) at a time
+
+DOCUMENT_NAMES = ["Business Plan", "Financial Statements", "Company Registration", "Energy Audit Report",
+                  "Finanzplan", "Jahresabschlüsse", "Handelsregisterauszug", "Energieaudit"]
+CRITERIA_CODES = ["SME_DEF", "REGION_TARGET", "ENERGY_SAVING"]
+LEVELS = ["federal", "state", "eu"]
+
+# Stream ids keep each section's random numbers independent of the others.
+_STREAMS = {"Company": 1, "SubsidyProgram": 2, "Authority": 3, "MANAGED_BY": 4, "APPLIES_TO": 5,
+            "REQUIRES_DOCUMENT": 6, "ELIGIBLE_IF": 7, "categories": 8}
+
+def _rng(spec: SynthSpec, stream: str, block: int = 0) -> np.random.Generator:
+    return np.random.default_rng([spec.seed, _STREAMS[stream], block])
+
+def zipf(rng: np.random.Generator, n: int, s: float, size: int) -> np.ndarray:
+    """Ranks in [0, n) with P(r) ~ 1/(r+1)^s, via the continuous inverse CDF (O(1) memory for any n)."""
+    u = rng.random(size)
+    if abs(s - 1) < 1e-9:
+        x = (n + 1) ** u
+    else:
+        x = (((n + 1) ** (1 - s) - 1) * u + 1) ** (1 / (1 - s))
+    return np.minimum(x.astype(np.int64) - 1, n - 1)
+
+def name(label: str, i: int) -> str:
+    """Deterministic MERGE key of the i-th node of `label`."""
+    if label == "Company":
+        return "ACME Maschinenbau GmbH" if i == 0 else f"Company {i:07d}"
+    if label == "SubsidyProgram":
+        return f"Program {i:07d}"
+    if label == "Authority":
+        return f"Authority {i:05d}"
+    if label == "Document":
+        return DOCUMENT_NAMES[i] if i < len(DOCUMENT_NAMES) else f"Document {i:05d}"
+    if label == "EligibilityCriterion":
+        return CRITERIA_CODES[i] if i < len(CRITERIA_CODES) else f"CRIT_{i:05d}"
+    raise ValueError(f"Unknown node label: {label}")
+
+def _categories(spec: SynthSpec, ont: dict) -> dict:
+    """Allowed values per company field, shuffled per seed so the Zipf head varies."""
+    rng = _rng(spec, "categories")
+    return {f: [ont[key][i] for i in rng.permutation(len(ont[key]))]
+            for f, key in (("sector", "allowed_sectors"), ("size", "allowed_sizes"), ("region", "allowed_regions"))}
+
+def _blocks(n: int, size: int) -> Iterator[tuple]:
+    for b, start in enumerate(range(0, n, size)):
+        yield b, start, min(start + size, n)
+
+def nodes(spec: SynthSpec, ont: dict | None = None) -> Iterator[tuple]:
+    """Yield (label, [props, ...]) batches for every node label."""
+    cats = _categories(spec, ont or load_ontology())
+    for b, lo, hi in _blocks(spec.companies, spec.batch):
+        rng, n = _rng(spec, "Company", b), hi - lo
+        fields = {f: zipf(rng, len(values), spec.skew, n) for f, values in cats.items()}
+        years = 2024 - zipf(rng, 75, 0.5, n)
+        yield "Company", [{"name": name("Company", lo + j), **{f: cats[f][fields[f][j]] for f in cats},
+                           "founded_year": int(years[j])} for j in range(n)]
+    for b, lo, hi in _blocks(spec.programs, spec.batch):
+        rng, n = _rng(spec, "SubsidyProgram", b), hi - lo
+        amounts = np.round(rng.lognormal(10.5, 1.0, n), -3).clip(1000, 5_000_000).astype(np.int64)
+        missing = rng.random(n) < 0.05
+        rates = rng.choice([0.25, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8], n, p=[.1, .15, .25, .25, .15, .06, .04])
+        levels = zipf(rng, len(LEVELS), spec.skew, n)
+        rolling = rng.random(n) < 0.4
+        days = rng.integers(0, 730, n)
+        yield "SubsidyProgram", [{
+            "name": name("SubsidyProgram", lo + j), "level": LEVELS[levels[j]],
+            "max_amount_eur": None if missing[j] else int(amounts[j]), "cofund_rate": float(rates[j]),
+            "deadline": "rolling" if rolling[j] else str(np.datetime64("2025-01-01") + int(days[j])),
+        } for j in range(n)]
+    for b, lo, hi in _blocks(spec.authorities, spec.batch):
+        yield "Authority", [{"name": name("Authority", i), "country": "DE",
+                             "url": f"https://authority-{i:05d}.example.de"} for i in range(lo, hi)]
+    for b, lo, hi in _blocks(spec.documents, spec.batch):
+        yield "Document", [{"name": name("Document", i), "description": f"Synthetic document {i}"}
+                           for i in range(lo, hi)]
+    for b, lo, hi in _blocks(spec.criteria, spec.batch):
+        yield "EligibilityCriterion", [{"name": name("EligibilityCriterion", i), "code": name("EligibilityCriterion", i),
+                                        "description": f"Synthetic criterion {i}"} for i in range(lo, hi)]
+
+def _edge_batch(rng, lo: int, hi: int, targets: int, mean: float, s: float, at_least: int = 0) -> tuple:
+    """(program index, target index) arrays, deduplicated, for programs lo..hi."""
+    counts = np.maximum(rng.poisson(mean, hi - lo), at_least)
+    src = np.repeat(np.arange(lo, hi, dtype=np.int64), counts)
+    dst = zipf(rng, targets, s, len(src))
+    keys = np.unique(src * targets + dst)
+    return keys // targets, keys % targets
+
+def edges(spec: SynthSpec) -> Iterator[tuple]:
+    """Yield (rel, [(src_name, dst_name), ...]) batches; endpoints follow the ontology."""
+    plan = [("MANAGED_BY", "Authority", spec.authorities, 1.0, 1),
+            ("APPLIES_TO", "Company", spec.companies, spec.applies_per_program, 1),
+            ("REQUIRES_DOCUMENT", "Document", spec.documents, spec.docs_per_program, 0),
+            ("ELIGIBLE_IF", "EligibilityCriterion", spec.criteria, spec.criteria_per_program, 0)]
+    for rel, label, targets, mean, at_least in plan:
+        if not targets:
+            continue
+        for b, lo, hi in _blocks(spec.programs, spec.batch):
+            rng = _rng(spec, rel, b)
+            if rel == "MANAGED_BY":  # exactly one authority per program
+                src, dst = np.arange(lo, hi), zipf(rng, targets, spec.skew, hi - lo)
+            else:
+                src, dst = _edge_batch(rng, lo, hi, targets, mean, spec.skew, at_least)
+            pairs = [(name("SubsidyProgram", int(p)), name(label, int(t))) for p, t in zip(src, dst)]
+            if rel == "APPLIES_TO":
+                yield "APPLIES_TO_SECTOR", pairs
+                yield "APPLIES_TO_REGION", pairs
+            else:
+                yield rel, pairs
+
+def write_csv(spec: SynthSpec, out_dir: str) -> dict:
+    """`<Label>.csv` / `<REL>.csv` (src,dst) files for `app.load_csv`; returns rows written per file."""
+    os.makedirs(out_dir, exist_ok=True)
+    files, counts = {}, {}
+    try:
+        for kind, batch in itertools.chain(nodes(spec), edges(spec)):
+            if not batch:
+                continue
+            is_node = isinstance(batch[0], dict)
+            if kind not in files:
+                f = open(os.path.join(out_dir, f"{kind}.csv"), "w", newline="", encoding="utf-8")
+                cols = list(batch[0]) if is_node else ["src", "dst"]
+                files[kind] = (f, csv.writer(f), cols)
+                files[kind][1].writerow(cols)
+            _, w, cols = files[kind]
+            w.writerows([["" if r[c] is None else r[c] for c in cols] for r in batch] if is_node else batch)
+            counts[kind] = counts.get(kind, 0) + len(batch)
+    finally:
+        for f, _, _ in files.values():
+            f.close()
+    return counts
+
+def write_graph(spec: SynthSpec) -> dict:
+    """Stream batches through `app.merge_nodes` / `merge_edges` (validated, batched MERGE)."""
+    import app
+    counts = {}
+    for label, rows in nodes(spec, app.ONT):
+        app.merge_nodes(label, rows)
+        counts[label] = counts.get(label, 0) + len(rows)
+    for rel, pairs in edges(spec):
+        app.merge_edges(rel, pairs)
+        counts[rel] = counts.get(rel, 0) + len(pairs)
+    return counts
+
+if __name__ == "__main__":
+    d = SynthSpec()
+    ap = argparse.ArgumentParser(description="Generate a deterministic synthetic subsidy graph.")
+    ap.add_argument("--seed", type=int, default=d.seed)
+    for field in ("companies", "programs", "authorities", "documents", "criteria", "batch"):
+        ap.add_argument(f"--{field}", type=int, default=getattr(d, field))
+    for field in ("applies_per_program", "docs_per_program", "criteria_per_program", "skew"):
+        ap.add_argument(f"--{field.replace('_', '-')}", dest=field, type=float, default=getattr(d, field))
+    ap.add_argument("--out", metavar="DIR", default=None, help="write CSVs here instead of into the graph")
+    args = ap.parse_args()
+    spec = SynthSpec(**{f: getattr(args, f) for f in SynthSpec._fields})
+    t0 = time.perf_counter()
+    counts = write_csv(spec, args.out) if args.out else write_graph(spec)
+    for kind, n in counts.items():
+        print(f"{kind:<22} {n:>10}")
+    print(f"{sum(counts.values())} rows in {time.perf_counter() - t0:.1f}s")
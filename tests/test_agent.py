@@ -0,0 +1,47 @@
+# tests/test_agent.py
+import asyncio
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import StructuredTool
+
+from agent import GraphAgent
+
+DELAY = 0.3
+
+class ScriptedModel(BaseChatModel):
+    """Replays canned AI messages, one per model turn."""
+    script: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.script.pop(0))])
+
+def _slow_tool(name: str) -> StructuredTool:
+    async def lookup(key: str) -> str:
+        await asyncio.sleep(DELAY)
+        return f"{name}:{key}"
+    return StructuredTool.from_function(coroutine=lookup, name=name, description=f"slow {name} lookup")
+
+def test_tool_calls_of_one_turn_run_concurrently_and_are_timed():
+    calls = [{"name": n, "args": {"key": n[-1]}, "id": f"call_{n}"} for n in ("tool_a", "tool_b", "tool_c")]
+    llm = ScriptedModel(script=[AIMessage("", tool_calls=calls), AIMessage("done")])
+    agent = GraphAgent(llm, [_slow_tool(c["name"]) for c in calls])
+    t0 = time.perf_counter()
+    assert agent.run("three lookups") == "done"
+    elapsed = time.perf_counter() - t0
+    assert elapsed < 2 * DELAY  # sequential would take 3 * DELAY
+    steps = {t["step"]: t for t in agent.last_timings}
+    assert [t["step"] for t in agent.last_timings].count("model") == 2
+    for c in calls:
+        assert steps[f"tool:{c['name']}"]["ms"] >= DELAY * 1000 * 0.9
+        assert steps[f"tool:{c['name']}"]["args"] == c["args"]
+    assert DELAY * 1000 * 0.9 <= steps["tools x3 (parallel)"]["ms"] < 2 * DELAY * 1000
@@ -0,0 +1,55 @@
+# tests/test_agent_tools.py
+import pytest
+
+import agent_tools
+import query_guard
+from agent_tools import aggregate_query, make_tools
+from query_guard import GuardResult
+
+class FakeMemo:
+    def __init__(self, header, rows):
+        self.header, self.rows, self.queries = header, rows, []
+
+    def run(self, query):
+        self.queries.append(query)
+        return GuardResult("ok", query, header=self.header, rows=self.rows)
+
+def _run_cypher(memo):
+    return make_tools(g=object(), memo=memo)[0]
+
+def test_aggregate_runs_in_cypher_over_all_rows():
+    memo = FakeMemo([[1, "sum(max_eur)"]], [[123456]])
+    out = _run_cypher(memo).invoke({"query": "MATCH (p:SubsidyProgram) RETURN p.name AS program, "
+                                              "p.max_amount_eur AS max_eur", "aggregate": "sum:max_eur"})
+    q = memo.queries[0]
+    assert "WITH p.name AS program, p.max_amount_eur AS max_eur" in q
+    assert q.endswith("RETURN sum(`max_eur`) AS `sum(max_eur)`")
+    assert "123456" in out and "warning" not in out
+
+def test_aggregate_keeps_distinct_and_tail():
+    q = aggregate_query("MATCH (p) RETURN DISTINCT p.name ORDER BY p.name LIMIT 5", "count")
+    assert q == "MATCH (p) WITH DISTINCT p.name AS `p.name` ORDER BY p.name LIMIT 5\nRETURN count(*) AS count"
+
+def test_unknown_column_is_reported():
+    out = _run_cypher(FakeMemo([], [])).invoke({"query": "MATCH (p) RETURN p.name AS n", "aggregate": "avg:x"})
+    assert out.startswith("(error) unknown column 'x'")
+
+def test_union_falls_back_to_python_and_flags_truncation():
+    rows = [[i] for i in range(query_guard.GUARD_LIMIT)]
+    memo = FakeMemo([[1, "n"]], rows)
+    out = _run_cypher(memo).invoke({"query": "MATCH (a) RETURN a.x AS n UNION MATCH (b) RETURN b.x AS n",
+                                    "aggregate": "count"})
+    assert "UNION" in memo.queries[0] and "WITH" not in memo.queries[0]
+    assert str(query_guard.GUARD_LIMIT) in out and "truncated" in out
+
+def test_shape_rows_caps_output():
+    out = agent_tools.shape_rows([[1, "n"]], [[i] for i in range(50)], max_rows=5)
+    assert out.splitlines()[-1].startswith("... 45 more rows")
+
+def test_module_tools_are_built_on_first_access(monkeypatch):
+    calls = []
+    monkeypatch.setattr(agent_tools, "get_graph", lambda: calls.append(1) or object())
+    monkeypatch.setattr(agent_tools, "_default_tools", None)
+    assert calls == []
+    assert agent_tools.run_cypher.name == "run_cypher"
+    assert agent_tools.upsert_program.name == "upsert_program" and calls == [1]
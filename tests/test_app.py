@@ -0,0 +1,55 @@
+# tests/test_app.py
+import pytest
+
+import graph_client
+
+with pytest.MonkeyPatch.context() as mp:  # app binds a graph at import time
+    mp.setattr(graph_client, "get_graph", lambda *a, **k: None)
+    import app
+
+class FakeGraph:
+    def __init__(self):
+        self.queries, self.bumps = [], 0
+
+    def query(self, q, params=None, idempotent=False):
+        self.queries.append((q, params))
+
+    def bump_version(self):
+        self.bumps += 1
+
+@pytest.fixture
+def g(monkeypatch):
+    fake = FakeGraph()
+    monkeypatch.setattr(app, "g", fake)
+    return fake
+
+def _company(name, **kw):
+    return {"name": name, "sector": "manufacturing", "region": "DE-NW", "size": "micro", **kw}
+
+def test_merge_nodes_validates_label_once_per_batch(g, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app, "ensure_label", calls.append)
+    app.merge_nodes("Company", [_company(f"C{i}") for i in range(5)])
+    assert calls == ["Company"] and len(g.queries) == 1 and g.bumps == 1
+
+def test_batch_check_reports_bad_values(g):
+    with pytest.raises(ValueError, match="Sector not allowed: mining"):
+        app.merge_nodes("Company", [_company("A"), _company("B", sector="mining")])
+    with pytest.raises(ValueError, match="requires a `name`"):
+        app.merge_nodes("Company", [{"sector": "manufacturing"}])
+    assert g.queries == []
+
+def test_load_csv_casts_only_numeric_properties(g, tmp_path):
+    nodes = tmp_path / "SubsidyProgram.csv"
+    nodes.write_text("name,level,max_amount_eur,cofund_rate,deadline\n"
+                     "001,Federal,50000,0.5,2026-12-31\n", encoding="utf-8")
+    app.load_csv(str(nodes), label="SubsidyProgram")
+    row = g.queries[0][1]["rows"][0]
+    assert row == {"name": "001", "level": "Federal", "max_amount_eur": 50000,
+                   "cofund_rate": 0.5, "deadline": "2026-12-31"}
+
+def test_load_csv_rejects_non_numeric_value(g, tmp_path):
+    path = tmp_path / "SubsidyProgram.csv"
+    path.write_text("name,max_amount_eur\nP,lots\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="SubsidyProgram.max_amount_eur"):
+        app.load_csv(str(path), label="SubsidyProgram")
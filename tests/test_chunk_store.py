@@ -0,0 +1,59 @@
+# tests/test_chunk_store.py
+import numpy as np
+
+from chunk_store import ChunkStore, chunk_pages, chunk_text
+
+DOC = [(1, "Energieeffizienz Plus fördert KMU mit bis zu 50.000 EUR"),
+       (1, "Antrag über das Portal der KfW mit Energieaudit"),
+       (2, "Kofinanzierung 60 Prozent, Stichtag rolling"),
+       (2, "Digitalisierung im Mittelstand: Zuschuss für Software")]
+
+def test_chunks_overlap_and_stay_on_their_page():
+    chunks = chunk_text("word " * 400, size=100, overlap=20)
+    assert all(len(c) <= 100 for c in chunks) and len(chunks) > 20
+    assert {p for p, _ in chunk_pages(["a b c", "", "d e f"])} == {1, 3}
+
+def test_search_finds_k_live_hits_after_many_replacements(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    for _ in range(13):  # 12 re-adds leave 48 stale rows scoring like the live ones
+        store.add("doc.pdf", DOC)
+    store.add("other.pdf", [(1, "Logistik und Verkehr")])
+    hits = store.search("Energieaudit KfW Antrag", k=2)
+    assert len(hits) == 2
+    assert all(h.id >= 48 for h in hits)  # only the latest copy is live
+    assert hits[0].text == DOC[1][1]
+
+def test_search_with_ivf_index_and_tail(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    rng = np.random.default_rng(0)
+    for i in range(50):
+        store.add(f"noise{i}.pdf", [(1, " ".join(rng.choice(["alpha", "beta", "gamma", "delta"], 8)))])
+    store.add("doc.pdf", DOC)
+    store.build_index(nlist=4)
+    store.add("doc.pdf", DOC)  # replaced after indexing: old copy lives on in the IVF lists
+    hits = store.search("Digitalisierung Software Zuschuss", k=3, nprobe=4)
+    assert len(hits) == 3 and hits[0].text == DOC[3][1]
+    assert len({h.id for h in hits}) == 3 and all(h.source_id != "doc.pdf" or h.id >= 54 for h in hits)
+    assert store.stats()["indexed"] == 54
+
+def test_torn_append_is_truncated_and_ids_stay_put(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.add("doc.pdf", DOC)
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(b"\0" * (4 * store.dim + 10))  # an uncommitted row plus a torn one
+    store = ChunkStore(str(tmp_path))
+    assert len(store) == 4 and (tmp_path / "vectors.f32").stat().st_size == 4 * 4 * store.dim
+    assert store.add("other.pdf", [(1, "Logistik und Verkehr")]) == [4]
+    assert store.search("Logistik Verkehr", k=1)[0].source_id == "other.pdf"
+
+def test_rebuild_switches_versions_for_open_readers(tmp_path):
+    writer = ChunkStore(str(tmp_path))
+    writer.add("doc.pdf", DOC)
+    writer.build_index(nlist=2)
+    reader = ChunkStore(str(tmp_path))
+    assert reader.stats()["indexed"] == 4
+    writer.add("other.pdf", [(1, "Logistik und Verkehr")])
+    writer.build_index(nlist=2)
+    assert sorted(p.name for p in tmp_path.glob("ivf-*")) == ["ivf-2"]
+    assert reader.stats()["indexed"] == 5
+    assert reader.search("Logistik Verkehr", k=1, nprobe=2)[0].source_id == "other.pdf"
@@ -0,0 +1,46 @@
+# tests/test_cypher_cache.py
+from cypher_cache import CypherCache
+
+SCOPE = CypherCache.scope("openai", "gpt-4o-mini", "abc")
+
+def test_region_code_is_part_of_the_key():
+    cache = CypherCache()
+    cache.put("Which subsidies apply to small companies?", SCOPE, "MATCH (all regions)")
+    assert cache.get("Which subsidies apply to small companies in BY?", SCOPE) is None
+
+def test_order_words_never_match_each_other():
+    cache = CypherCache()
+    cache.put("List programs by max amount descending", SCOPE, "... ORDER BY max DESC")
+    assert cache.get("List programs by max amount ascending", SCOPE) is None
+
+def test_rephrasing_with_same_content_tokens_hits():
+    cache = CypherCache()
+    cache.put("Which subsidies apply to small companies in BY?", SCOPE, "Q")
+    assert cache.get("which subsidies apply to small companies in BY", SCOPE) == "Q"
+    assert cache.get("Show me the subsidies that apply to small companies in BY", SCOPE) == "Q"
+    assert cache.stats()["hits"] == 1 and cache.stats()["near_hits"] == 1
+
+def test_numbers_and_scope_are_respected():
+    cache = CypherCache()
+    cache.put("programs with deadline before 2025", SCOPE, "Q")
+    assert cache.get("programs with deadline before 2026", SCOPE) is None
+    assert cache.get("programs with deadline after 2025", SCOPE) is None
+    assert cache.get("programs with deadline before 2025", CypherCache.scope("ollama", "m", "abc")) is None
+
+def test_sqlite_persistence(tmp_path):
+    path = str(tmp_path / "cache.db")
+    CypherCache(path=path).put("small companies in BY", SCOPE, "Q")
+    cache = CypherCache(path=path)
+    assert cache.get("small companies in BY", SCOPE) == "Q"
+    assert cache.get("small companies", SCOPE) is None
+
+def test_swapped_values_never_match():
+    cache = CypherCache()
+    pairs = [("programs above 10000 and below 50000", "programs above 50000 and below 10000"),
+             ("programs managed by KfW not BMWK", "programs managed by BMWK not KfW"),
+             ("programs with deadline after 2025 and before 2027", "programs with deadline after 2027 and before 2025"),
+             ("programs by amount asc and rate desc", "programs by amount desc and rate asc")]
+    for cached, swapped in pairs:
+        cache.put(cached, SCOPE, cached)
+        assert cache.get(swapped, SCOPE) is None
+        assert cache.get(f"show me the {cached}", SCOPE) == cached
@@ -0,0 +1,19 @@
+# tests/test_fewshot_index.py
+import nl2cypher
+from fewshot_index import FewShotIndex, load_examples
+
+def test_top_k_picks_the_closest_examples_from_the_bank():
+    index = FewShotIndex(load_examples(nl2cypher.FEWSHOTS_PATH))
+    assert index.top_k("which programme does KfW manage", 1)[0]["q"] == "Which programs are managed by KfW?"
+    top = index.top_k("what documents are needed for Energieeffizienz Plus", 3)
+    assert top[0]["q"] == "Which documents does Energieeffizienz Plus require?" and len(top) == 3
+
+def test_top_k_bounds_and_empty_bank():
+    examples = [{"q": "alpha beta", "cypher": "A"}, {"q": "gamma delta", "cypher": "B"}]
+    assert [e["cypher"] for e in FewShotIndex(examples).top_k("gamma", 5)] == ["B", "A"]
+    assert FewShotIndex(examples).top_k("gamma", 0) == [] and FewShotIndex([]).top_k("gamma") == []
+
+def test_prompt_keeps_the_static_prefix_and_only_k_examples():
+    prompt = nl2cypher._prompt("Which programs are managed by KfW?")
+    assert prompt.startswith(nl2cypher.PROMPT_PREFIX)
+    assert prompt.count("\nCypher:\n") == nl2cypher.FEWSHOT_K
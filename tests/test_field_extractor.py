@@ -0,0 +1,62 @@
+# tests/test_field_extractor.py
+import random
+import re
+
+import pytest
+
+from field_extractor import FieldExtractor
+from ingest import extract_pages, rule_extract
+
+def _grab(text, rx, cast=lambda x: x):
+    m = re.search(rx, text, re.I)
+    return cast(m.group(1)) if m else None
+
+def legacy_rule_extract(text: str) -> dict:
+    """rule_extract as it was before FieldExtractor (baseline ingest.py), kept as the reference."""
+    name = _grab(text, r"(?:Programm|Program|Förderung)\s*:\s*(.+)")
+    max_eur = _grab(text, r"(?:Max\.?\s*Betrag|Höchstfördersumme)\s*:\s*€?\s*([\d\.\,]+)",
+                    cast=lambda x: int(x.replace(".", "").replace(",", "")))
+    cofund = _grab(text, r"(?:Kofinanzierung|Fördersatz)\s*:\s*([\d\.]+)\s*%?",
+                   cast=lambda x: (float(x) / 100 if float(x) > 1 else float(x)))
+    deadline = _grab(text, r"(?:Stichtag|Deadline)\s*:\s*([0-9]{4}-[0-9]{2}-[0-9]{2}|rolling)")
+    docs = [d for d in ["Business Plan", "Finanzplan", "Jahresabschlüsse", "Handelsregisterauszug", "Energieaudit"]
+            if re.search(d, text, re.I)]
+    crits = []
+    if re.search(r"\bKMU\b|\bSME\b", text): crits.append("SME_DEF")
+    if re.search(r"\bNRW\b|Nordrhein", text): crits.append("REGION_NRW")
+    if re.search(r"10%\s*Energie|Energy\s*10%", text): crits.append("ENERGY_SAVING")
+    auth = _grab(text, r"(?:Bewilligungsstelle|Authority|Träger)\s*:\s*(.+)")
+    name = name or "Unbenanntes Programm"
+    filled = sum([name is not None, max_eur is not None, cofund is not None, deadline is not None,
+                  bool(docs), bool(crits), auth is not None])
+    return {"name": name, "level": None, "max_amount_eur": max_eur, "cofund_rate": cofund, "deadline": deadline,
+            "documents": docs, "criteria": crits, "authority": auth, "confidence": min(0.5 + 0.05 * filled, 0.95)}
+
+FRAGMENTS = [
+    "Programm: Energieeffizienz Plus", "PROGRAM:  Digital Jetzt", "förderung : Innovation NRW",
+    "Max. Betrag: € 50.000", "höchstfördersumme:1,250,000", "MAX BETRAG : 7.500",
+    "Kofinanzierung: 60 %", "fördersatz: 0.4", "KOFINANZIERUNG : 35%",
+    "Stichtag: 2025-12-31", "deadline: rolling", "STICHTAG : 2026-01-15",
+    "Bewilligungsstelle: KfW", "authority: BAFA", "TRÄGER: Land NRW",
+    "business plan", "FINANZPLAN", "Jahresabschlüsse", "handelsregisterauszug", "EnergieAudit",
+    "KMU", "kmu", "SME", "SMEs", "NRW", "Nordrhein-Westfalen", "nordrhein", "10% Energie", "Energy 10%",
+    "10 % Energie", "İstanbul Office", "Straße ẞ", "ﬁnanzplan", "Lorem ipsum dolor", "\n", "  ",
+]
+
+def _corpus(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 25))) for _ in range(n)]
+
+def test_rule_extract_matches_the_legacy_implementation():
+    for text in _corpus(400):
+        assert rule_extract(text).model_dump() == legacy_rule_extract(text), text
+
+def test_page_stream_matches_whole_text():
+    for text in _corpus(100, seed=1):
+        words = text.split(" ")
+        pages = [" ".join(words[i:i + 5]) for i in range(0, len(words), 5)] or [""]
+        assert extract_pages(pages).model_dump() == legacy_rule_extract("\n".join(pages)), pages
+
+def test_scalar_rules_need_a_capture_group():
+    with pytest.raises(ValueError):
+        FieldExtractor().register("name", r"Programm:")
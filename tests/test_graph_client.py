@@ -0,0 +1,38 @@
+# tests/test_graph_client.py
+import pytest
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+import graph_client
+
+class Flaky:
+    """A falkordb Graph whose first call times out after (possibly) applying the write."""
+
+    name = "flaky"
+
+    def __init__(self):
+        self.calls = 0
+
+    def query(self, q, params=None, timeout=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise RedisTimeoutError("timed out")
+        return "ok"
+
+    ro_query = query
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(graph_client, "FALKOR_BACKOFF", 0)
+
+def test_writes_run_once_unless_marked_idempotent():
+    g = graph_client.Graph(Flaky())
+    with pytest.raises(RedisTimeoutError):
+        g.query("MATCH (n) DETACH DELETE n")
+    assert g._graph.calls == 1
+    g = graph_client.Graph(Flaky())
+    assert g.query("MERGE (a:Authority {name:$a})", {"a": "KfW"}, idempotent=True) == "ok"
+    assert g._graph.calls == 2
+
+def test_reads_are_retried():
+    g = graph_client.Graph(Flaky())
+    assert g.ro_query("MATCH (n) RETURN count(n)") == "ok" and g._graph.calls == 2
@@ -0,0 +1,64 @@
+# tests/test_graph_view.py
+from typing import NamedTuple
+
+import pytest
+
+import graph_view
+
+class Op(NamedTuple):
+    name: str
+    args: str = ""
+    children: tuple = ()
+
+class Plan(NamedTuple):
+    structured_plan: Op
+
+class RS(NamedTuple):
+    header: list
+    result_set: list
+
+class FakeGraph:
+    """Answers the view queries from canned rows and records every read."""
+
+    def __init__(self, name="view_test", plan=Op("Results")):
+        self.name, self.ver, self.plan, self.reads = name, 1, plan, []
+
+    def version(self):
+        return self.ver
+
+    def explain(self, q, params=None):
+        return Plan(self.plan)
+
+    def ro_query(self, q, params=None, timeout=None):
+        self.reads.append((q, params, timeout))
+        if "ORDER BY degree" in q:
+            return RS([], [[1, "Authority", "KfW"], [2, "SubsidyProgram", "Energieeffizienz Plus"]])
+        if "UNWIND $ids" in q:
+            return RS([], [[i, "MANAGED_BY", False, "SubsidyProgram", 40, [[10 + i, f"P{i}"]]] for i in params["ids"]]
+                          + [[2, "REQUIRES_DOCUMENT", True, "Document", 3, []]])
+        return RS([], [])
+
+def test_expand_counts_groups_and_samples_a_bounded_few():
+    g = FakeGraph()
+    sub = graph_view.expand(g, graph_view.Subgraph(), [1], per_group=5)
+    q, params, timeout = g.reads[0]
+    assert "collect(x) AS xs" not in q and "LIMIT $per_group" in q
+    assert params["per_group"] == 5 and "Document" in params["collapse"]
+    assert timeout is not None  # went through query_guard
+    assert sub.nodes["1:MANAGED_BY:SubsidyProgram:more"][1] == "+39 more SubsidyProgram"
+    assert sub.nodes["2:REQUIRES_DOCUMENT:Document"][1] == "3 Documents"
+
+def test_degree_seeds_are_cached_per_graph_version():
+    g = FakeGraph(name="seed_test")
+    graph_view.overview(g, k=2)
+    graph_view.overview(g, k=1, expanded=[2])
+    assert sum("ORDER BY degree" in q for q, _, _ in g.reads) == 1
+    g.ver += 1
+    graph_view.overview(g, k=2)
+    assert sum("ORDER BY degree" in q for q, _, _ in g.reads) == 2
+
+def test_guard_rejections_surface_as_errors():
+    g = FakeGraph(name="reject_test", plan=Op("Results", children=(Op("All Node Scan", "n"),)))
+    g.ro_query = lambda q, params=None, timeout=None: RS([], [[10**9]])  # node count for the guard
+    with pytest.raises(RuntimeError, match="rejected: full node scan"):
+        graph_view.overview(g, k=2)
@@ -0,0 +1,134 @@
+# tests/test_ingest.py
+import fitz
+import pytest
+
+import ingest
+from ingest import REQUIRED_FIELDS, extract_pages
+
+PAGE1 = """Programm: Energieeffizienz Plus
+Bewilligungsstelle: KfW
+Höchstfördersumme: 50.000
+Kofinanzierung: 60 %
+Stichtag: 2025-12-31
+"""  # page text from PyMuPDF ends with a newline
+PAGE2 = """Einzureichen sind Business Plan, Finanzplan und Energieaudit.
+Antragsberechtigt sind KMU."""
+
+def _pdf(path, pages):
+    with fitz.open() as pdf:
+        for text in pages:
+            pdf.new_page().insert_textbox(fitz.Rect(36, 36, 560, 800), text)
+        pdf.save(str(path))
+    return str(path)
+
+def test_list_fields_after_the_scalar_page_are_kept_by_default():
+    info = {}
+    ext = extract_pages([PAGE1, PAGE2], info=info)
+    assert ext.documents == ["Business Plan", "Finanzplan", "Energieaudit"]
+    assert ext.criteria == ["SME_DEF"] and ext.confidence == pytest.approx(0.85)
+    assert not info
+
+def test_early_stop_is_flagged_partial():
+    info = {}
+    ext = extract_pages([PAGE1, PAGE2], REQUIRED_FIELDS, info)
+    assert ext.max_amount_eur == 50000 and ext.documents == []
+    assert info == {"partial": True}
+
+def test_values_cut_at_a_page_break_match_the_whole_text():
+    pages = ["Antrag\nProgramm: ", "Energieeffizienz Plus\nHöchstfördersumme:", " 50.000\n"]
+    ext = extract_pages(pages)
+    assert ext.name == "Energieeffizienz Plus" and ext.max_amount_eur == 50000
+    assert ext.model_dump() == ingest.rule_extract("\n".join(pages)).model_dump()
+
+def test_partial_reads_store_no_hash(tmp_path):
+    path = _pdf(tmp_path / "p.pdf", [PAGE1, PAGE2])
+    opts = {"max_pages": None, "max_bytes": None, "required": None}
+    ext, title, _, digest = ingest._parse(path, "p.pdf", None, False, opts)
+    assert digest == ingest.file_hash(path) and ext.criteria == ["SME_DEF"]
+    for partial in ({**opts, "required": REQUIRED_FIELDS}, {**opts, "max_pages": 1}):
+        ext, _, _, digest = ingest._parse(path, "p.pdf", None, False, partial)
+        assert digest is None and ext.documents == []
+
+class FakeGraph:
+    """Records writes; Authority names and the version counter are kept in memory."""
+
+    def __init__(self, name):
+        self.name, self.ver, self.authorities, self.loads, self.writes = name, 0, ["KfW"], 0, []
+
+    def version(self):
+        return self.ver
+
+    def bump_version(self):
+        self.ver += 1
+        return self.ver
+
+    def ro_query(self, q, params=None):
+        if "SourceDoc" in q:
+            rows = {r["sid"]: r["hash"] for w, p, _ in self.writes if "SourceDoc {id" in w for r in p["rows"]}
+            return type("RS", (), {"result_set": list(rows.items())})()
+        self.loads += 1
+        return type("RS", (), {"result_set": [[a] for a in self.authorities]})()
+
+    def query(self, q, params=None, idempotent=False):
+        self.writes.append((q, params, idempotent))
+        return type("RS", (), {"result_set": []})()
+
+def test_authority_resolver_survives_own_writes_but_not_a_wipe():
+    g = FakeGraph("resolver_test")
+    ext = ingest.rule_extract(PAGE1)
+    ingest.upsert_programs([(ext, "a.pdf")], g=g)
+    ingest.upsert_programs([(ext, "b.pdf")], g=g)
+    assert g.loads == 1  # own bumps keep the cached resolver
+    g.authorities = []
+    g.bump_version()  # e.g. MATCH (n) DETACH DELETE n elsewhere
+    assert len(ingest.authority_resolver(g)) == 0 and g.loads == 2
+
+def test_resolver_matches_known_names_and_registers_new_ones():
+    from authority_resolver import AuthorityResolver
+    r = AuthorityResolver(["Kreditanstalt für Wiederaufbau", "BAFA"])
+    out = r.resolve_many(["Kreditanstalt fuer Wiederaufbau", "Projektträger Jülich", "Projekttraeger Jülich"])
+    assert out == ["Kreditanstalt für Wiederaufbau", "Projektträger Jülich", "Projektträger Jülich"]
+    assert len(r) == 3
+
+def test_upsert_programs_sends_one_unwind_per_kind():
+    g = FakeGraph("unwind_test")
+    a, b = ingest.rule_extract(PAGE1 + PAGE2), ingest.rule_extract(PAGE1)
+    ingest.upsert_programs([(a, "a.pdf", "http://a", "h1"), (b, "b.pdf")], g=g)
+    assert len(g.writes) == 4 and all(w[2] for w in g.writes)
+    progs, docs, crits, managed = (w[1]["rows"] for w in g.writes)
+    assert [(r["sid"], r["url"], r["hash"], r["max"]) for r in progs] == [
+        ("a.pdf", "http://a", "h1", 50000), ("b.pdf", None, None, 50000)]
+    assert docs == [{"p": "Energieeffizienz Plus", "d": d} for d in a.documents]
+    assert crits == [{"p": "Energieeffizienz Plus", "code": "SME_DEF"}]
+    assert managed == [{"p": "Energieeffizienz Plus", "a": "KfW"}] * 2
+    assert g.ver == 1
+
+def test_expand_paths_handles_dirs_globs_and_files(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for rel in ("a.pdf", "sub/b.pdf", "notes.txt"):
+        (tmp_path / rel).write_bytes(b"")
+    got = list(ingest.expand_paths([str(tmp_path), str(tmp_path / "*.txt"), str(tmp_path / "a.pdf")]))
+    assert [title for _, title in got] == ["a.pdf", "sub/b.pdf", "notes.txt", "a.pdf"]
+
+def _ingest(monkeypatch, g, paths, **kw):
+    monkeypatch.setattr(ingest, "get_graph", lambda: g)
+    monkeypatch.setattr(ingest, "sync_schema", lambda g: [])
+    return ingest.ingest_paths(paths, workers=2, batch_size=2, **kw)
+
+def test_ingest_paths_parses_in_parallel_and_writes_in_batches(tmp_path, monkeypatch):
+    for i in range(3):
+        _pdf(tmp_path / f"p{i}.pdf", [PAGE1, PAGE2])
+    g = FakeGraph("parallel_test")
+    stats = _ingest(monkeypatch, g, [str(tmp_path)])
+    assert (stats["files"], stats["new"], stats["written"], stats["failed"]) == (3, 3, 3, 0)
+    sids = sorted(r["sid"] for q, p, _ in g.writes if "SourceDoc {id" in q for r in p["rows"])
+    assert sids == ["p0.pdf", "p1.pdf", "p2.pdf"]
+
+def test_unchanged_files_are_skipped_unless_forced(tmp_path, monkeypatch):
+    path = _pdf(tmp_path / "p.pdf", [PAGE1, PAGE2])
+    g = FakeGraph("hash_test")
+    assert _ingest(monkeypatch, g, [path])["new"] == 1
+    assert _ingest(monkeypatch, g, [path])["skipped"] == 1
+    assert _ingest(monkeypatch, g, [path], force=True)["forced"] == 1
+    _pdf(tmp_path / "p.pdf", [PAGE2, PAGE1])
+    assert _ingest(monkeypatch, g, [path])["changed"] == 1
@@ -0,0 +1,89 @@
+# tests/test_llm_providers.py
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import llm_providers
+from llm_providers import FunctionProvider, OllamaProvider, OpenAIProvider, astream_with_fallback
+
+QUERY = "MATCH (p:SubsidyProgram) RETURN p.name"
+PARTS = ["MATCH (p:SubsidyProgram) ", "RETURN ", "p.name"]
+
+def _prompt(q: str) -> str:
+    return q
+
+def _collect(providers, deadline=None) -> list:
+    async def go():
+        return [snap async for snap in astream_with_fallback("programs?", providers, deadline)]
+    return asyncio.run(go())
+
+def _ollama(handler, url: str) -> OllamaProvider:
+    # a fresh client per test: async clients are bound to the loop that first uses them
+    OllamaProvider._clients[url] = httpx.AsyncClient(base_url=url, transport=httpx.MockTransport(handler))
+    return OllamaProvider("llama3.1", _prompt, base_url=url)
+
+async def _ndjson(parts, delay: float = 0.0):
+    for p in parts:
+        await asyncio.sleep(delay)
+        yield (json.dumps({"response": p}) + "\n").encode()
+    yield (json.dumps({"response": "", "done": True}) + "\n").encode()
+
+RULES = FunctionProvider("rules", lambda q: "MATCH (n) RETURN n")
+
+def test_ollama_streams_snapshots_without_a_duplicate_final():
+    seen = []
+    def handler(request):
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, content=_ndjson(PARTS))
+    snaps = _collect([_ollama(handler, "http://ollama-stream"), RULES])
+    assert snaps == [("ollama", "".join(PARTS[:i + 1])) for i in range(len(PARTS))]
+    assert seen[0]["model"] == "llama3.1" and seen[0]["stream"] is True
+
+def test_trailing_whitespace_is_trimmed_in_one_extra_snapshot():
+    handler = lambda request: httpx.Response(200, content=_ndjson([QUERY, "\n"]))
+    snaps = _collect([_ollama(handler, "http://ollama-trim")])
+    assert snaps[-1] == ("ollama", QUERY) and snaps[-2] == ("ollama", QUERY + "\n")
+
+def test_ollama_timeout_falls_back_to_rules():
+    handler = lambda request: httpx.Response(200, content=_ndjson(PARTS, delay=0.5))
+    snaps = _collect([_ollama(handler, "http://ollama-slow"), RULES], deadline=0.2)
+    assert snaps == [("rules", "MATCH (n) RETURN n")]
+
+def test_ollama_http_error_falls_back_to_rules():
+    handler = lambda request: httpx.Response(500, text="model not loaded")
+    snaps = _collect([_ollama(handler, "http://ollama-down"), RULES])
+    assert snaps == [("rules", "MATCH (n) RETURN n")]
+
+def test_all_providers_failing_raises():
+    handler = lambda request: httpx.Response(503)
+    with pytest.raises(RuntimeError, match="All providers failed: ollama: HTTPStatusError"):
+        _collect([_ollama(handler, "http://ollama-gone")])
+
+def _sse(parts) -> bytes:
+    events = [{"id": "c1", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o-mini",
+               "choices": [{"index": 0, "delta": {"content": p}, "finish_reason": None}]} for p in parts]
+    return "".join(f"data: {json.dumps(e)}\n\n" for e in events).encode() + b"data: [DONE]\n\n"
+
+@pytest.fixture
+def openai_client(monkeypatch):
+    from openai import AsyncOpenAI
+    def install(handler):
+        client = AsyncOpenAI(api_key="test", base_url="http://openai.test/v1", max_retries=0,
+                             http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(OpenAIProvider, "_client_obj", client)
+        return OpenAIProvider("gpt-4o-mini", _prompt)
+    return install
+
+def test_openai_streams_chat_completion_chunks(openai_client):
+    def handler(request):
+        body = json.loads(request.content)
+        assert body["stream"] is True and body["messages"][0]["content"] == llm_providers.SYSTEM_PROMPT
+        return httpx.Response(200, content=_sse(PARTS), headers={"content-type": "text/event-stream"})
+    snaps = _collect([openai_client(handler), RULES])
+    assert [s for s, _ in snaps] == ["openai"] * len(PARTS) and snaps[-1][1] == QUERY
+
+def test_openai_error_falls_back_to_rules(openai_client):
+    handler = lambda request: httpx.Response(429, json={"error": {"message": "rate limited"}})
+    assert _collect([openai_client(handler), RULES]) == [("rules", "MATCH (n) RETURN n")]
@@ -0,0 +1,61 @@
+# tests/test_nl2cypher.py
+import llm_providers
+import nl2cypher
+
+def _fake_llm(answer):
+    def fn(q):
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+    def provider(name, ollama_model="llama3.1"):
+        return llm_providers.FunctionProvider(name, fn if name != "rules" else nl2cypher._rules_text)
+    return provider
+
+def test_batch_records_the_fallback_provider(monkeypatch):
+    monkeypatch.setattr(nl2cypher, "_provider", _fake_llm(RuntimeError("down")))
+    rec, = nl2cypher.generate_cypher_batch(["programs in BY"], provider="Ollama")
+    assert rec["provider"] == "rules" and not rec["cached"] and rec["cypher"] and rec["error"] is None
+
+def test_batch_records_cache_hits(monkeypatch):
+    monkeypatch.setattr(nl2cypher, "_provider", _fake_llm("MATCH (p:SubsidyProgram) RETURN p.name"))
+    monkeypatch.setattr(nl2cypher, "CACHE", nl2cypher.CypherCache())
+    first, second = (nl2cypher.generate_cypher_batch(["programs for energy firms"], provider="OpenAI")[0]
+                     for _ in range(2))
+    assert (first["provider"], first["cached"]) == ("openai", False)
+    assert (second["provider"], second["cached"]) == ("openai", True)
+    assert second["cypher"] == first["cypher"]
+
+def test_strict_batch_skips_cache_and_fallback(monkeypatch):
+    monkeypatch.setattr(nl2cypher, "CACHE", nl2cypher.CypherCache())
+    monkeypatch.setattr(nl2cypher, "_provider", _fake_llm("MATCH (n) RETURN n"))
+    nl2cypher.generate_cypher_batch(["all nodes"], provider="Ollama")
+    rec, = nl2cypher.generate_cypher_batch(["all nodes"], provider="Ollama", strict=True)
+    assert rec["provider"] == "ollama" and not rec["cached"]
+    monkeypatch.setattr(nl2cypher, "_provider", _fake_llm(RuntimeError("down")))
+    rec, = nl2cypher.generate_cypher_batch(["all nodes"], provider="Ollama", strict=True)
+    assert rec["cypher"] is None and "All providers failed" in rec["error"]
+
+class AuthorityGraph:
+    name = "rules_test"
+
+    def __init__(self, names):
+        self.names, self.ver, self.reads = names, 1, 0
+
+    def version(self):
+        return self.ver
+
+    def ro_query(self, q, params=None):
+        self.reads += 1
+        return type("RS", (), {"result_set": [[n] for n in self.names]})()
+
+def test_rules_learn_authority_names_from_the_graph(monkeypatch):
+    monkeypatch.setattr(nl2cypher, "_authorities_at", None)
+    g = AuthorityGraph(["KfW", "BAFA"])
+    assert "authority" not in nl2cypher.generate_with_rules("kfw programs for small firms")[1]
+    nl2cypher.load_authorities(g)
+    nl2cypher.load_authorities(g)
+    assert g.reads == 1  # once per graph version
+    assert nl2cypher.generate_with_rules("kfw programs for small firms")[1]["authority"] == "KfW"
+    g.names, g.ver = [], 2  # wiped
+    nl2cypher.load_authorities(g)
+    assert "authority" not in nl2cypher.generate_with_rules("kfw programs for small firms")[1]
@@ -0,0 +1,18 @@
+# tests/test_portfolio.py
+import csv
+import io
+
+from portfolio import write_csv
+
+def test_write_csv_tolerates_heterogeneous_records():
+    results = [
+        {"name": "A", "sector": "energy", "size": "small", "region": "DE-BY", "matched_profile": True,
+         "programs": [{"program": "P1", "max_eur": 1000, "docs": ["Business Plan", "Finanzplan"]}]},
+        {"name": "B", "sector": "software", "vat": "DE123", "programs": []},
+    ]
+    out = io.StringIO()
+    assert write_csv(results, out) == 2
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [r["name"] for r in rows] == ["A", "B"]
+    assert rows[0]["rank"] == "1" and rows[0]["docs"] == "Business Plan; Finanzplan"
+    assert rows[1]["region"] == "" and "vat" not in rows[1]
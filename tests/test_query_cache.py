@@ -0,0 +1,34 @@
+# tests/test_query_cache.py
+from query_cache import CachedResult, QueryCache, approx_size
+
+class FakeGraph:
+    def __init__(self):
+        self.name, self.ver, self.reads = "cache_test", 0, 0
+
+    def version(self):
+        return self.ver
+
+    def ro_query(self, cypher, params=None):
+        self.reads += 1
+        return type("RS", (), {"header": [[1, "n"]], "result_set": [[self.reads]]})()
+
+def test_hits_until_the_graph_version_moves_on():
+    g, cache = FakeGraph(), QueryCache()
+    first = cache.query(g, "MATCH (n) RETURN count(n)")
+    assert cache.query(g, "MATCH (n)\n  RETURN count(n)") == first and g.reads == 1  # whitespace-insensitive
+    assert cache.query(g, "MATCH (n) RETURN count(n)", {"x": 1}) != first and g.reads == 2
+    g.ver += 1
+    assert cache.query(g, "MATCH (n) RETURN count(n)").result_set == [[3]]
+    assert cache.stats()["entries"] == 1  # the old-version entries were dropped
+
+def test_lru_stays_within_its_byte_budget():
+    row = CachedResult([[1, "s"]], [["x" * 1000]])
+    cache = QueryCache(max_bytes=3 * approx_size(row))
+    for i in range(3):
+        cache.put("g", 0, f"RETURN {i}", None, row)
+    cache.get("g", 0, "RETURN 0")  # most recently used now
+    cache.put("g", 0, "RETURN 3", None, row)
+    assert cache.get("g", 0, "RETURN 1") is None and cache.get("g", 0, "RETURN 0") == row
+    assert cache.stats()["bytes"] <= cache.max_bytes and cache.stats()["evictions"] == 1
+    cache.put("g", 0, "RETURN big", None, CachedResult([], [["x" * 10000]]))
+    assert cache.get("g", 0, "RETURN big") is None  # larger than the whole budget: not cached
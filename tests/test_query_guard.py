@@ -0,0 +1,66 @@
+# tests/test_query_guard.py
+from typing import NamedTuple
+
+import pytest
+
+import query_guard
+
+class Op(NamedTuple):
+    name: str
+    args: str = ""
+    children: tuple = ()
+
+def test_each_scan_is_costed_by_its_own_label():
+    # the outer scan over Company must not pick up the inner SubsidyProgram label
+    plan = Op("Results", children=(Op("Project", children=(
+        Op("Node By Label Scan", "c:Company", children=(
+            Op("Node By Label Scan", "p:SubsidyProgram"),)),)),))
+    counts = {"Company": 500, "SubsidyProgram": 5}
+    assert query_guard._scan_labels(plan, set()) == {"Company", "SubsidyProgram"}
+    problems = []
+    query_guard._estimate(plan, counts, problems, max_scan=100, max_cartesian=10**6)
+    assert problems == ["label scan over Company touches 500 nodes (max 100)"]
+
+def test_all_node_scan_uses_the_total_count():
+    plan = Op("Results", children=(Op("All Node Scan", "n", children=(Op("Node By Label Scan", "p:SubsidyProgram"),)),))
+    with pytest.raises(query_guard.QueryRejected, match="full node scan"):
+        query_guard._verdict(type("Plan", (), {"structured_plan": plan})(), {None: 10**6, "SubsidyProgram": 1},
+                             max_scan=1000, max_cartesian=10**6)
+
+class RS(NamedTuple):
+    header: list
+    result_set: list
+
+class PlanGraph:
+    """EXPLAIN yields a label scan, under a Limit op only when the text has a LIMIT."""
+    name = "guard_test"
+
+    def __init__(self):
+        self.explained, self.ran = [], []
+
+    def version(self):
+        return 1
+
+    def explain(self, q, params=None):
+        self.explained.append(q)
+        scan = Op("Node By Label Scan", "p:SubsidyProgram")
+        plan = Op("Results", children=(Op("Limit", children=(scan,)),) if "LIMIT" in q else (scan,))
+        return type("Plan", (), {"structured_plan": plan})()
+
+    def ro_query(self, q, params=None, timeout=None):
+        if q.startswith("MATCH (n:`SubsidyProgram`) RETURN count(n)"):
+            return RS([], [[10**6]])
+        self.ran.append(q)
+        return RS([[1, "name"]], [["P1"]])
+
+def test_injected_limit_does_not_hide_a_full_scan():
+    g = PlanGraph()
+    res = query_guard.run(g, "MATCH (p:SubsidyProgram) RETURN p.name", max_scan=1000)
+    assert res.status == "rejected" and "label scan over SubsidyProgram" in res.reason
+    assert res.cypher.endswith("LIMIT 1000") and g.explained == ["MATCH (p:SubsidyProgram) RETURN p.name"]
+    assert not g.ran
+
+def test_a_limit_written_by_the_caller_still_bounds_the_scan():
+    g = PlanGraph()
+    res = query_guard.run(g, "MATCH (p:SubsidyProgram) RETURN p.name LIMIT 5", max_scan=1000)
+    assert res.ok and res.rows == [["P1"]] and g.ran == ["MATCH (p:SubsidyProgram) RETURN p.name LIMIT 5"]
@@ -0,0 +1,43 @@
+# tests/test_rec_index.py
+from rec_index import APPLIES_Q, PROFILES_Q, PROGRAMS_Q, RecommenderIndex
+
+PROGRAMS = [
+    ["Big", 500000, 0.5, "2026-01-01", "KfW", []],
+    ["Tie", 500000, 0.8, "2026-01-01", "KfW", []],
+    ["Small", 10000, 0.9, None, None, ["Finanzplan"]],
+    ["Unknown", None, None, None, None, []],
+]
+
+class FakeGraph:
+    def __init__(self):
+        self.ver, self.builds = 0, 0
+        self.results = {PROGRAMS_Q: PROGRAMS, PROFILES_Q: [["software", "micro", "DE-BE"]],
+                        APPLIES_Q: [["software", "micro", "DE-BE", "Small"], ["software", "micro", "DE-BE", "Tie"]]}
+
+    def version(self):
+        return self.ver
+
+    def ro_query(self, q, params=None):
+        self.builds += q == PROGRAMS_Q
+        return type("RS", (), {"result_set": self.results[q]})()
+
+def _names(rows):
+    return [r[0] for r in rows]
+
+def test_ranks_by_amount_then_cofund_with_nulls_last():
+    idx = RecommenderIndex().build(FakeGraph())
+    rows, matched = idx.recommend("energy", "large", "DE-NW")
+    assert not matched and _names(rows) == ["Tie", "Big", "Small", "Unknown"]
+    assert _names(idx.recommend("energy", "large", "DE-NW", k=1)[0]) == ["Tie"]  # tie broken by cofund
+    assert _names(idx.recommend("energy", "large", "DE-NW", min_amount=20000)[0]) == ["Tie", "Big"]
+
+def test_profile_mask_and_rebuild_on_version_change():
+    g = FakeGraph()
+    idx = RecommenderIndex(check_interval=0).build(g)
+    rows, matched = idx.recommend("software", "micro", "DE-BE", min_cofund=0.85)
+    assert matched and _names(rows) == ["Small"]
+    idx.ensure(g)
+    assert g.builds == 1
+    g.ver += 1
+    g.results[PROGRAMS_Q] = PROGRAMS[:1]
+    assert _names(idx.ensure(g).recommend("energy", "large", "DE-NW")[0]) == ["Big"] and g.builds == 2
@@ -0,0 +1,39 @@
+# tests/test_results.py
+import query_guard
+import results
+from query_guard import GuardResult
+
+ROWS = [[i] for i in range(25)]
+
+def _fake_run(calls):
+    def run(g, cypher, params=None, cache=None):
+        calls.append((cypher, params))
+        rows = ROWS
+        if params and "page_skip" in params:
+            rows = ROWS[params["page_skip"]:params["page_skip"] + params["page_limit"]]
+        return GuardResult("ok", cypher, header=[[1, "n"]], rows=rows)
+    return run
+
+def test_plain_return_is_paged_server_side(monkeypatch):
+    calls = []
+    monkeypatch.setattr(query_guard, "run", _fake_run(calls))
+    res, has_next = results.fetch_page(None, "MATCH (n) RETURN n;", {"x": 1}, page=2, page_size=10)
+    assert res.rows == ROWS[10:20] and has_next
+    assert calls[0][0].endswith("RETURN n\nSKIP $page_skip LIMIT $page_limit")
+    assert calls[0][1] == {"x": 1, "page_skip": 10, "page_limit": 11}
+    assert results.fetch_page(None, "MATCH (n) RETURN n", page=3, page_size=10) == (
+        GuardResult("ok", calls[1][0], header=[[1, "n"]], rows=ROWS[20:]), False)
+
+def test_union_and_own_limit_are_sliced_client_side(monkeypatch):
+    calls = []
+    monkeypatch.setattr(query_guard, "run", _fake_run(calls))
+    for q in ("MATCH (n) RETURN n UNION MATCH (m) RETURN m", "MATCH (n) RETURN n LIMIT 25"):
+        res, has_next = results.fetch_page(None, q, page=3, page_size=10)
+        assert res.rows == ROWS[20:] and not has_next and calls[-1] == (q, None)
+
+def test_to_frame_is_columnar_with_unique_names():
+    df = results.to_frame([[1, "n"], [1, "n"], [1, "m"]], [[1, {"a": 1}, None], [2, {"b": 2}, "x"]])
+    assert list(df.columns) == ["n", "n_2", "m"]
+    assert df["n"].tolist() == [1, 2] and df["n_2"].tolist() == ['{"a": 1}', '{"b": 2}']
+    assert list(results.to_frame([[1, "a"]], [[1, 2]]).columns) == ["col_0", "col_1"]
+    assert results.to_frame([[1, "a"]], []).empty
@@ -0,0 +1,39 @@
+# tests/test_rules_engine.py
+import pytest
+
+from rules_engine import RuleEngine, inline_params
+from schema_sync import load_ontology
+
+RULES = RuleEngine.from_ontology(load_ontology())
+
+@pytest.mark.parametrize("question, key, value", [
+    ("programs with deadline before 2025", "deadline_lt", "2025-01-01"),
+    ("programs with deadline after 2025", "deadline_gt", "2025-12-31"),
+    ("programs that close by 2025", "deadline_le", "2025-12-31"),
+    ("programs open from 2025", "deadline_ge", "2025-01-01"),
+    ("programs with deadline before 2025-06-30", "deadline_lt", "2025-06-30"),
+])
+def test_deadline_year_expands_by_comparison_word(question, key, value):
+    assert RULES.filters(question) == {key: value}
+
+def test_before_year_excludes_that_year():
+    cypher, params = RULES.match("programs with deadline before 2025")
+    assert "p.deadline < $deadline_lt" in cypher and params["deadline_lt"] == "2025-01-01"
+
+def test_sector_word_inside_document_name_is_not_a_sector():
+    cypher, params = RULES.match("Which programs require an energy audit document?")
+    assert "sector" not in params and "Company" not in cypher
+
+@pytest.mark.parametrize("question", [
+    "energy programs in Bavaria",
+    "subsidies for energy companies",
+    "programs in the energy sector",
+    "renewable energy firms",
+])
+def test_sector_in_sector_context(question):
+    assert RULES.filters(question)["sector"] == "energy"
+
+def test_template_is_parameterized():
+    cypher, params = RULES.match("small manufacturing companies in NRW with at least 20000 EUR")
+    assert params == {"sector": "manufacturing", "size": "small", "region": "DE-NW", "min_amount": 20000}
+    assert "20000" not in cypher and "20000" in inline_params(cypher, params)
@@ -0,0 +1,41 @@
+# tests/test_schema_sync.py
+from schema_sync import desired_schema, sync_schema
+
+ONT = {"nodes": {"Company": {"key": "name", "indexes": ["sector"]}, "Chunk": {"key": "id"}, "Tag": None}}
+
+class FakeGraph:
+    def __init__(self, indexes=(), constraints=(), fail=()):
+        self.indexes, self.constraints, self.fail, self.created = list(indexes), list(constraints), fail, []
+
+    def ro_query(self, q, params=None):
+        return type("RS", (), {"result_set": self.indexes})()
+
+    def list_constraints(self):
+        return self.constraints
+
+    def create_node_range_index(self, label, prop):
+        self.created.append(("index", label, prop))
+
+    def create_node_unique_constraint(self, label, prop):
+        if (label, prop) in self.fail:
+            raise RuntimeError("duplicates")
+        self.created.append(("unique", label, prop))
+
+def test_desired_schema_indexes_every_key():
+    indexes, uniques = desired_schema(ONT)
+    assert indexes == {("Company", "name"), ("Company", "sector"), ("Chunk", "id")}
+    assert uniques == {("Company", "name"), ("Chunk", "id")}
+
+def test_dry_run_reports_only_missing_and_creates_nothing():
+    g = FakeGraph(indexes=[["Company", ["name", "sector"], {"name": ["RANGE"], "sector": ["FULLTEXT"]}, "NODE"]],
+                  constraints=[{"type": "UNIQUE", "entitytype": "NODE", "label": "Company",
+                                "properties": ["name"], "status": "OPERATIONAL"}])
+    assert sync_schema(g, ONT, dry_run=True) == [
+        "range index :Chunk(id)", "range index :Company(sector)", "unique constraint :Chunk(id)"]
+    assert g.created == []
+
+def test_sync_creates_missing_and_reports_failed_constraints():
+    g = FakeGraph(fail={("Chunk", "id")})
+    report = sync_schema(g, ONT)
+    assert ("unique", "Company", "name") in g.created and len(g.created) == 4
+    assert report[3].startswith("FAILED unique constraint :Chunk(id): duplicates")